@@ -1,27 +1,47 @@
 __version__ = "0.1.0"
 
 import ssl
-from pyeapi.eapilib import HttpsEapiConnection  # type: ignore[import-untyped]
+import threading
+from typing import Any
 
 
-class LabEapiConnection(HttpsEapiConnection):
+def create_ssl_context() -> ssl.SSLContext:
     """
+    TLS settings accepted by EOS eAPI.
     https://arista.my.site.com/AristaCommunity/s/article/Python-3-10-and-SSLV3-ALERT-HANDSHAKE-FAILURE-error
     """
+    # Use TLSv1.2
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
 
-    def __init__(self, **kwargs):
-        # Use TLSv1.2
-        context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-        context.minimum_version = ssl.TLSVersion.TLSv1_2
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
+    # Using the EOS default ciphers
+    context.set_ciphers(
+        "AES256-SHA:DHE-RSA-AES256-SHA:AES128-SHA:DHE-RSA-AES128-SHA"
+    )
+    return context
 
-        # Using the EOS default ciphers
-        context.set_ciphers(
-            "AES256-SHA:DHE-RSA-AES256-SHA:AES128-SHA:DHE-RSA-AES128-SHA"
-        )
 
-        if "context" in kwargs:
-            del kwargs["context"]
+_ssl_context: ssl.SSLContext | None = None
+_ssl_context_lock = threading.Lock()
 
-        super(LabEapiConnection, self).__init__(**kwargs, context=context)
+
+def ssl_context() -> ssl.SSLContext:
+    """TLS context shared by all the eAPI connections of the process."""
+    global _ssl_context
+    # Threads connecting at the same time must not create several contexts,
+    # a TLS session can only be resumed with the context that created it
+    with _ssl_context_lock:
+        if _ssl_context is None:
+            _ssl_context = create_ssl_context()
+        return _ssl_context
+
+
+def __getattr__(name: str) -> Any:
+    # The eAPI transport imports pyeapi, only load it when NAPALM resolves 'arista_lab.LabEapiConnection'
+    if name in ("LabEapiConnection", "LabHttpsConnection", "connection_stats"):
+        from arista_lab import transport
+
+        return getattr(transport, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
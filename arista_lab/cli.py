@@ -1,22 +1,23 @@
 #!/usr/bin/env python
 from enum import Enum
-import pickle
-from typing import Literal
-import nornir
+from typing import TYPE_CHECKING, Literal
 import click
 import sys
 
 import logging
 from rich.console import Console
 from pathlib import Path
-from nornir.core.filter import F
 from rich.logging import RichHandler
 
-import arista_lab.config
-import arista_lab.traffic
-import arista_lab.config.interfaces
-import arista_lab.config.peering
-import snappi # type: ignore[import-untyped]
+# Keep the imports at module level light: nornir, NAPALM and snappi take most of the startup time
+# and are imported by the commands using them.
+import arista_lab.eapi
+import arista_lab.report
+import arista_lab.snapshots
+
+if TYPE_CHECKING:
+    import nornir
+    import snappi # type: ignore[import-untyped]
 
 console = Console()
 
@@ -80,14 +81,46 @@ def setup_logging(level: LogLevel = Log.INFO, file: Path | None = None) -> None:
         if loglevel == logging.DEBUG:
             rich_handler.setLevel(logging.INFO)
 
-def _init_nornir(ctx: click.Context, param, value: Path) -> nornir.core.Nornir:
+def _init_nornir(ctx: click.Context, param, value: Path) -> "nornir.core.Nornir":
+    import nornir
+    from nornir.core.plugins.runners import RunnersPluginRegister
+    import arista_lab.runner
+    import arista_lab.tracing
+
+    # Allow 'runner: {plugin: lab}' in the Nornir configuration
+    RunnersPluginRegister.register("lab", arista_lab.runner.LabRunner)
     try:
-        return nornir.InitNornir(config_file=str(value), core={"raise_on_error": False})
+        nr = nornir.InitNornir(config_file=str(value), core={"raise_on_error": False})
     except Exception as exc:
         ctx.fail(f"Unable to initialize Nornir with config file '{value}': {str(exc)}")
+    if (tracer := arista_lab.tracing.tracer()) is not None:
+        nr = nr.with_processors([arista_lab.tracing.NornirTracer(tracer)])
+        arista_lab.tracing.trace_connections()
+    return nr
 
 
-def _read_otg_config(ctx: click.Context, param, value: Path) -> snappi.Config:
+def _parse_workers(ctx: click.Context, param, value: str | None) -> int | Literal["auto"] | None:
+    if value is None or value == "auto":
+        return value
+    try:
+        if (workers := int(value)) >= 1:
+            return workers
+    except ValueError:
+        pass
+    raise click.BadParameter(f"'{value}' is not a positive integer or 'auto'")
+
+
+def _parse_group_limits(ctx: click.Context, param, value: tuple[str, ...]) -> dict[str, int]:
+    limits = {}
+    for limit in value:
+        group, _, count = limit.partition("=")
+        if not group or not count.isdigit() or int(count) < 1:
+            raise click.BadParameter(f"'{limit}' is not GROUP=N with N a positive integer")
+        limits[group] = int(count)
+    return limits
+
+
+def _read_otg_config(ctx: click.Context, param, value: Path) -> "snappi.Config":
     try:
         config = ctx.obj["snappi_api"].config()
         with value.open(mode="r", encoding="UTF-8") as fd:
@@ -116,9 +149,39 @@ def _read_otg_config(ctx: click.Context, param, value: Path) -> snappi.Config:
         case_sensitive=False,
     ),
 )
-def cli(log_level: LogLevel, log_file: Path) -> None:
+@click.option(
+    "--profile",
+    is_flag=True,
+    default=False,
+    show_envvar=True,
+    help="Record the time spent per device and phase (connect, render, configure, commit...) and print the slowest devices and phases at the end",
+)
+@click.option(
+    "--trace",
+    "trace",
+    show_envvar=True,
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
+    help="Write the recorded time spans to a Chrome trace file, to open in chrome://tracing or Perfetto. Implies --profile.",
+)
+@click.pass_context
+def cli(ctx: click.Context, log_level: LogLevel, log_file: Path, profile: bool, trace: Path | None) -> None:
     """Arista Lab CLI"""
     setup_logging(log_level, log_file)
+    if profile or trace is not None:
+        import arista_lab.tracing
+
+        tracer = arista_lab.tracing.enable()
+
+        def print_profile() -> None:
+            if not tracer.spans:
+                return
+            if trace is not None:
+                tracer.write(trace)
+                logger.info(f"Trace of {len(tracer.spans)} spans written to {trace}")
+            for table in tracer.summary_tables():
+                console.print(table)
+
+        ctx.call_on_close(print_profile)
 
 ##########################
 # Configuration commands #
@@ -141,17 +204,146 @@ def cli(log_level: LogLevel, log_file: Path) -> None:
     "wait_for",
     type=int,
     required=False,
-    help="Number of attempts to wait for the device to be ready. The maximum waited time is Attempts * Timeout (default 60s).",
+    help="Number of attempts to wait for the device to be ready. Attempts are spaced with exponential backoff.",
+)
+@click.option(
+    "--wait-timeout",
+    "wait_timeout",
+    type=float,
+    required=False,
+    help="Maximum time in seconds to wait for the device to be ready.",
+)
+@click.option(
+    "--backend",
+    "backend",
+    type=click.Choice(["nornir", "eapi"]),
+    default="nornir",
+    show_default=True,
+    show_envvar=True,
+    help="Backend for the CLI-only operations (backup, restore, save). 'eapi' drives all devices from a single asyncio event loop.",
+)
+@click.option(
+    "--concurrency",
+    "concurrency",
+    type=click.IntRange(min=1),
+    default=arista_lab.eapi.DEFAULT_CONCURRENCY,
+    show_default=True,
+    show_envvar=True,
+    help="Maximum number of devices handled concurrently by the 'eapi' backend.",
+)
+@click.option(
+    "--workers",
+    "workers",
+    callback=_parse_workers,
+    show_envvar=True,
+    metavar="N|auto",
+    help="Maximum number of devices configured concurrently. 'auto' adapts it to the device response times, backing off when devices slow down or time out. Defaults to the runner of the Nornir configuration.",
+)
+@click.option(
+    "--group-limit",
+    "group_limits",
+    multiple=True,
+    callback=_parse_group_limits,
+    metavar="GROUP=N",
+    help="Maximum number of devices of a Nornir group configured concurrently. Can be repeated.",
+)
+@click.option(
+    "--commit-rate",
+    "commit_rate",
+    type=click.FloatRange(min=0, min_open=True),
+    show_envvar=True,
+    help="Maximum number of configuration commits per second across all devices.",
+)
+@click.option(
+    "--quiet",
+    "-q",
+    "quiet",
+    is_flag=True,
+    default=False,
+    show_envvar=True,
+    help="Only show the failures and a summary of the changes, not the status and diff of each device.",
+)
+@click.option(
+    "--results",
+    "results",
+    type=click.Path(file_okay=False, writable=True, path_type=Path),
+    default=arista_lab.report.DEFAULT_RESULTS_FOLDER,
+    show_default=True,
+    show_envvar=True,
+    help="Folder where the full diffs and failures of each device are written, as <device>.diff and <device>.error in a new subfolder for each run",
+)
+@click.option(
+    "--max-lines",
+    "max_lines",
+    type=click.IntRange(min=0),
+    default=arista_lab.report.DEFAULT_MAX_LINES,
+    show_default=True,
+    show_envvar=True,
+    help="Number of lines of each diff or failure shown on the console, the full text is in the results folder.",
+)
+@click.option(
+    "--skip-unchanged/--no-skip-unchanged",
+    "skip_unchanged",
+    default=False,
+    show_default=True,
+    show_envvar=True,
+    help="Do not push configuration snippets committed by a previous run if neither the snippet nor the device running-config have changed since. Ignored with --replace.",
+)
+@click.option(
+    "--state-file",
+    "state_file",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    default=".lab-state.json",
+    show_default=True,
+    show_envvar=True,
+    help="File storing the fingerprints of the committed configuration snippets",
 )
 @click.pass_context
 def config(
     ctx: click.Context,
-    nornir: nornir.core.Nornir,
-    wait_for: int
+    nornir: "nornir.core.Nornir",
+    wait_for: int,
+    wait_timeout: float | None,
+    backend: Literal["nornir", "eapi"],
+    concurrency: int,
+    workers: int | Literal["auto"] | None,
+    group_limits: dict[str, int],
+    commit_rate: float | None,
+    quiet: bool,
+    results: Path,
+    max_lines: int,
+    skip_unchanged: bool,
+    state_file: Path,
 ) -> None:
+    import arista_lab.config.state
+
+    if workers is not None or group_limits or commit_rate is not None:
+        import arista_lab.runner
+
+        nornir = nornir.with_runner(
+            arista_lab.runner.LabRunner(
+                num_workers=workers if workers is not None else getattr(nornir.runner, "num_workers", 20),
+                group_limits=group_limits,
+                commit_rate=commit_rate,
+            )
+        )
     ctx.ensure_object(dict)
     ctx.obj["nornir"] = nornir
     ctx.obj["wait_for"] = wait_for
+    ctx.obj["wait_timeout"] = wait_timeout
+    ctx.obj["backend"] = backend
+    ctx.obj["concurrency"] = concurrency
+    ctx.obj["state"] = arista_lab.config.state.FingerprintStore(state_file) if skip_unchanged else None
+    ctx.call_on_close(
+        lambda: logger.debug(f"eAPI connection statistics: {dict(arista_lab.connection_stats)}")
+    )
+    result_log = arista_lab.report.configure(results, max_lines=max_lines, quiet=quiet)
+
+    def print_summary() -> None:
+        if (summary := result_log.summary()) is not None:
+            console.print(summary)
+
+    ctx.call_on_close(print_summary)
 
 @config.command(help="Create or delete device configuration backups to flash")
 @click.pass_obj
@@ -162,16 +354,20 @@ def config(
     show_default=True,
 )
 def backup(obj: dict, delete: bool) -> None:
+    import arista_lab.config
+
     if delete:
-        arista_lab.config.delete_backups(obj["nornir"])
+        arista_lab.config.delete_backups(obj["nornir"], backend=obj["backend"], concurrency=obj["concurrency"])
     else:
-        arista_lab.config.create_backups(obj["nornir"], wait_for=obj["wait_for"])
+        arista_lab.config.create_backups(obj["nornir"], wait_for=obj["wait_for"], wait_timeout=obj["wait_timeout"], backend=obj["backend"], concurrency=obj["concurrency"])
 
 
 @config.command(help="Restore configuration backups from flash")
 @click.pass_obj
 def restore(obj: dict) -> None:
-    arista_lab.config.restore_backups(obj["nornir"])
+    import arista_lab.config
+
+    arista_lab.config.restore_backups(obj["nornir"], backend=obj["backend"], concurrency=obj["concurrency"])
 
 @config.command(help="Save configuration to a folder")
 @click.pass_obj
@@ -183,8 +379,34 @@ def restore(obj: dict) -> None:
     show_default=True,
     help="Configuration backup folder",
 )
-def save(obj: dict, folder: Path) -> None:
-    arista_lab.config.save(obj["nornir"], folder)
+@click.option(
+    "--snapshot",
+    "snapshot",
+    is_flag=False,
+    flag_value="",
+    default=None,
+    help="Also save the configuration as a named snapshot in the snapshot store. The name defaults to the current time.",
+)
+@click.option(
+    "--snapshot-store",
+    "snapshot_store",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=arista_lab.snapshots.DEFAULT_SNAPSHOT_FOLDER,
+    show_default=True,
+    show_envvar=True,
+    help="Snapshot store folder",
+)
+def save(obj: dict, folder: Path, snapshot: str | None, snapshot_store: Path) -> None:
+    import arista_lab.config
+
+    arista_lab.config.save(
+        obj["nornir"],
+        folder,
+        backend=obj["backend"],
+        concurrency=obj["concurrency"],
+        snapshot=(snapshot or arista_lab.snapshots.timestamp_name()) if snapshot is not None else None,
+        store=arista_lab.snapshots.SnapshotStore(snapshot_store),
+    )
 
 @config.command(help="Load configuration from a folder")
 @click.pass_obj
@@ -202,9 +424,66 @@ def save(obj: dict, folder: Path) -> None:
     show_default=True,
     help="Replace or merge the configuration on the device",
 )
-def load(obj: dict, folder: Path, replace: bool) -> None:
-    arista_lab.config.create_backups(obj["nornir"], wait_for=obj["wait_for"])
-    arista_lab.config.load(obj["nornir"], folder, replace=replace)
+@click.option(
+    "--snapshot",
+    "snapshot",
+    type=str,
+    help="Load the configuration from a snapshot of the snapshot store instead of the folder",
+)
+@click.option(
+    "--snapshot-store",
+    "snapshot_store",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=arista_lab.snapshots.DEFAULT_SNAPSHOT_FOLDER,
+    show_default=True,
+    show_envvar=True,
+    help="Snapshot store folder",
+)
+@click.option(
+    "--raw/--render",
+    default=False,
+    show_default=True,
+    help="Send the configuration files as is or render them as Jinja templates. Raw files already running on the device are not pushed",
+)
+def load(obj: dict, folder: Path, replace: bool, snapshot: str | None, snapshot_store: Path, raw: bool) -> None:
+    import arista_lab.config
+
+    opened = None
+    if snapshot is not None:
+        try:
+            opened = arista_lab.snapshots.SnapshotStore(snapshot_store).open(snapshot, obj["nornir"].inventory.hosts)
+        except arista_lab.snapshots.SnapshotError as e:
+            raise click.ClickException(str(e))
+    if obj.get("report") is None:
+        arista_lab.config.create_backups(obj["nornir"], wait_for=obj["wait_for"], wait_timeout=obj["wait_timeout"], backend=obj["backend"], concurrency=obj["concurrency"])
+    arista_lab.config.load(
+        obj["nornir"],
+        folder,
+        replace=replace,
+        snapshot=opened,
+        raw=raw,
+        report=obj.get("report"),
+    )
+
+@config.command(help="List the configuration snapshots")
+@click.option(
+    "--snapshot-store",
+    "snapshot_store",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=arista_lab.snapshots.DEFAULT_SNAPSHOT_FOLDER,
+    show_default=True,
+    show_envvar=True,
+    help="Snapshot store folder",
+)
+def snapshots(snapshot_store: Path) -> None:
+    store = arista_lab.snapshots.SnapshotStore(snapshot_store)
+    for name in store.names():
+        try:
+            snapshot = store.read(name)
+        except arista_lab.snapshots.SnapshotError as e:
+            console.print(f"{name}\t{e}")
+            continue
+        console.print(f"{name}\t{snapshot['created']}\t{len(snapshot['hosts'])} devices")
 
 @config.command(help="Apply configuration templates")
 @click.pass_obj
@@ -227,10 +506,19 @@ def load(obj: dict, folder: Path, replace: bool) -> None:
     show_default=True,
     help="Replace or merge the configuration on the device",
 )
-def apply(obj: dict, folder: Path, groups: bool, replace: bool) -> None:
-    arista_lab.config.create_backups(obj["nornir"], wait_for=obj["wait_for"])
+@click.option(
+    "--merged/--per-template",
+    default=False,
+    show_default=True,
+    help="Render all the templates applicable to a device and commit them at once. Falls back to one commit per template if the merged commit fails.",
+)
+def apply(obj: dict, folder: Path, groups: bool, replace: bool, merged: bool) -> None:
+    import arista_lab.config
+
+    if obj.get("report") is None:
+        arista_lab.config.create_backups(obj["nornir"], wait_for=obj["wait_for"], wait_timeout=obj["wait_timeout"], backend=obj["backend"], concurrency=obj["concurrency"])
     arista_lab.config.apply_templates(
-        obj["nornir"], folder, replace=replace, groups=groups
+        obj["nornir"], folder, replace=replace, groups=groups, merged=merged, state=obj["state"], report=obj.get("report")
     )
 
 ##################################
@@ -246,9 +534,18 @@ def apply(obj: dict, folder: Path, groups: bool, replace: bool) -> None:
     required=True,
     help="YAML File describing lab links",
 )
-def interfaces(obj: dict, links: Path) -> None:
-    arista_lab.config.create_backups(obj["nornir"], wait_for=obj["wait_for"])
-    arista_lab.config.interfaces.configure(obj["nornir"], links)
+@click.option(
+    "--batch/--no-batch",
+    default=False,
+    show_default=True,
+    help="Push all the interfaces of a device in a single configuration session and commit",
+)
+def interfaces(obj: dict, links: Path, batch: bool) -> None:
+    import arista_lab.config.interfaces
+
+    if obj.get("report") is None:
+        arista_lab.config.create_backups(obj["nornir"], wait_for=obj["wait_for"], wait_timeout=obj["wait_timeout"], backend=obj["backend"], concurrency=obj["concurrency"])
+    arista_lab.config.interfaces.configure(obj["nornir"], links, batch=batch, state=obj["state"], report=obj.get("report"))
 
 @config.command(help="Configure peering devices")
 @click.pass_obj
@@ -262,12 +559,87 @@ def interfaces(obj: dict, links: Path) -> None:
     required=True,
     help="Nornir group of the backbone",
 )
-def peering(obj: dict, group: str, backbone: str) -> None:
+@click.option(
+    "--cache",
+    "cache",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=Path.home() / ".cache" / "arista-lab" / "ripestat",
+    show_default=True,
+    show_envvar=True,
+    help="Cache folder of the announced prefixes. Files named 'AS<asn>.json' containing a RIPEstat response can be used as fixtures, they are only refreshed with --refresh.",
+)
+@click.option(
+    "--cache-ttl",
+    "cache_ttl",
+    type=float,
+    default=24 * 3600,
+    show_default=True,
+    show_envvar=True,
+    help="Time in seconds after which cached announced prefixes are refreshed from RIPEstat",
+)
+@click.option(
+    "--offline/--online",
+    default=False,
+    show_default=True,
+    show_envvar=True,
+    help="Only use cached announced prefixes, do not query RIPEstat",
+)
+@click.option(
+    "--refresh",
+    is_flag=True,
+    default=False,
+    show_envvar=True,
+    help="Fetch the announced prefixes from RIPEstat again, even the fresh cache entries and the fixtures",
+)
+@click.option(
+    "--ripestat-url",
+    "ripestat_url",
+    type=str,
+    default="https://stat.ripe.net",
+    show_default=True,
+    show_envvar=True,
+    help="RIPEstat Data API server",
+)
+def peering(obj: dict, group: str, backbone: str, cache: Path, cache_ttl: float, offline: bool, refresh: bool, ripestat_url: str) -> None:
+    from nornir.core.filter import F
+    import arista_lab.config.peering
+    import arista_lab.ripestat
+
+    # Fetch the announced prefixes while the backups are created
+    prefetched = arista_lab.config.peering.prefetch(
+        obj["nornir"],
+        group,
+        arista_lab.ripestat.PrefixCache(cache, ttl=cache_ttl, offline=offline, url=ripestat_url, refresh=refresh),
+    )
     arista_lab.config.create_backups(
-        obj["nornir"].filter(F(groups__contains=group)), wait_for=obj["wait_for"]
+        obj["nornir"].filter(F(groups__contains=group)), wait_for=obj["wait_for"], wait_timeout=obj["wait_timeout"], backend=obj["backend"], concurrency=obj["concurrency"]
     )
-    arista_lab.config.create_backups(obj["nornir"].filter(F(groups__contains=group)))
-    arista_lab.config.peering.configure(obj["nornir"], group, backbone)
+    arista_lab.config.peering.configure(obj["nornir"], group, backbone, prefetched=prefetched, state=obj["state"])
+
+@config.group(help="Show what the apply, load and interfaces commands would change without committing")
+@click.option(
+    "--output",
+    "output",
+    type=click.Path(file_okay=False, writable=True, path_type=Path),
+    default=arista_lab.report.DEFAULT_DIFF_FOLDER,
+    show_default=True,
+    show_envvar=True,
+    help="Folder receiving the full diff of each device",
+)
+@click.pass_context
+def diff(ctx: click.Context, output: Path) -> None:
+    ctx.obj["report"] = report = arista_lab.report.DiffReport(output)
+
+    def print_report() -> None:
+        report.write(ctx.obj["nornir"].inventory.hosts)
+        console.print(report.summary())
+        console.print(f"Full diffs written to {output}")
+
+    ctx.call_on_close(print_report)
+
+diff.add_command(apply)
+diff.add_command(load)
+diff.add_command(interfaces)
 
 ##############################
 # Traffic generator commands #
@@ -278,9 +650,8 @@ def peering(obj: dict, group: str, backbone: str) -> None:
     "--otg-api",
     "otg_api",
     type=str,
-    required=True,
     show_envvar=True,
-    help="Open Traffic Generator server",
+    help="Open Traffic Generator server. Required by all commands but 'summary' and 'generate'.",
 )
 @click.option(
     "--extension",
@@ -293,6 +664,16 @@ def peering(obj: dict, group: str, backbone: str) -> None:
 def traffic(
     ctx: click.Context, otg_api: str, snappi_extension: Literal["ixnetwork"] | None,
 ) -> None:
+    if ctx.invoked_subcommand in ("summary", "generate"):
+        # Offline commands
+        return
+    if otg_api is None:
+        ctx.fail("Missing option '--otg-api'.")
+    ctx.ensure_object(dict)
+
+    import snappi # type: ignore[import-untyped]
+    import arista_lab.traffic
+
     try:
         ctx.obj["snappi_api"] = snappi.api(
                 location=otg_api,
@@ -301,9 +682,8 @@ def traffic(
     except Exception as e:
         logger.error(e)
         ctx.exit(1)
-    if snappi_extension == "ixnetwork" and arista_lab.traffic.snappi_ixnetwork_session_file.exists():
-        with arista_lab.traffic.snappi_ixnetwork_session_file.open(mode="rb") as fd:
-            ctx.obj["snappi_api"]._config = pickle.load(fd)
+    ctx.obj["otg_api"] = otg_api
+    arista_lab.traffic.restore_session(ctx.obj["snappi_api"], otg_api)
 
 @traffic.command(help="Configure traffic generator")
 @click.argument(
@@ -312,18 +692,29 @@ def traffic(
     type=click.Path(exists=True, dir_okay=False, readable=True, path_type=Path),
     callback=_read_otg_config,
 )
+@click.option(
+    "--force/--no-force",
+    default=False,
+    show_default=True,
+    help="Apply the configuration even if it was already applied to the traffic generator",
+)
 @click.pass_obj
 def configure(
     obj: dict,
-    config: snappi.Config,
+    config: "snappi.Config",
+    force: bool,
 ) -> None:
-    arista_lab.traffic.configure(api=obj["snappi_api"], config=config)
+    import arista_lab.traffic
+
+    arista_lab.traffic.configure(api=obj["snappi_api"], config=config, location=obj["otg_api"], force=force)
 
 @traffic.command(help="Start the flows on the traffic generator")
 @click.pass_obj
 def start(
     obj: dict,
 ) -> None:
+    import arista_lab.traffic
+
     arista_lab.traffic.start(api=obj["snappi_api"])
 
 @traffic.command(help="Stop the flows on the traffic generator")
@@ -331,14 +722,368 @@ def start(
 def stop(
     obj: dict,
 ) -> None:
+    import arista_lab.traffic
+
     arista_lab.traffic.stop(api=obj["snappi_api"])
 
 @traffic.command(help="Get the flow statistics from the traffic generatorr")
 @click.pass_obj
+@click.option(
+    "--watch/--no-watch",
+    default=False,
+    show_default=True,
+    help="Poll the statistics and display the deltas and rates of each interval until interrupted",
+)
+@click.option(
+    "--interval",
+    "interval",
+    type=click.FloatRange(min=0.1),
+    default=1.0,
+    show_default=True,
+    help="Polling interval in seconds in watch mode",
+)
+@click.option(
+    "--rows",
+    "rows",
+    type=click.IntRange(min=0),
+    default=20,
+    show_default=True,
+    help="Number of flows displayed in watch mode, the flows losing the most frames first",
+)
+@click.option(
+    "--metrics",
+    "-m",
+    "metrics",
+    type=click.Choice(["port", "flow", "bgpv4", "bgpv6"]),
+    multiple=True,
+    default=["port", "flow"],
+    show_default=True,
+    help="Metric groups, fetched concurrently. Can be repeated.",
+)
+@click.option(
+    "--name",
+    "names",
+    type=str,
+    multiple=True,
+    help="Only keep the ports, flows or BGP peers matching this shell-style pattern. Can be repeated.",
+)
 def stats(
     obj: dict,
+    watch: bool,
+    interval: float,
+    rows: int,
+    metrics: tuple[str, ...],
+    names: tuple[str, ...],
+) -> None:
+    import arista_lab.traffic
+
+    if watch:
+        # The watch mode displays the port and flow metrics
+        arista_lab.traffic.watch(api=obj["snappi_api"], interval=interval, rows=rows, names=list(names))
+    else:
+        arista_lab.traffic.stats(api=obj["snappi_api"], groups=metrics, names=list(names))
+
+@traffic.command(help="Record the traffic generator metrics to a JSONL file until interrupted")
+@click.pass_obj
+@click.option(
+    "--output",
+    "output",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    required=True,
+    help="Recording file. Samples are appended to the file.",
+)
+@click.option(
+    "--interval",
+    "interval",
+    type=click.FloatRange(min=0.1),
+    default=1.0,
+    show_default=True,
+    help="Sampling interval in seconds",
+)
+@click.option(
+    "--duration",
+    "duration",
+    type=click.FloatRange(min=0),
+    help="Stop recording after this number of seconds",
+)
+@click.option(
+    "--metrics",
+    "-m",
+    "metrics",
+    type=click.Choice(["port", "flow", "bgpv4", "bgpv6"]),
+    multiple=True,
+    default=["port", "flow"],
+    show_default=True,
+    help="Metric groups, fetched concurrently. Can be repeated.",
+)
+@click.option(
+    "--name",
+    "names",
+    type=str,
+    multiple=True,
+    help="Only keep the ports, flows or BGP peers matching this shell-style pattern. Can be repeated.",
+)
+@click.option(
+    "--max-size",
+    "max_size",
+    type=click.IntRange(min=1),
+    default=100,
+    show_default=True,
+    help="Size in MiB after which the recording file is rotated",
+)
+@click.option(
+    "--backups",
+    "backups",
+    type=click.IntRange(min=0),
+    default=5,
+    show_default=True,
+    help="Number of rotated recording files kept",
+)
+def record(
+    obj: dict,
+    output: Path,
+    interval: float,
+    duration: float | None,
+    metrics: tuple[str, ...],
+    names: tuple[str, ...],
+    max_size: int,
+    backups: int,
 ) -> None:
-    arista_lab.traffic.stats(api=obj["snappi_api"])
+    import arista_lab.traffic
+    import arista_lab.recording
+
+    with arista_lab.recording.MetricsRecorder(output, max_bytes=max_size * 1024 * 1024, backups=backups) as recorder:
+        samples = arista_lab.traffic.record(obj["snappi_api"], recorder, interval=interval, duration=duration, groups=metrics, names=list(names))
+    logger.info(f"{samples} samples recorded to {output}")
+
+@traffic.command(help="Summarize a recording of the traffic generator metrics: loss, rates and percentiles")
+@click.argument(
+    "recording",
+    type=click.Path(exists=True, dir_okay=False, readable=True, path_type=Path),
+)
+@click.option(
+    "--rows",
+    "rows",
+    type=click.IntRange(min=0),
+    default=20,
+    show_default=True,
+    help="Number of flows displayed, the flows losing the most frames first",
+)
+@click.option(
+    "--flow-rates/--no-flow-rates",
+    default=False,
+    show_default=True,
+    help="Compute the receive rate percentiles of each flow. Memory grows with the number of flows and samples.",
+)
+def summary(recording: Path, rows: int, flow_rates: bool) -> None:
+    import arista_lab.recording
+
+    for table in arista_lab.recording.summary_tables(
+        arista_lab.recording.summarize(recording, flow_rates=flow_rates), rows=rows
+    ):
+        console.print(table)
+
+@traffic.command(help="Generate the traffic generator configuration from the lab links")
+@click.option(
+    "-n",
+    "--nornir",
+    "nornir",
+    default="nornir.yaml",
+    type=click.Path(exists=True, readable=True, dir_okay=False, path_type=Path),
+    callback=_init_nornir,
+    show_default=True,
+    show_envvar=True,
+    help="Nornir configuration in YAML format. Link endpoints that are not in the inventory are traffic generator ports.",
+)
+@click.option(
+    "--links",
+    "links",
+    type=click.Path(exists=True, readable=True, path_type=Path),
+    required=True,
+    help="YAML File describing lab links",
+)
+@click.option(
+    "--pattern",
+    "pattern",
+    type=click.Choice(["mesh", "pairwise", "hub"]),
+    default="mesh",
+    show_default=True,
+    help="Flows between every pair of ports (mesh), between consecutive ports (pairwise) or between the hub port and the other ports (hub)",
+)
+@click.option(
+    "--hub",
+    "hub",
+    type=str,
+    help="Hub port name ('<device>_<interface>') of the hub pattern. Defaults to the first port.",
+)
+@click.option(
+    "--location",
+    "location",
+    type=str,
+    default="{interface}",
+    show_default=True,
+    help="Port location, formatted with the {device} and {interface} of the link endpoint",
+)
+@click.option(
+    "--size",
+    "size",
+    type=click.IntRange(min=64),
+    default=128,
+    show_default=True,
+    help="Frame size in bytes",
+)
+@click.option(
+    "--rate",
+    "rate",
+    type=click.IntRange(min=1),
+    default=100,
+    show_default=True,
+    help="Rate of each flow in packets per second",
+)
+@click.option(
+    "--output",
+    "output",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    default="otg.json",
+    show_default=True,
+    help="OTG configuration file",
+)
+def generate(
+    nornir: "nornir.core.Nornir",
+    links: Path,
+    pattern: Literal["mesh", "pairwise", "hub"],
+    hub: str | None,
+    location: str,
+    size: int,
+    rate: int,
+    output: Path,
+) -> None:
+    import arista_lab.otg
+
+    ports = arista_lab.otg.generator_ports(links, nornir.inventory.hosts, location=location)
+    if not ports:
+        raise click.ClickException(f"No link in '{links}' connects a device of the inventory to a device outside of the inventory")
+    try:
+        count = arista_lab.otg.write_config(
+            output, ports, arista_lab.otg.flows(ports, pattern, hub=hub, size=size, rate_pps=rate)
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    logger.info(f"{len(ports)} ports and {count} flows written to {output}")
+
+@traffic.command(help="Measure the traffic loss caused by a trigger, e.g. an interface shutdown")
+@click.pass_obj
+@click.option(
+    "--command",
+    "command",
+    type=str,
+    help="Shell command triggering the event",
+)
+@click.option(
+    "--shutdown",
+    "shutdown",
+    type=str,
+    metavar="DEVICE:INTERFACE",
+    help="Shut an interface of a lab device to trigger the event. The interface is enabled again after the measurement unless --no-restore.",
+)
+@click.option(
+    "--restore/--no-restore",
+    default=True,
+    show_default=True,
+    help="Enable the interface shut with --shutdown after the measurement",
+)
+@click.option(
+    "-n",
+    "--nornir",
+    "nornir_config",
+    default="nornir.yaml",
+    type=click.Path(readable=True, dir_okay=False, path_type=Path),
+    show_default=True,
+    show_envvar=True,
+    help="Nornir configuration in YAML format, used with --shutdown",
+)
+@click.option(
+    "--interval",
+    "interval",
+    type=click.FloatRange(min=0.01),
+    default=0.1,
+    show_default=True,
+    help="Flow metrics polling interval in seconds",
+)
+@click.option(
+    "--settle",
+    "settle",
+    type=click.FloatRange(min=0),
+    default=5.0,
+    show_default=True,
+    help="Time in seconds between the start of the flows and the trigger",
+)
+@click.option(
+    "--duration",
+    "duration",
+    type=click.FloatRange(min=0),
+    default=30.0,
+    show_default=True,
+    help="Time in seconds between the trigger and the end of the flows",
+)
+@click.option(
+    "--name",
+    "names",
+    type=str,
+    multiple=True,
+    help="Only measure the flows matching this shell-style pattern. Can be repeated.",
+)
+@click.option(
+    "--report",
+    "report",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    default="convergence.json",
+    show_default=True,
+    help="JSON report file",
+)
+@click.option(
+    "--rows",
+    "rows",
+    type=click.IntRange(min=0),
+    default=20,
+    show_default=True,
+    help="Number of flows displayed, the longest loss of service first",
+)
+def convergence(
+    obj: dict,
+    command: str | None,
+    shutdown: str | None,
+    restore: bool,
+    nornir_config: Path,
+    interval: float,
+    settle: float,
+    duration: float,
+    names: tuple[str, ...],
+    report: Path,
+    rows: int,
+) -> None:
+    import arista_lab.convergence
+
+    if (command is None) == (shutdown is None):
+        raise click.UsageError("Use either --command or --shutdown to trigger the event.")
+    if command is not None:
+        trigger = arista_lab.convergence.shell_trigger(command)
+    else:
+        host, _, interface = shutdown.partition(":")
+        if not interface:
+            raise click.BadParameter("Expected the format 'DEVICE:INTERFACE'.", param_hint="'--shutdown'")
+        nornir = _init_nornir(click.get_current_context(), None, nornir_config)
+        trigger = arista_lab.convergence.interface_trigger(nornir, host, interface)
+    try:
+        result = arista_lab.convergence.measure(
+            obj["snappi_api"], trigger, names=list(names), interval=interval, settle=settle, duration=duration
+        )
+    finally:
+        if shutdown is not None and restore:
+            arista_lab.convergence.interface_trigger(nornir, host, interface, shutdown=False)()
+    arista_lab.convergence.write_report(report, result)
+    console.print(arista_lab.convergence.report_table(result, rows=rows))
+    logger.info(f"Convergence report written to {report}")
 
 def main() -> None:
     try:
@@ -1,16 +1,50 @@
+import logging
 from pathlib import Path
 from os import walk
+from typing import Any, Literal
 
 import nornir
-from nornir.core.task import Task, Result
+from nornir.core.task import Task
+from nornir.core.exceptions import NornirSubTaskError
 from rich.progress import Progress
-from arista_lab.console import _print_failed_tasks
+from arista_lab import tracing
+from arista_lab.console import _log, _log_diff, _print_failed_tasks
+from arista_lab.files import write_atomic
+from arista_lab.report import DiffReport
+from arista_lab.runner import wait_commit
+from arista_lab.snapshots import Snapshot, SnapshotStore
 
 from nornir_napalm.plugins.tasks import napalm_cli, napalm_configure, napalm_get, napalm_confirm_commit  # type: ignore[import-untyped]
 from nornir_jinja2.plugins.tasks import template_file  # type: ignore[import-untyped]
+from pyeapi.eapilib import CommandError  # type: ignore[import-untyped]
 
+from arista_lab.eapi import DEFAULT_CONCURRENCY
+from .readiness import wait_for_device as wait_for_device
+from .state import FingerprintStore, normalize_config, running_config
 
-def _safe_push(task: Task, bar: Progress, *, config: str, title: str, replace: bool = False):
+logger = logging.getLogger(__name__)
+
+# 'eapi' runs the CLI-only operations on an asyncio eAPI client instead of Nornir and NAPALM
+Backend = Literal["nornir", "eapi"]
+
+
+def _safe_push(
+    task: Task,
+    bar: Progress,
+    *,
+    config: str,
+    title: str,
+    replace: bool = False,
+    log_diff: bool = True,
+    report: DiffReport | None = None,
+) -> str | None:
+    if report is not None:
+        # Dry run: stage the configuration, collect the diff and discard the session
+        r = task.run(task=napalm_configure, dry_run=True, replace=replace, configuration=config)
+        diff = r.diff if r.changed else None
+        report.add(task.host.name, title, diff)
+        return diff
+    wait_commit(task)
     r = task.run(
         task=napalm_configure,
         dry_run=False,
@@ -18,23 +52,45 @@ def _safe_push(task: Task, bar: Progress, *, config: str, title: str, replace: b
         configuration=config,
         revert_in=30,
     )
-    if r.changed:
-        bar.console.log(f"{task.host}: {title}\n\t{r.diff.replace('\n', '\n\t')}")
+    diff = r.diff if r.changed else None
+    if diff and log_diff:
+        _log_diff(bar, task.host.name, title, diff)
     r = task.run(task=napalm_confirm_commit)
     if r.changed:
-        bar.console.log(f"{task.host}: {title}: {r.result}")
-
-def wait_for_device(task: Task, bar: Progress, wait_for: int = 0):
-    for i in range(wait_for):
-        bar.console.log(f"Waiting for {task.host}: attempt {i + 1}/{wait_for}...")
-        r = task.nornir.run(task=napalm_cli, raise_on_error=False, commands=["show version"])
-        if r.failed:
-            bar.console.log(f"Attempt {i + 1} failed: {r[str(task.host)][0]}")
+        _log(bar, f"{task.host}: {title}: {r.result}")
+    return diff
+
+def _unchanged(task: Task, bar: Progress, state: FingerprintStore | None, *, key: str, config: str, title: str) -> bool:
+    if state is not None and state.unchanged(task, key, config):
+        _log(bar, f"{task.host}: {title}: unchanged since last commit, skipped.")
+        return True
+    return False
+
+def _diff_sections(diff: str) -> dict[str | None, list[str]]:
+    """Group the changed lines of an EOS session diff by top-level configuration section.
+
+    The section of a changed line is only known when its hunk shows the section header, the changed
+    lines of a hunk before any header are grouped under None.
+    """
+    sections: dict[str | None, list[str]] = {}
+    section = None
+    for line in diff.splitlines():
+        if line.startswith("@@"):
+            # The hunk can start deep in another section
+            section = None
             continue
-        else:
-            bar.console.log(f"{task.host}: Device is up")
-            return
-    return Result(host=task.host, failed=True, result="Failed to wait for device to be up")
+        if not line or line.startswith(("---", "+++")):
+            continue
+        marker, text = line[0], line[1:]
+        if text.strip() in ("!", "end"):
+            # Section separator
+            section = None
+            continue
+        if text and not text[0].isspace():
+            section = text.strip()
+        if marker in "+-":
+            sections.setdefault(section, []).append(line)
+    return sections
 
 #############
 # Templates #
@@ -46,7 +102,14 @@ def apply_templates(
     folder: Path,
     replace: bool = False,
     groups: bool = False,
+    merged: bool = False,
+    state: FingerprintStore | None = None,
+    report: DiffReport | None = None,
 ) -> None:
+    if replace or report is not None:
+        # A replaced configuration only contains the pushed snippets, nothing can be skipped
+        # and a dry run must not trust the current running-config
+        state = None
     if not folder.exists():
         raise Exception(f"Could not find template folder {folder}")
     templates = []
@@ -58,6 +121,11 @@ def apply_templates(
         for file in filenames:
             if file.endswith(".j2"):
                 templates.append((dirpath, file, group))
+    # Templates with no group first, then by path
+    templates.sort(key=lambda t: (t[2] is not None, t[0], t[1]))
+
+    def _template_key(t: tuple[str, str, str | None]) -> str:
+        return f"template:{Path(t[0], t[1]).relative_to(folder)}"
     with Progress() as bar:
         task_id = bar.add_task(
             "Apply configuration templates to devices",
@@ -79,11 +147,54 @@ def apply_templates(
                     hosts=nornir.inventory.hosts,
                     groups=nornir.inventory.groups,
                 )
-                _safe_push(task, bar, config=output.result, title=template, replace=replace)
+                if not _unchanged(task, bar, state, key=_template_key(t), config=output.result, title=template):
+                    _safe_push(task, bar, config=output.result, title=template, replace=replace, report=report)
+                    if state is not None:
+                        state.record(task, _template_key(t), output.result)
                 bar.update(task_id, advance=1)
+            if state is not None:
+                state.save(task)
 
-
-        results = nornir.run(task=apply_templates)
+        def apply_templates_merged(task: Task):
+            rendered = []
+            for t in templates:
+                if groups and not (
+                    (group := t[2]) is None or group in task.host.groups
+                ):
+                    continue
+                output = task.run(
+                    task=template_file,
+                    template=t[1],
+                    path=t[0],
+                    hosts=nornir.inventory.hosts,
+                    groups=nornir.inventory.groups,
+                )
+                if not _unchanged(task, bar, state, key=_template_key(t), config=output.result, title=t[1]):
+                    rendered.append((_template_key(t), t[1], output.result))
+            if rendered:
+                config = "".join(c if c.endswith("\n") else f"{c}\n" for _, _, c in rendered)
+                try:
+                    _safe_push(task, bar, config=config, title=", ".join(t for _, t, _ in rendered), replace=replace, report=report)
+                except NornirSubTaskError as e:
+                    # Commit the templates one by one to find the faulty template
+                    _log(bar, f"{task.host}: Merged commit of {len(rendered)} templates failed, applying templates one by one.")
+                    for key, template, c in rendered:
+                        _safe_push(task, bar, config=c, title=template, replace=replace, report=report)
+                        if state is not None:
+                            state.record(task, key, c)
+                    # Every template was committed on its own, the merged commit does not fail the host
+                    for r in e.result:
+                        r.failed = False
+                        r.severity_level = logging.WARNING
+                else:
+                    if state is not None:
+                        for key, _, c in rendered:
+                            state.record(task, key, c)
+            if state is not None:
+                state.save(task)
+            bar.update(task_id, advance=len(templates))
+
+        results = nornir.run(task=apply_templates_merged if merged else apply_templates)
         if results.failed:
             _print_failed_tasks(bar, results)
 
@@ -97,26 +208,95 @@ DIR_FLASH_CMD = "dir flash:"
 BACKUP_FILENAME = "rollback-config"
 
 
-def create_backups(nornir: nornir.core.Nornir, wait_for: int = 0) -> None:
+def _backup_exists(listing: str) -> bool:
+    """Look for the backup file name in the output of 'dir flash:', ignoring files like 'rollback-config.old'."""
+    return any(line.split()[-1:] == [BACKUP_FILENAME] for line in listing.splitlines())
+
+
+def _backup_commands(command: str) -> list[str]:
+    """List the backup file and run a command on it in a single eAPI request.
+
+    The request fails on the listing if the backup does not exist so the command is not run.
+    """
+    return [f"{DIR_FLASH_CMD}{BACKUP_FILENAME}", command]
+
+
+def _backup_missing(output: list) -> bool:
+    """Tell from the outputs of a failed `_backup_commands` request if the backup does not exist."""
+    if len(output) < 2:
+        # The listing failed
+        return True
+    return not _backup_exists(output[0].get("output", ""))
+
+
+def _eapi_node(task: Task) -> Any | None:
+    """The pyeapi node of the NAPALM connection, None with the NAPALM ssh transport."""
+    device = task.host.get_connection("napalm", task.nornir.config).device
+    return device if hasattr(device, "run_commands") else None
+
+
+def _run_commands(task: Task, commands: list[str]) -> list:
+    """Send commands in a single eAPI request over the NAPALM connection."""
+    if (node := _eapi_node(task)) is None:
+        raise Exception(
+            f"{task.host}: sending several commands in one request requires the eAPI transport of NAPALM, "
+            f"not '{task.host.get_connection('napalm', task.nornir.config).transport}'"
+        )
+    with tracing.span(task.host.name, "run_commands"):
+        return node.run_commands(commands, encoding="text")
+
+
+def _run_backup_command(task: Task, command: str) -> bool:
+    """Run a command on the backup file if it exists. Returns False if the backup does not exist.
+
+    Over eAPI, the listing and the command are sent in a single request. With the NAPALM ssh transport,
+    failed commands do not raise: the backup is listed first and the command is sent on its own.
+    """
+    if _eapi_node(task) is None:
+        r = task.run(task=napalm_cli, commands=[DIR_FLASH_CMD])
+        if not _backup_exists(r.result[DIR_FLASH_CMD]):
+            return False
+        task.run(task=napalm_cli, commands=[command])
+        return True
+    try:
+        _run_commands(task, _backup_commands(command))
+    except CommandError as e:
+        # Skip the output of the 'enable' command
+        if _backup_missing((e.output or [])[1:]):
+            return False
+        raise
+    return True
+
+
+def create_backups(
+    nornir: nornir.core.Nornir,
+    wait_for: int = 0,
+    wait_timeout: float | None = None,
+    backend: Backend = "nornir",
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> None:
+    if backend == "eapi":
+        from . import fleet
+
+        return fleet.create_backups(nornir, wait_for=wait_for, wait_timeout=wait_timeout, concurrency=concurrency)
     with Progress() as bar:
         task_id = bar.add_task(
             "Backup configuration to flash", total=len(nornir.inventory.hosts)
         )
 
         def create_backup(task: Task):
-            if wait_for:
-                task.run(task=wait_for_device, bar=bar, wait_for=wait_for)
+            if wait_for or wait_timeout:
+                task.run(task=wait_for_device, bar=bar, wait_for=wait_for, timeout=wait_timeout)
             r = task.run(task=napalm_cli, commands=[DIR_FLASH_CMD])
-            for res in r:
-                if BACKUP_FILENAME in res.result[DIR_FLASH_CMD]:
-                    bar.console.log(f"{task.host}: Backup already present.")
-                    bar.update(task_id, advance=1)
-                    return
+            if _backup_exists(r.result[DIR_FLASH_CMD]):
+                _log(bar, f"{task.host}: Backup already present.")
+                bar.update(task_id, advance=1)
+                return
             task.run(
                 task=napalm_cli,
                 commands=[f"copy running-config flash:{BACKUP_FILENAME}"],
             )
-            bar.console.log(f"{task.host}: Backup created.")
+            _log(bar, f"{task.host}: Backup created.")
             bar.update(task_id, advance=1)
 
         results = nornir.run(task=create_backup)
@@ -124,51 +304,46 @@ def create_backups(nornir: nornir.core.Nornir, wait_for: int = 0) -> None:
             _print_failed_tasks(bar, results)
 
 
-def restore_backups(nornir: nornir.core.Nornir) -> None:
+def restore_backups(nornir: nornir.core.Nornir, backend: Backend = "nornir", concurrency: int = DEFAULT_CONCURRENCY) -> None:
+    if backend == "eapi":
+        from . import fleet
+
+        return fleet.restore_backups(nornir, concurrency=concurrency)
     with Progress() as bar:
         task_id = bar.add_task(
             "Restore backup configuration from flash", total=len(nornir.inventory.hosts)
         )
 
         def restore_backup(task: Task):
-            r = task.run(task=napalm_cli, commands=[DIR_FLASH_CMD])
-            for res in r:
-                if BACKUP_FILENAME in res.result[DIR_FLASH_CMD]:
-                    task.run(
-                        task=napalm_cli,
-                        commands=[f"configure replace flash:{BACKUP_FILENAME}"],
-                    )
-                    # Intentionally not copying running-config to startup-config here.
-                    # If there is a napalm_configure following a restore, configuration will be saved.
-                    # This behaviour is acceptable, user can retrieve previous configuration in startup-config
-                    # in case of mis-restoring the configuration.
-                    bar.console.log(f"{task.host}: Backup restored.")
-                    bar.update(task_id, advance=1)
-                    return
-            raise Exception(f"{task.host}: Backup not found.")
+            if not _run_backup_command(task, f"configure replace flash:{BACKUP_FILENAME}"):
+                raise Exception(f"{task.host}: Backup not found.")
+            # Intentionally not copying running-config to startup-config here.
+            # If there is a napalm_configure following a restore, configuration will be saved.
+            # This behaviour is acceptable, user can retrieve previous configuration in startup-config
+            # in case of mis-restoring the configuration.
+            _log(bar, f"{task.host}: Backup restored.")
+            bar.update(task_id, advance=1)
 
         results = nornir.run(task=restore_backup)
         if results.failed:
             _print_failed_tasks(bar, results)
 
 
-def delete_backups(nornir: nornir.core.Nornir) -> None:
+def delete_backups(nornir: nornir.core.Nornir, backend: Backend = "nornir", concurrency: int = DEFAULT_CONCURRENCY) -> None:
+    if backend == "eapi":
+        from . import fleet
+
+        return fleet.delete_backups(nornir, concurrency=concurrency)
     with Progress() as bar:
         task_id = bar.add_task(
             "Delete backup on flash", total=len(nornir.inventory.hosts)
         )
 
         def delete_backup(task: Task):
-            r = task.run(task=napalm_cli, commands=[DIR_FLASH_CMD])
-            for res in r:
-                if BACKUP_FILENAME in res.result[DIR_FLASH_CMD]:
-                    task.run(
-                        task=napalm_cli, commands=[f"delete flash:{BACKUP_FILENAME}"]
-                    )
-                    bar.console.log(f"{task.host}: Backup deleted.")
-                    bar.update(task_id, advance=1)
-                    return
-            bar.console.log(f"{task.host}: Backup not found.")
+            if _run_backup_command(task, f"delete flash:{BACKUP_FILENAME}"):
+                _log(bar, f"{task.host}: Backup deleted.")
+            else:
+                _log(bar, f"{task.host}: Backup not found.")
             bar.update(task_id, advance=1)
 
         results = nornir.run(task=delete_backup)
@@ -181,51 +356,100 @@ def delete_backups(nornir: nornir.core.Nornir) -> None:
 ###############################
 
 
-def save(nornir: nornir.core.Nornir, folder: Path) -> None:
-    with Progress() as bar:
-        task_id = bar.add_task(
-            "Save lab configuration", total=len(nornir.inventory.hosts)
-        )
+def _write_config(folder: Path, host: str, config: str) -> Path | None:
+    """Write the configuration of a host to the folder, unless the file already has this content."""
+    path = folder / f"{host}.cfg"
+    if path.exists() and path.read_text() == config:
+        return None
+    write_atomic(path, config)
+    return path
 
-        def save_config(task: Task):
-            task.run(task=napalm_cli, commands=["copy running-config startup-config"])
-            r = task.run(task=napalm_get, getters=["config"])
-            config = folder / f"{task.host}.cfg"
-            folder.mkdir(parents=True, exist_ok=True)
-            with open(config, "w") as file:
-                file.write(r[0].result["config"]["running"])
-            bar.console.log(f"{task.host}: Configuration saved to {config}")
-            bar.update(task_id, advance=1)
 
-        results = nornir.run(task=save_config)
-        if results.failed:
-            _print_failed_tasks(bar, results)
+def save(
+    nornir: nornir.core.Nornir,
+    folder: Path,
+    backend: Backend = "nornir",
+    concurrency: int = DEFAULT_CONCURRENCY,
+    snapshot: str | None = None,
+    store: SnapshotStore | None = None,
+) -> None:
+    if snapshot is not None and store is None:
+        store = SnapshotStore()
+    if backend == "eapi":
+        from . import fleet
+
+        fleet.save(nornir, folder, concurrency=concurrency, store=store if snapshot is not None else None)
+    else:
+        with Progress() as bar:
+            task_id = bar.add_task(
+                "Save lab configuration", total=len(nornir.inventory.hosts)
+            )
+
+            def save_config(task: Task):
+                task.run(task=napalm_cli, commands=["copy running-config startup-config"])
+                r = task.run(task=napalm_get, getters=["config"], getters_options={"config": {"retrieve": "running"}})
+                running = r[0].result["config"]["running"]
+                if (config := _write_config(folder, task.host.name, running)) is not None:
+                    _log(bar, f"{task.host}: Configuration saved to {config}")
+                else:
+                    _log(bar, f"{task.host}: Configuration unchanged in {folder}")
+                if snapshot is not None:
+                    store.put(task.host.name, running)
+                bar.update(task_id, advance=1)
+
+            results = nornir.run(task=save_config)
+            if results.failed:
+                _print_failed_tasks(bar, results)
+    if snapshot is not None:
+        path = store.commit(snapshot)
+        logger.info(f"Snapshot '{snapshot}' saved to {path}")
 
 
-def load(nornir: nornir.core.Nornir, folder: Path, replace: bool = False) -> None:
+def load(
+    nornir: nornir.core.Nornir,
+    folder: Path,
+    replace: bool = False,
+    snapshot: Snapshot | None = None,
+    raw: bool = False,
+    report: DiffReport | None = None,
+) -> None:
+    """Load the configuration files of the folder, or of a snapshot, to the devices.
+
+    The files are rendered as Jinja templates unless `raw` is set. Raw files and snapshots are
+    sent as is and are not pushed to the devices already running this exact configuration.
+    The snapshot is opened with `SnapshotStore.open` before the backups so that an invalid
+    snapshot does not fail every device.
+    """
     with Progress() as bar:
         task_id = bar.add_task(
             "Load lab configuration", total=len(nornir.inventory.hosts)
         )
 
         def load_config(task: Task):
-            config = folder / f"{task.host}.cfg"
-            if not config.exists():
-                raise Exception(
-                    f"Configuration of {task.host} not found in folder {folder}"
-                )
-            output = task.run(
-                task=template_file, template=f"{task.host}.cfg", path=folder
-            )
-            task.run(
-                task=napalm_configure,
-                dry_run=False,
-                replace=replace,
-                configuration=output.result,
-                revert_in=30,
-            )
-            r = task.run(task=napalm_confirm_commit)
-            bar.console.log(f"{task.host}: {r.result}")
+            title = f"snapshot {snapshot.name}" if snapshot is not None else f"{task.host}.cfg"
+            if snapshot is not None:
+                # Snapshots store the running-config as is, it is not a template
+                configuration = snapshot.read_config(task.host.name)
+            else:
+                config = folder / f"{task.host}.cfg"
+                if not config.exists():
+                    raise Exception(
+                        f"Configuration of {task.host} not found in folder {folder}"
+                    )
+                if raw:
+                    configuration = config.read_text()
+                else:
+                    output = task.run(
+                        task=template_file, template=f"{task.host}.cfg", path=folder
+                    )
+                    configuration = output.result
+            if (raw or snapshot is not None) and normalize_config(configuration) == normalize_config(running_config(task)):
+                _log(bar, f"{task.host}: Configuration unchanged, skipping")
+                if report is not None:
+                    report.add(task.host.name, title, None)
+                bar.update(task_id, advance=1)
+                return
+            _safe_push(task, bar, config=configuration, title=title, replace=replace, report=report)
             bar.update(task_id, advance=1)
 
         results = nornir.run(task=load_config)
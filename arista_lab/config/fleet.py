@@ -0,0 +1,141 @@
+"""CLI-only configuration operations over the asyncio eAPI backend."""
+import asyncio
+import time
+from pathlib import Path
+
+import nornir
+from nornir.core.inventory import Host
+from rich.progress import Progress
+from arista_lab import tracing
+from arista_lab.console import _log, _print_failed_hosts
+from arista_lab.eapi import AsyncEapiClient, EapiCommandError, run_on_hosts
+
+from arista_lab.snapshots import SnapshotStore
+
+from . import DIR_FLASH_CMD, BACKUP_FILENAME, DEFAULT_CONCURRENCY, _backup_exists, _backup_commands, _backup_missing, _write_config
+from .readiness import backoff
+
+
+async def _wait_for_device(host: Host, client: AsyncEapiClient, bar: Progress, wait_for: int = 0, timeout: float | None = None) -> None:
+    deadline = time.monotonic() + timeout if timeout else None
+    delays = backoff()
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            await client.run_cmds(["show version"])
+            _log(bar, f"{host}: Device is up")
+            return
+        except Exception as e:
+            _log(bar, f"{host}: Attempt {attempt}{f'/{wait_for}' if wait_for else ''} failed: {e}")
+        if wait_for and attempt >= wait_for:
+            break
+        delay = next(delays)
+        if deadline is not None:
+            if (remaining := deadline - time.monotonic()) <= 0:
+                break
+            delay = min(delay, remaining)
+        await asyncio.sleep(delay)
+    raise Exception(f"Failed to wait for device to be up after {attempt} attempt(s)")
+
+
+def _run(nornir: nornir.core.Nornir, bar: Progress, name: str, func, concurrency: int) -> None:
+    async def traced(host: Host, client: AsyncEapiClient):
+        with tracing.span(host.name, name):
+            return await func(host, client)
+
+    _, errors = asyncio.run(
+        run_on_hosts(nornir.inventory.hosts.values(), traced, concurrency=concurrency)
+    )
+    if errors:
+        _print_failed_hosts(bar, name, errors)
+
+
+def create_backups(nornir: nornir.core.Nornir, wait_for: int = 0, wait_timeout: float | None = None, concurrency: int = DEFAULT_CONCURRENCY) -> None:
+    with Progress() as bar:
+        task_id = bar.add_task(
+            "Backup configuration to flash", total=len(nornir.inventory.hosts)
+        )
+
+        async def create_backup(host: Host, client: AsyncEapiClient):
+            if wait_for or wait_timeout:
+                with tracing.span(host.name, "wait_for_device"):
+                    await _wait_for_device(host, client, bar, wait_for=wait_for, timeout=wait_timeout)
+            r = await client.run_cmds([DIR_FLASH_CMD], encoding="text")
+            if _backup_exists(r[0]["output"]):
+                _log(bar, f"{host}: Backup already present.")
+                bar.update(task_id, advance=1)
+                return
+            await client.run_cmds([f"copy running-config flash:{BACKUP_FILENAME}"], encoding="text")
+            _log(bar, f"{host}: Backup created.")
+            bar.update(task_id, advance=1)
+
+        _run(nornir, bar, "create_backup", create_backup, concurrency)
+
+
+def restore_backups(nornir: nornir.core.Nornir, concurrency: int = DEFAULT_CONCURRENCY) -> None:
+    with Progress() as bar:
+        task_id = bar.add_task(
+            "Restore backup configuration from flash", total=len(nornir.inventory.hosts)
+        )
+
+        async def restore_backup(host: Host, client: AsyncEapiClient):
+            try:
+                await client.run_cmds(_backup_commands(f"configure replace flash:{BACKUP_FILENAME}"), encoding="text")
+            except EapiCommandError as e:
+                if _backup_missing(e.output):
+                    raise Exception(f"{host}: Backup not found.")
+                raise
+            _log(bar, f"{host}: Backup restored.")
+            bar.update(task_id, advance=1)
+
+        _run(nornir, bar, "restore_backup", restore_backup, concurrency)
+
+
+def delete_backups(nornir: nornir.core.Nornir, concurrency: int = DEFAULT_CONCURRENCY) -> None:
+    with Progress() as bar:
+        task_id = bar.add_task(
+            "Delete backup on flash", total=len(nornir.inventory.hosts)
+        )
+
+        async def delete_backup(host: Host, client: AsyncEapiClient):
+            try:
+                await client.run_cmds(_backup_commands(f"delete flash:{BACKUP_FILENAME}"), encoding="text")
+                _log(bar, f"{host}: Backup deleted.")
+            except EapiCommandError as e:
+                if not _backup_missing(e.output):
+                    raise
+                _log(bar, f"{host}: Backup not found.")
+            bar.update(task_id, advance=1)
+
+        _run(nornir, bar, "delete_backup", delete_backup, concurrency)
+
+
+def save(nornir: nornir.core.Nornir, folder: Path, concurrency: int = DEFAULT_CONCURRENCY, store: SnapshotStore | None = None) -> None:
+    with Progress() as bar:
+        task_id = bar.add_task(
+            "Save lab configuration", total=len(nornir.inventory.hosts)
+        )
+
+        async def save_config(host: Host, client: AsyncEapiClient):
+            # Save to startup-config and get the running-config in a single request
+            r = await client.run_cmds(
+                ["copy running-config startup-config", "show running-config"],
+                encoding="text",
+            )
+            running = r[1]["output"]
+
+            def write() -> Path | None:
+                config = _write_config(folder, host.name, running)
+                if store is not None:
+                    store.put(host.name, running)
+                return config
+
+            # Write the files in a thread, the event loop keeps serving the other devices meanwhile
+            if (config := await asyncio.to_thread(write)) is not None:
+                _log(bar, f"{host}: Configuration saved to {config}")
+            else:
+                _log(bar, f"{host}: Configuration unchanged in {folder}")
+            bar.update(task_id, advance=1)
+
+        _run(nornir, bar, "save_config", save_config, concurrency)
@@ -1,84 +1,78 @@
 from pathlib import Path
+import re
 from importlib.resources import files
 from arista_lab import templates
-from yaml import safe_load
-import ipaddress
 
 from typing import Any
 import nornir
 from nornir.core.task import Task
 from rich.progress import Progress
-from arista_lab.console import _print_failed_tasks
+from arista_lab.console import _log_diff, _print_failed_tasks
+from arista_lab.links import DESCRIPTION_KEY, IPV4_KEY, IPV6_KEY, ISIS_KEY, parse_links
+from arista_lab.report import DiffReport
 
 from nornir_jinja2.plugins.tasks import template_file  # type: ignore[import-untyped]
 
-from . import _safe_push
+from . import _safe_push, _diff_sections, _unchanged
+from .state import FingerprintStore
 
-def configure(nornir: nornir.core.Nornir, file: Path) -> None:
-    DESCRIPTION_KEY = "description"
-    IPV4_KEY = "ipv4"
-    IPV4_SUBNET_KEY = "ipv4_subnet"
-    IPV6_KEY = "ipv6"
-    IPV6_SUBNET_KEY = "ipv6_subnet"
-    ISIS_KEY = "isis"
+INTERFACE_NAME_RE = re.compile(r"([A-Za-z-]+)\s*([\d/.]+)")
 
-    def _parse_links(file: Path):
-        interfaces: dict[str, Any] = {}
-        with file.open(mode="r", encoding="UTF-8") as f:
-            links = safe_load(f)["links"]
-            for link in links:
-                if len(link["endpoints"]) != 2:
-                    raise Exception(
-                        f"Cannot parse '{file}': entry with 'endpoints' key must have a value in the format '['device1:etN', 'device2:etN']'"
-                    )
-                # for device_id, neighbor_id in (range(2), range(1,-1,-1)):
-                device = link["endpoints"][0].split(":")[0]
-                neighbor = link["endpoints"][1].split(":")[0]
-                interface = link["endpoints"][0].split(":")[1]
-                neighbor_interface = link["endpoints"][1].split(":")[1]
-                if device not in interfaces:
-                    interfaces[device] = {}
-                if neighbor not in interfaces:
-                    interfaces[neighbor] = {}
-                interfaces[device][interface] = {
-                    DESCRIPTION_KEY: f"to {neighbor} {neighbor_interface}"
-                }
-                interfaces[neighbor][neighbor_interface] = {
-                    DESCRIPTION_KEY: f"to {device} {interface}"
-                }
-                if ISIS_KEY in link:
-                    interfaces[device][interface].update({ISIS_KEY: link[ISIS_KEY]})
-                    interfaces[neighbor][neighbor_interface].update(
-                        {ISIS_KEY: link[ISIS_KEY]}
-                    )
-                if IPV4_SUBNET_KEY in link:
-                    network = ipaddress.ip_network(link[IPV4_SUBNET_KEY])
-                    if network.prefixlen != 31:
-                        raise Exception(f"Subnet {network} is not a /31 subnet")
-                    interfaces[device][interface].update(
-                        {IPV4_KEY: f"{network[0]}/{network.prefixlen}"}
-                    )
-                    interfaces[neighbor][neighbor_interface].update(
-                        {IPV4_KEY: f"{network[1]}/{network.prefixlen}"}
-                    )
-                if IPV6_SUBNET_KEY in link:
-                    network = ipaddress.ip_network(link[IPV6_SUBNET_KEY])
-                    if network.prefixlen != 127:
-                        raise Exception(f"Subnet {network} is not a /127 subnet")
-                    interfaces[device][interface].update(
-                        {IPV6_KEY: f"{network[0]}/{network.prefixlen}"}
-                    )
-                    interfaces[neighbor][neighbor_interface].update(
-                        {IPV6_KEY: f"{network[1]}/{network.prefixlen}"}
-                    )
-        return interfaces
 
-    links = _parse_links(file)
+def _same_interface(name: str, other: str) -> bool:
+    """Compare interface names the way EOS does, e.g. 'et1' and 'Ethernet1' are the same interface."""
+    m, o = INTERFACE_NAME_RE.fullmatch(name.strip()), INTERFACE_NAME_RE.fullmatch(other.strip())
+    if m is None or o is None:
+        return name.strip().lower() == other.strip().lower()
+    short, long = sorted((m[1].lower(), o[1].lower()), key=len)
+    return long.startswith(short) and m[2] == o[2]
+
+
+def _interface_changes(diff: str, config: dict[str, str]) -> dict[str, list[str]] | None:
+    """Changed lines of a session diff per interface of `config`, the rendered configuration per interface.
+
+    A line is assigned to the interface section it is in when its hunk shows the section header, else
+    to the only interface whose rendered configuration contains the added line. Returns None if a
+    line cannot be assigned to an interface.
+    """
+    rendered = {interface: {line.strip() for line in c.splitlines()} for interface, c in config.items()}
+    changes: dict[str, list[str]] = {interface: [] for interface in config}
+    for section, lines in _diff_sections(diff).items():
+        if section is not None:
+            if not section.startswith("interface "):
+                return None
+            name = section.removeprefix("interface ")
+            if (interface := next((i for i in config if _same_interface(name, i)), None)) is None:
+                return None
+            changes[interface].extend(lines)
+            continue
+        for line in lines:
+            owners = [interface for interface, r in rendered.items() if line[1:].strip() in r]
+            if not line.startswith("+") or len(owners) != 1:
+                return None
+            changes[owners[0]].append(line)
+    return {interface: lines for interface, lines in changes.items() if lines}
+
+
+def configure(
+    nornir: nornir.core.Nornir,
+    file: Path,
+    batch: bool = False,
+    state: FingerprintStore | None = None,
+    report: DiffReport | None = None,
+) -> None:
+    links = parse_links(file)
+    if report is not None:
+        # A dry run must not trust the current running-config
+        state = None
     with Progress() as bar:
         task_id = bar.add_task(
             "Configure point-to-point interfaces", total=len(nornir.inventory.hosts)
         )
 
+        def _title(interface: str, params: dict[str, Any]) -> str:
+            return f"Interface {interface} ({'IPv4' if IPV4_KEY in params else ''} {'IPv6' if IPV6_KEY in params else ''} {'ISIS' if ISIS_KEY in params else ''}): {params[DESCRIPTION_KEY]}"
+
         def configure_interfaces(task: Task):
             for interface, params in links[task.host.name].items():
                 p = files(templates) / "interfaces"
@@ -88,9 +82,46 @@ def configure(nornir: nornir.core.Nornir, file: Path) -> None:
                     path=p,
                     interface={"name": interface, **params},
                 )
-                _safe_push(task, bar, config=output.result, title=f"Interface {interface} ({'IPv4' if IPV4_KEY in params else ''} {'IPv6' if IPV6_KEY in params else ''} {'ISIS' if ISIS_KEY in params else ''}): {params[DESCRIPTION_KEY]}")
+                if not _unchanged(task, bar, state, key=f"interface:{interface}", config=output.result, title=_title(interface, params)):
+                    _safe_push(task, bar, config=output.result, title=_title(interface, params), report=report)
+                    if state is not None:
+                        state.record(task, f"interface:{interface}", output.result)
+                bar.update(task_id, advance=1)
+            if state is not None:
+                state.save(task)
+
+        def configure_interfaces_batch(task: Task):
+            # Render all the interfaces of the device and push them in a single config session and commit
+            interfaces = links.get(task.host.name, {})
+            if not interfaces:
                 bar.update(task_id, advance=1)
+                return
+            p = files(templates) / "interfaces"
+            config = {}
+            for interface, params in interfaces.items():
+                output = task.run(
+                    task=template_file,
+                    template="point-to-point.j2",
+                    path=p,
+                    interface={"name": interface, **params},
+                )
+                if not _unchanged(task, bar, state, key=f"interface:{interface}", config=output.result, title=_title(interface, params)):
+                    config[interface] = output.result
+            if config:
+                diff = _safe_push(task, bar, config="\n".join(config.values()), title=f"{len(config)} point-to-point interfaces", log_diff=False, report=report)
+                # Report the changes per interface from the single session diff
+                if diff and report is None:
+                    if (changes := _interface_changes(diff, config)) is None:
+                        _log_diff(bar, task.host.name, f"{len(config)} point-to-point interfaces", diff)
+                    else:
+                        for interface, lines in changes.items():
+                            _log_diff(bar, task.host.name, _title(interface, interfaces[interface]), "\n".join(lines))
+                if state is not None:
+                    for interface, c in config.items():
+                        state.record(task, f"interface:{interface}", c)
+                    state.save(task)
+            bar.update(task_id, advance=1)
 
-        results = nornir.run(task=configure_interfaces)
+        results = nornir.run(task=configure_interfaces_batch if batch else configure_interfaces)
         if results.failed:
             _print_failed_tasks(bar, results)
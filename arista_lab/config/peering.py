@@ -1,57 +1,76 @@
-from importlib.resources import files
-from arista_lab import templates
-from datetime import datetime, timedelta
-import ipaddress
+from concurrent.futures import Future, ThreadPoolExecutor
+from arista_lab import templates, tracing
 
-import requests
 import nornir
 from nornir.core.task import Task
 from nornir.core.filter import F
 from rich.progress import Progress
-from arista_lab.console import _print_failed_tasks
-
-from nornir_jinja2.plugins.tasks import template_file  # type: ignore[import-untyped]
-
-from . import _safe_push
-
-
-def configure(nornir: nornir.core.Nornir, group: str, neighbor_group: str) -> None:
-    def _build_vars(asn: int):
-        start_time = datetime.now() - timedelta(days=10)
-        url = f"https://stat.ripe.net/data/announced-prefixes/data.json?resource=AS{asn}&starttime={start_time.strftime('%Y-%m-%dT%H:%M')}"
-        r = requests.get(url)
-        if r.ok:
-            prefixes = []
-            for prefix in r.json()["data"]["prefixes"]:
-                prefixes.append(prefix["prefix"])
-        else:
-            raise Exception(f"Could not get announced prefixes for AS{asn}")
-        networks = []
-        for network in [ipaddress.ip_network(p) for p in prefixes]:
-            if not any(
-                (network != n and network.overlaps(n))
-                for n in [ipaddress.ip_network(p) for p in prefixes]
-            ):
-                networks.append(network)
-
-        hosts = []
-        hosts_ipv6 = []
-        prefixes = []
-        prefixes_ipv6 = []
-        for network in networks:
-            if network.version == 4:
-                hosts.append(f"{next(network.hosts())}/{network.prefixlen}")
-                prefixes.append(str(network))
-            elif network.version == 6:
-                hosts_ipv6.append(f"{next(network.hosts())}/{network.prefixlen}")
-                prefixes_ipv6.append(str(network))
-
-        return {
-            "hosts": hosts,
-            "hosts_ipv6": hosts_ipv6,
-            "prefixes": prefixes,
-            "prefixes_ipv6": prefixes_ipv6,
-        }
+from arista_lab.console import _log, _print_failed_tasks
+from arista_lab.ripestat import PrefixCache
+from arista_lab.prefixes import non_overlapping
+
+from . import _safe_push, _unchanged
+from .state import FingerprintStore
+
+
+PREFETCH_WORKERS = 16
+
+
+def _build_vars(prefixes: list[str]) -> dict[str, list[str]]:
+    networks = non_overlapping(prefixes)
+
+    hosts = []
+    hosts_ipv6 = []
+    prefixes = []
+    prefixes_ipv6 = []
+    for network in networks:
+        if network.version == 4:
+            hosts.append(f"{next(network.hosts())}/{network.prefixlen}")
+            prefixes.append(str(network))
+        elif network.version == 6:
+            hosts_ipv6.append(f"{next(network.hosts())}/{network.prefixlen}")
+            prefixes_ipv6.append(str(network))
+
+    return {
+        "hosts": hosts,
+        "hosts_ipv6": hosts_ipv6,
+        "prefixes": prefixes,
+        "prefixes_ipv6": prefixes_ipv6,
+    }
+
+
+def prefetch(
+    nornir: nornir.core.Nornir,
+    group: str,
+    cache: PrefixCache,
+    workers: int = PREFETCH_WORKERS,
+) -> dict[int, Future]:
+    """Start building the variables of every distinct ASN of the peering group in the background.
+
+    Returns futures indexed by ASN so that device tasks only wait for their own ASN.
+    """
+    asns = {h.data["asn"] for h in nornir.filter(F(groups__contains=group)).inventory.hosts.values()}
+
+    def build_vars(asn: int) -> dict[str, list[str]]:
+        return _build_vars(cache.prefixes(asn))
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+    futures = {asn: executor.submit(build_vars, asn) for asn in asns}
+    # Let the fetches run to completion without blocking the caller
+    executor.shutdown(wait=False)
+    return futures
+
+
+def configure(
+    nornir: nornir.core.Nornir,
+    group: str,
+    neighbor_group: str,
+    cache: PrefixCache | None = None,
+    prefetched: dict[int, Future] | None = None,
+    state: FingerprintStore | None = None,
+) -> None:
+    if prefetched is None:
+        prefetched = prefetch(nornir, group, cache if cache is not None else PrefixCache())
 
     with Progress() as bar:
         task_id = bar.add_task(
@@ -61,12 +80,15 @@ def configure(nornir: nornir.core.Nornir, group: str, neighbor_group: str) -> No
 
         def configure_peering(task: Task):
             MAX_LOOPBACKS = 2100
-            vars = _build_vars(task.host.data["asn"])
-            bar.console.log(
+            with tracing.span(task.host.name, "wait_prefixes"):
+                vars = dict(prefetched[task.host.data["asn"]].result())
+            _log(
+                bar,
                 f"{task.host}: Configuring {len(vars['prefixes'])} IPv4 prefixes for ISP {task.host.data['isp']}"
             )
             # bar.console.log(f"{task.host}: {vars['prefixes']}")
-            bar.console.log(
+            _log(
+                bar,
                 f"{task.host}: Configuring {len(vars['prefixes_ipv6'])} IPv6 prefixes for ISP {task.host.data['isp']}"
             )
             # bar.console.log(f"{task.host}: {vars['prefixes_ipv6']}")
@@ -88,9 +110,14 @@ def configure(nornir: nornir.core.Nornir, group: str, neighbor_group: str) -> No
                 }
             )
 
-            p = files(templates) / "peering"
-            output = task.run(task=template_file, template="isp.j2", path=p, vars=vars)
-            _safe_push(task, bar, config=output.result, title=f"Peering with {task.nornir.inventory.groups[neighbor_group].data['network_name']}")
+            with tracing.span(task.host.name, "render_peering"):
+                config = templates.render("peering", "isp.j2", vars=vars)
+            title = f"Peering with {task.nornir.inventory.groups[neighbor_group].data['network_name']}"
+            if not _unchanged(task, bar, state, key="peering", config=config, title=title):
+                _safe_push(task, bar, config=config, title=title)
+                if state is not None:
+                    state.record(task, "peering", config)
+                    state.save(task)
             bar.update(task_id, advance=1)
 
         results = nornir.filter(F(groups__contains=group)).run(task=configure_peering)
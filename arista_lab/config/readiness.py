@@ -0,0 +1,88 @@
+import random
+import socket
+import time
+from typing import Iterator
+
+from nornir.core.task import Task, Result
+from rich.progress import Progress
+
+from arista_lab.console import _log
+
+EAPI_PORT = 443
+EAPI_HTTP_PORT = 80
+TCP_PROBE_TIMEOUT = 5.0
+BACKOFF_INITIAL = 1.0
+BACKOFF_MAX = 30.0
+BACKOFF_FACTOR = 2.0
+
+
+def backoff(
+    initial: float = BACKOFF_INITIAL,
+    maximum: float = BACKOFF_MAX,
+    factor: float = BACKOFF_FACTOR,
+) -> Iterator[float]:
+    """Exponential backoff delays with jitter so that booting devices are not probed in lockstep."""
+    delay = initial
+    while True:
+        yield delay / 2 + random.uniform(0, delay / 2)
+        delay = min(delay * factor, maximum)
+
+
+def _eapi_address(task: Task) -> tuple[str, int]:
+    params = task.host.get_connection_parameters("napalm")
+    optional_args = (params.extras or {}).get("optional_args") or {}
+    default_port = EAPI_HTTP_PORT if optional_args.get("transport") == "http" else EAPI_PORT
+    port = optional_args.get("port") or params.port or default_port
+    return params.hostname or task.host.name, int(port)
+
+
+def tcp_probe(address: tuple[str, int], timeout: float = TCP_PROBE_TIMEOUT) -> str | None:
+    """Return None if a TCP connection can be established, the error otherwise."""
+    try:
+        with socket.create_connection(address, timeout=timeout):
+            return None
+    except OSError as e:
+        return f"{address[0]}:{address[1]} unreachable ({e})"
+
+
+def eapi_probe(task: Task) -> str | None:
+    """Return None if the device answers 'show version' over eAPI, the error otherwise."""
+    try:
+        task.host.get_connection("napalm", task.nornir.config).cli(["show version"])
+        return None
+    except Exception as e:
+        # Do not reuse a connection opened while the device was booting
+        try:
+            task.host.close_connection("napalm")
+        except Exception:
+            pass
+        return f"eAPI not ready ({e.__class__.__name__}: {e})"
+
+
+def wait_for_device(task: Task, bar: Progress, wait_for: int = 0, timeout: float | None = None) -> Result:
+    """Probe only the host of this task until it is ready.
+
+    A cheap TCP connection to the eAPI port is attempted first, then 'show version' is sent over eAPI.
+    Attempts are spaced with exponential backoff and jitter and stop after `wait_for` attempts
+    or `timeout` seconds, whichever comes first.
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    address = _eapi_address(task)
+    delays = backoff()
+    attempt = 0
+    while True:
+        attempt += 1
+        error = tcp_probe(address) or eapi_probe(task)
+        if error is None:
+            _log(bar, f"{task.host}: Device is up")
+            return Result(host=task.host, result=f"Device is up after {attempt} attempt(s)")
+        _log(bar, f"{task.host}: Attempt {attempt}{f'/{wait_for}' if wait_for else ''} failed: {error}")
+        if wait_for and attempt >= wait_for:
+            break
+        delay = next(delays)
+        if deadline is not None:
+            if (remaining := deadline - time.monotonic()) <= 0:
+                break
+            delay = min(delay, remaining)
+        time.sleep(delay)
+    return Result(host=task.host, failed=True, result=f"Failed to wait for device to be up after {attempt} attempt(s)")
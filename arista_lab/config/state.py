@@ -0,0 +1,110 @@
+"""Fingerprints of the rendered configuration committed to the devices, used to skip unchanged pushes."""
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any
+
+from nornir.core.task import Task
+
+from arista_lab import tracing
+from arista_lab.files import write_atomic
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_FILE = Path(".lab-state.json")
+RUNNING_CONFIG_CMD = "show running-config"
+
+
+def fingerprint(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _command(key: str) -> str:
+    """The command recording a key, e.g. 'template' for 'template:bgp.j2'."""
+    return key.split(":", 1)[0]
+
+
+def normalize_config(config: str) -> str:
+    """Remove the comment header and trailing whitespace of a running-config so that equal configurations compare equal."""
+    lines = [line.rstrip() for line in config.splitlines()]
+    while lines and (lines[0].startswith("! ") or not lines[0]):
+        lines.pop(0)
+    while lines and not lines[-1]:
+        lines.pop()
+    return "\n".join(lines)
+
+
+def running_config(task: Task) -> str:
+    connection = task.host.get_connection("napalm", task.nornir.config)
+    with tracing.span(task.host.name, "running_config"):
+        return connection.cli([RUNNING_CONFIG_CMD])[RUNNING_CONFIG_CMD]
+
+
+class FingerprintStore:
+    """Hashes of the configuration snippets committed per host and key (template, interface...).
+
+    The snippets of a host are trusted only while the running-config of the device keeps the fingerprint
+    recorded after the last commit, so that changes made on the device are not hidden. When the commits
+    of a command change the device, the snippets recorded by the other commands are dropped as the
+    commits may have overwritten their lines.
+    """
+
+    def __init__(self, path: Path = DEFAULT_STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._hosts: dict[str, dict[str, Any]] = self._load()
+        self._checked: set[str] = set()
+        # Commands that recorded snippets per host since the last save
+        self._dirty: dict[str, set[str]] = {}
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        if not self.path.exists():
+            return {}
+        try:
+            with self.path.open(encoding="UTF-8") as f:
+                hosts = json.load(f)
+            if not isinstance(hosts, dict):
+                raise ValueError("not a JSON object")
+            return hosts
+        except ValueError as e:
+            logger.warning(f"Ignoring invalid state file {self.path}: {e}")
+            return {}
+
+    def _check_device(self, task: Task) -> None:
+        host = task.host.name
+        if host in self._checked:
+            return
+        self._checked.add(host)
+        state = self._hosts.get(host)
+        if state is not None and state.get("device") != fingerprint(normalize_config(running_config(task))):
+            logger.debug(f"{host}: running-config changed since the last run")
+            with self._lock:
+                self._hosts.pop(host)
+
+    def unchanged(self, task: Task, key: str, config: str) -> bool:
+        """Return True if `config` was committed for `key` and the device has not changed since."""
+        self._check_device(task)
+        return self._hosts.get(task.host.name, {}).get("configs", {}).get(key) == fingerprint(config)
+
+    def record(self, task: Task, key: str, config: str) -> None:
+        """Record that `config` has been committed for `key`."""
+        with self._lock:
+            self._hosts.setdefault(task.host.name, {}).setdefault("configs", {})[key] = fingerprint(config)
+            self._dirty.setdefault(task.host.name, set()).add(_command(key))
+
+    def save(self, task: Task) -> None:
+        """Record the running-config fingerprint of the device after the commits of the task and write the state file."""
+        host = task.host.name
+        with self._lock:
+            commands = self._dirty.pop(host, None)
+        if commands is None:
+            return
+        device = fingerprint(normalize_config(running_config(task)))
+        with self._lock:
+            state = self._hosts[host]
+            if state.get("device") != device:
+                state["configs"] = {key: f for key, f in state["configs"].items() if _command(key) in commands}
+            state["device"] = device
+            write_atomic(self.path, json.dumps(self._hosts, indent=2, sort_keys=True))
@@ -2,24 +2,46 @@ from rich.progress import Progress
 from nornir.core.exceptions import NornirSubTaskError
 from nornir.core.task import AggregatedResult
 
+from arista_lab.report import result_log
+
+
+def _log(bar: Progress, message: str) -> None:
+    result_log().log(bar, message)
+
+
+def _log_diff(bar: Progress, host: str, title: str, diff: str) -> None:
+    result_log().diff(bar, host, title, diff)
+
 
 def _print_failed_tasks(bar: Progress, results: AggregatedResult) -> None:
+    log = result_log()
     for host, multi_results in results.items():
         for r in multi_results:
             if r.failed:
                 if isinstance(r.exception, NornirSubTaskError):
                     # Do not display NornirSubTaskError
                     continue
+                title = f"{multi_results.name}/{r.name}"
                 if r.exception is not None:
-                    bar.console.log(
-                        f"Task {multi_results.name}/{r.name} failed for device {host}: {r.exception.__class__.__name__}"
+                    log.error(
+                        bar,
+                        host,
+                        title,
+                        f"Task {title} failed for device {host}: {r.exception.__class__.__name__}",
+                        str(r.exception),
                     )
-                    bar.console.log(r.exception)
                 elif r.result is not None:
-                    bar.console.log(
-                        f"Task {multi_results.name}/{r.name} failed for device {host}: {r.result}"
-                    )
+                    log.error(bar, host, title, f"Task {title} failed for device {host}:", str(r.result))
                 else:
-                    bar.console.log(
-                        f"Task {multi_results.name}/{r.name} failed for device {host}"
-                    )
\ No newline at end of file
+                    log.error(bar, host, title, f"Task {title} failed for device {host}")
+
+def _print_failed_hosts(bar: Progress, name: str, errors: dict[str, BaseException]) -> None:
+    log = result_log()
+    for host, exception in errors.items():
+        log.error(
+            bar,
+            host,
+            name,
+            f"Task {name} failed for device {host}: {exception.__class__.__name__}",
+            str(exception),
+        )
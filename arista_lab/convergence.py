@@ -0,0 +1,187 @@
+"""Measure the traffic loss caused by an event in the lab, e.g. an interface shutdown.
+
+The flows are started and their metrics polled at a high frequency while a trigger runs.
+Once the flows are stopped and all the frames in flight are received, the loss of each flow
+is converted to a loss-of-service duration using its transmit rate.
+"""
+import json
+import logging
+import subprocess
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+import nornir
+from nornir.core.task import Task
+import snappi  # type: ignore[import-untyped]
+from rich.table import Table
+
+from arista_lab.files import write_atomic
+from arista_lab.traffic import _get_metrics, start, stop
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 0.1
+DEFAULT_SETTLE = 5.0
+DEFAULT_DURATION = 30.0
+# Time for the frames in flight to be received once the flows are stopped
+DRAIN_TIME = 2.0
+
+Trigger = Callable[[], None]
+
+
+def shell_trigger(command: str) -> Trigger:
+    def trigger() -> None:
+        r = subprocess.run(command, shell=True, capture_output=True, text=True)
+        if r.returncode != 0:
+            raise Exception(f"Trigger command '{command}' failed with exit code {r.returncode}: {r.stderr.strip()}")
+
+    return trigger
+
+
+def interface_trigger(nornir: nornir.core.Nornir, host: str, interface: str, shutdown: bool = True) -> Trigger:
+    """Shut or enable an interface with a single eAPI request over the NAPALM connection of the host."""
+    from arista_lab.config import _run_commands
+
+    commands = ["configure", f"interface {interface}", "shutdown" if shutdown else "no shutdown", "end"]
+
+    def interface_state(task: Task) -> list:
+        return _run_commands(task, commands)
+
+    def trigger() -> None:
+        results = nornir.filter(name=host).run(task=interface_state)
+        if host not in results:
+            raise Exception(f"Device {host} not found in the inventory")
+        if results.failed:
+            raise Exception(f"Could not run '{', '.join(commands[1:3])}' on {host}: {results[host].exception}")
+
+    return trigger
+
+
+@dataclass
+class FlowConvergence:
+    frames_tx: int
+    frames_rx: int
+    loss: int
+    # Transmit rate measured while polling, in frames per second
+    tx_rate: float
+    # Loss converted to a duration at the transmit rate
+    loss_duration_ms: float
+    # Time of the first and last polling intervals without any frame received, from the trigger
+    outage_start_ms: float | None
+    outage_end_ms: float | None
+
+
+def _flow_convergence(
+    frames_tx: int, frames_rx: int, points: list[tuple[float, tuple[int, int]]], triggered: float
+) -> FlowConvergence:
+    """Convergence of a flow from its final counters and its (time, (frames_tx, frames_rx)) samples."""
+    tx_rate = 0.0
+    if len(points) > 1 and points[-1][0] > points[0][0]:
+        tx_rate = (points[-1][1][0] - points[0][1][0]) / (points[-1][0] - points[0][0])
+    outage = [
+        (t0 - triggered, t1 - triggered)
+        for (t0, (tx0, rx0)), (t1, (tx1, rx1)) in zip(points, points[1:])
+        if tx1 > tx0 and rx1 == rx0 and t1 > triggered
+    ]
+    loss = max(frames_tx - frames_rx, 0)
+    return FlowConvergence(
+        frames_tx=frames_tx,
+        frames_rx=frames_rx,
+        loss=loss,
+        tx_rate=round(tx_rate, 1),
+        loss_duration_ms=round(1000 * loss / tx_rate, 1) if tx_rate else 0.0,
+        outage_start_ms=round(1000 * outage[0][0], 1) if outage else None,
+        outage_end_ms=round(1000 * outage[-1][1], 1) if outage else None,
+    )
+
+
+def measure(
+    api: snappi.Api,
+    trigger: Trigger,
+    names: list[str] | None = None,
+    interval: float = DEFAULT_INTERVAL,
+    settle: float = DEFAULT_SETTLE,
+    duration: float = DEFAULT_DURATION,
+) -> dict[str, Any]:
+    """Start the flows, run the trigger after `settle` seconds, poll the flow metrics for `duration` seconds and stop the flows.
+
+    The trigger runs in a thread so that polling goes on while it runs. Returns the report.
+    """
+    samples: list[tuple[float, dict[str, tuple[int, int]]]] = []
+
+    def poll() -> None:
+        flows = _get_metrics(api, ("flow",), names)["flow"]
+        samples.append((time.monotonic(), {f.name: (f.frames_tx or 0, f.frames_rx or 0) for f in flows}))
+
+    def poll_until(deadline: float) -> None:
+        while (now := time.monotonic()) < deadline:
+            poll()
+            time.sleep(max(interval - (time.monotonic() - now), 0))
+
+    start(api)
+    trigger_error: BaseException | None = None
+    trigger_end: float | None = None
+    try:
+        poll_until(time.monotonic() + settle)
+
+        def run_trigger() -> None:
+            nonlocal trigger_error, trigger_end
+            try:
+                trigger()
+            except Exception as e:
+                trigger_error = e
+            trigger_end = time.monotonic()
+
+        triggered = time.monotonic()
+        thread = threading.Thread(target=run_trigger, daemon=True)
+        thread.start()
+        poll_until(triggered + duration)
+        thread.join()
+    finally:
+        stop(api)
+    time.sleep(DRAIN_TIME)
+    final = {f.name: f for f in _get_metrics(api, ("flow",), names)["flow"]}
+    if trigger_error is not None:
+        logger.error(f"Trigger failed: {trigger_error}")
+
+    flows = {
+        name: _flow_convergence(f.frames_tx or 0, f.frames_rx or 0, [(t, s[name]) for t, s in samples if name in s], triggered)
+        for name, f in final.items()
+    }
+    return {
+        "interval_ms": interval * 1000,
+        "samples": len(samples),
+        "trigger_duration_ms": round(1000 * (trigger_end - triggered), 1) if trigger_end is not None else None,
+        "trigger_error": str(trigger_error) if trigger_error is not None else None,
+        "max_loss_duration_ms": max((f.loss_duration_ms for f in flows.values()), default=0.0),
+        "total_loss": sum(f.loss for f in flows.values()),
+        "flows": {name: asdict(f) for name, f in flows.items()},
+    }
+
+
+def write_report(path: Path, report: dict[str, Any]) -> None:
+    write_atomic(path, json.dumps(report, indent=2))
+
+
+def report_table(report: dict[str, Any], rows: int = 20) -> Table:
+    flows = sorted(report["flows"].items(), key=lambda f: (-f[1]["loss_duration_ms"], f[0]))
+    table = Table(
+        title=f"Convergence: {report['max_loss_duration_ms']:.1f}ms max loss of service, {report['total_loss']} frames lost",
+        caption=f"{len(flows) - rows} more flows" if len(flows) > rows else None,
+    )
+    for column in ("Flow", "Tx Frames", "Rx Frames", "Loss", "Tx FPS", "Loss Duration (ms)", "Outage (ms)"):
+        table.add_column(column, justify="left" if column == "Flow" else "right")
+    for name, f in flows[:rows]:
+        table.add_row(
+            name,
+            str(f["frames_tx"]),
+            str(f["frames_rx"]),
+            str(f["loss"]),
+            f"{f['tx_rate']:.0f}",
+            f"{f['loss_duration_ms']:.1f}",
+            f"{f['outage_start_ms']:.0f} - {f['outage_end_ms']:.0f}" if f["outage_start_ms"] is not None else "",
+        )
+    return table
@@ -0,0 +1,242 @@
+"""asyncio eAPI JSON-RPC client driving many devices from a single event loop."""
+import asyncio
+import base64
+import json
+import logging
+from itertools import count
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Iterable
+
+from arista_lab import ssl_context
+
+if TYPE_CHECKING:
+    from nornir.core.inventory import Host
+
+logger = logging.getLogger(__name__)
+
+EAPI_PATH = "/command-api"
+DEFAULT_CONCURRENCY = 100
+DEFAULT_TIMEOUT = 60.0
+
+
+class EapiError(Exception):
+    pass
+
+
+class EapiCommandError(EapiError):
+    """A command of a runCmds request failed. `output` holds the results of the commands that ran."""
+
+    def __init__(self, message: str, code: int, output: list[Any]):
+        super().__init__(message)
+        self.code = code
+        self.output = output
+
+    @property
+    def failed_index(self) -> int:
+        """Index of the failed command in the request."""
+        return len(self.output) - 1
+
+
+class _ConnectionClosed(EapiError):
+    """The device closed the connection before sending any byte of the response."""
+
+
+class AsyncEapiClient:
+    """Minimal eAPI client keeping one HTTP/1.1 keep-alive connection per device."""
+
+    _ids = count(1)
+
+    def __init__(
+        self,
+        host: str,
+        username: str,
+        password: str | None = None,
+        port: int | None = None,
+        transport: str = "https",
+        timeout: float = DEFAULT_TIMEOUT,
+        enable_password: str | None = None,
+    ):
+        self.host = host
+        self.transport = transport
+        self.port = port or (443 if transport == "https" else 80)
+        self.timeout = timeout
+        self._enable: str | dict[str, str] = {"cmd": "enable", "input": enable_password} if enable_password else "enable"
+        self._auth = base64.b64encode(f"{username}:{password or ''}".encode()).decode()
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock = asyncio.Lock()
+        self.requests = 0
+
+    @classmethod
+    def from_host(cls, host: "Host", timeout: float = DEFAULT_TIMEOUT) -> "AsyncEapiClient":
+        """Build a client from the NAPALM connection parameters of a Nornir host.
+
+        The parameters are read where the NAPALM EOS driver reads them: `timeout` from the connection
+        extras, the port, transport and `enable_password` from `optional_args`.
+        """
+        params = host.get_connection_parameters("napalm")
+        extras = params.extras or {}
+        optional_args = extras.get("optional_args") or {}
+        return cls(
+            host=params.hostname or host.name,
+            username=params.username,
+            password=params.password,
+            # nornir_napalm only sets the port in optional_args when it is not there already
+            port=optional_args.get("port") or params.port,
+            # Any other transport, e.g. 'arista_lab.LabEapiConnection', is HTTPS
+            transport="http" if optional_args.get("transport") == "http" else "https",
+            timeout=extras.get("timeout", timeout),
+            enable_password=optional_args.get("enable_password"),
+        )
+
+    def __str__(self) -> str:
+        return f"{self.transport}://{self.host}:{self.port}"
+
+    async def __aenter__(self) -> "AsyncEapiClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(
+            self.host,
+            self.port,
+            ssl=ssl_context() if self.transport == "https" else None,
+        )
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (OSError, asyncio.IncompleteReadError):
+                pass
+        self._reader = self._writer = None
+
+    async def _request(self, body: bytes) -> bytes:
+        if self._writer is None:
+            await self._connect()
+        assert self._reader is not None and self._writer is not None
+        try:
+            self._writer.write(
+                (
+                    f"POST {EAPI_PATH} HTTP/1.1\r\n"
+                    f"Host: {self.host}\r\n"
+                    "Content-Type: application/json-rpc\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Authorization: Basic {self._auth}\r\n"
+                    "Connection: keep-alive\r\n\r\n"
+                ).encode()
+                + body
+            )
+            await self._writer.drain()
+            status_line = await self._reader.readuntil(b"\r\n")
+        except (ConnectionResetError, BrokenPipeError) as e:
+            raise _ConnectionClosed(f"{self}: connection closed by the device ({e.__class__.__name__})") from e
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                raise
+            raise _ConnectionClosed(f"{self}: connection closed by the device") from e
+        status = status_line.decode().split(" ", 2)
+        headers = {}
+        while (line := await self._reader.readuntil(b"\r\n")) != b"\r\n":
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while size := int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16):
+                chunks.append(await self._reader.readexactly(size))
+                await self._reader.readexactly(2)
+            await self._reader.readuntil(b"\r\n")
+            content = b"".join(chunks)
+        elif "content-length" in headers:
+            content = await self._reader.readexactly(int(headers["content-length"]))
+        else:
+            content = await self._reader.read()
+            headers["connection"] = "close"
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        if len(status) < 2 or status[1] != "200":
+            raise EapiError(f"{self}: HTTP {' '.join(status[1:]).strip()}")
+        return content
+
+    async def _send(self, body: bytes) -> bytes:
+        """Send a request and return the response content. Any error is raised as an EapiError."""
+        try:
+            return await asyncio.wait_for(self._request(body), self.timeout)
+        except asyncio.TimeoutError as e:
+            # Caught first, asyncio.TimeoutError is an OSError since Python 3.11
+            await self.close()
+            raise EapiError(f"{self}: request timed out after {self.timeout}s") from e
+        except _ConnectionClosed:
+            await self.close()
+            raise
+        except (OSError, asyncio.IncompleteReadError) as e:
+            await self.close()
+            raise EapiError(f"{self}: {e.__class__.__name__}: {e}") from e
+
+    async def run_cmds(
+        self,
+        commands: list[str | dict[str, Any]],
+        encoding: str = "json",
+        enable: bool = True,
+    ) -> list[Any]:
+        """Send commands in a single runCmds request and return their results."""
+        cmds = [self._enable, *commands] if enable else list(commands)
+        body = json.dumps(
+            {
+                "jsonrpc": "2.0",
+                "method": "runCmds",
+                "params": {"version": 1, "cmds": cmds, "format": encoding},
+                "id": next(self._ids),
+            }
+        ).encode()
+        async with self._lock:
+            reused = self._writer is not None
+            try:
+                content = await self._send(body)
+            except _ConnectionClosed:
+                if not reused:
+                    raise
+                # The device closed the idle keep-alive connection before answering, retry once on a new one.
+                # A timeout is never retried, the device may still be running the commands.
+                content = await self._send(body)
+            self.requests += 1
+        logger.debug(f"{self}: {commands}")
+        response = json.loads(content)
+        if "error" in response:
+            error = response["error"]
+            output = error.get("data", [])
+            if enable and output:
+                output = output[1:]
+            message = error.get("message", "")
+            if output and isinstance(output[-1], dict) and "errors" in output[-1]:
+                message = " ".join(output[-1]["errors"])
+            raise EapiCommandError(f"{self}: {message}", error.get("code", 0), output)
+        result = response["result"]
+        return result[1:] if enable else result
+
+
+async def run_on_hosts(
+    hosts: Iterable["Host"],
+    func: Callable[["Host", AsyncEapiClient], Awaitable[Any]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> tuple[dict[str, Any], dict[str, BaseException]]:
+    """Run `func` for every host with at most `concurrency` hosts in flight.
+
+    Returns the results and the exceptions indexed by host name.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results: dict[str, Any] = {}
+    errors: dict[str, BaseException] = {}
+
+    async def run(host: "Host") -> None:
+        async with semaphore:
+            try:
+                async with AsyncEapiClient.from_host(host) as client:
+                    results[host.name] = await func(host, client)
+            except Exception as e:
+                errors[host.name] = e
+
+    await asyncio.gather(*(run(h) for h in hosts))
+    return results, errors
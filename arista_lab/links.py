@@ -0,0 +1,72 @@
+"""Point-to-point links of the lab described in a YAML file.
+
+``` yaml
+links:
+  - endpoints: ["bas:et1", "ban:et1"]
+    ipv4_subnet: 10.186.59.0/31
+    ipv6_subnet: fc00:10:186:59::/127
+    isis:
+      instance: ISIS
+      metric: 1
+```
+
+The first endpoint gets the first address of the subnets, the second endpoint the second address.
+"""
+import ipaddress
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from yaml import safe_load
+
+DESCRIPTION_KEY = "description"
+IPV4_KEY = "ipv4"
+IPV4_SUBNET_KEY = "ipv4_subnet"
+IPV6_KEY = "ipv6"
+IPV6_SUBNET_KEY = "ipv6_subnet"
+ISIS_KEY = "isis"
+
+
+class Link(NamedTuple):
+    endpoints: tuple[tuple[str, str], tuple[str, str]]
+    ipv4_subnet: ipaddress.IPv4Network | None
+    ipv6_subnet: ipaddress.IPv6Network | None
+    isis: dict[str, Any] | None
+
+
+def read_links(file: Path) -> list[Link]:
+    links = []
+    with file.open(mode="r", encoding="UTF-8") as f:
+        for link in safe_load(f)["links"]:
+            if len(link["endpoints"]) != 2:
+                raise Exception(
+                    f"Cannot parse '{file}': entry with 'endpoints' key must have a value in the format '['device1:etN', 'device2:etN']'"
+                )
+            endpoints = tuple((e.split(":")[0], e.split(":")[1]) for e in link["endpoints"])
+            ipv4_subnet = ipv6_subnet = None
+            if IPV4_SUBNET_KEY in link:
+                ipv4_subnet = ipaddress.ip_network(link[IPV4_SUBNET_KEY])
+                if ipv4_subnet.prefixlen != 31:
+                    raise Exception(f"Subnet {ipv4_subnet} is not a /31 subnet")
+            if IPV6_SUBNET_KEY in link:
+                ipv6_subnet = ipaddress.ip_network(link[IPV6_SUBNET_KEY])
+                if ipv6_subnet.prefixlen != 127:
+                    raise Exception(f"Subnet {ipv6_subnet} is not a /127 subnet")
+            links.append(Link(endpoints, ipv4_subnet, ipv6_subnet, link.get(ISIS_KEY)))  # type: ignore[arg-type]
+    return links
+
+
+def parse_links(file: Path) -> dict[str, dict[str, dict[str, Any]]]:
+    """Parameters of the point-to-point interfaces indexed by device and interface name."""
+    interfaces: dict[str, Any] = {}
+    for link in read_links(file):
+        for side, (device, interface) in enumerate(link.endpoints):
+            neighbor, neighbor_interface = link.endpoints[1 - side]
+            params: dict[str, Any] = {DESCRIPTION_KEY: f"to {neighbor} {neighbor_interface}"}
+            if link.isis is not None:
+                params[ISIS_KEY] = link.isis
+            if link.ipv4_subnet is not None:
+                params[IPV4_KEY] = f"{link.ipv4_subnet[side]}/{link.ipv4_subnet.prefixlen}"
+            if link.ipv6_subnet is not None:
+                params[IPV6_KEY] = f"{link.ipv6_subnet[side]}/{link.ipv6_subnet.prefixlen}"
+            interfaces.setdefault(device, {})[interface] = params
+    return interfaces
@@ -0,0 +1,149 @@
+"""Open Traffic Generator configuration generated from the lab links.
+
+The traffic generator ports are the link endpoints whose device is not in the Nornir inventory.
+Each port gets an emulated device with the link addresses, the lab device at the other end
+of the link being the gateway. Flows are then created between these devices following a pattern.
+
+The configuration is written as JSON following the OTG schema, one flow at a time: building
+thousands of flows as snappi objects and serializing them takes much longer than the lab needs
+to converge.
+"""
+import json
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Literal, NamedTuple
+
+from arista_lab.files import open_atomic
+from arista_lab.links import read_links
+
+Pattern = Literal["mesh", "pairwise", "hub"]
+PATTERNS = ("mesh", "pairwise", "hub")
+DEFAULT_LOCATION = "{interface}"
+DEFAULT_FRAME_SIZE = 128
+DEFAULT_RATE_PPS = 100
+
+
+class GeneratorPort(NamedTuple):
+    name: str
+    location: str
+    mac: str
+    # (address, gateway, prefix length) per IP version
+    ipv4: tuple[str, str, int] | None
+    ipv6: tuple[str, str, int] | None
+
+
+def generator_ports(links: Path, hosts: Iterable[str], location: str = DEFAULT_LOCATION) -> list[GeneratorPort]:
+    """Traffic generator ports connected to the lab devices `hosts`.
+
+    `location` is formatted with the `device` and `interface` of the link endpoint.
+    """
+    hosts = set(hosts)
+    ports = []
+    for link in read_links(links):
+        for side, (device, interface) in enumerate(link.endpoints):
+            if device in hosts or link.endpoints[1 - side][0] not in hosts:
+                continue
+            index = len(ports) + 1
+            ipv4 = ipv6 = None
+            if link.ipv4_subnet is not None:
+                ipv4 = (str(link.ipv4_subnet[side]), str(link.ipv4_subnet[1 - side]), link.ipv4_subnet.prefixlen)
+            if link.ipv6_subnet is not None:
+                ipv6 = (str(link.ipv6_subnet[side]), str(link.ipv6_subnet[1 - side]), link.ipv6_subnet.prefixlen)
+            ports.append(
+                GeneratorPort(
+                    name=f"{device}_{interface}",
+                    location=location.format(device=device, interface=interface),
+                    mac=f"02:00:{index >> 24 & 0xff:02x}:{index >> 16 & 0xff:02x}:{index >> 8 & 0xff:02x}:{index & 0xff:02x}",
+                    ipv4=ipv4,
+                    ipv6=ipv6,
+                )
+            )
+    return ports
+
+
+def _pairs(count: int, pattern: Pattern, hub: int = 0) -> Iterator[tuple[int, int]]:
+    """Indexes of the (source, destination) ports of the flows."""
+    if pattern == "mesh":
+        for src in range(count):
+            for dst in range(count):
+                if src != dst:
+                    yield src, dst
+    elif pattern == "pairwise":
+        for src in range(0, count - 1, 2):
+            yield src, src + 1
+            yield src + 1, src
+    elif pattern == "hub":
+        for other in range(count):
+            if other != hub:
+                yield hub, other
+                yield other, hub
+    else:
+        raise ValueError(f"Unknown flow pattern '{pattern}'")
+
+
+def _devices(ports: list[GeneratorPort]) -> list[dict[str, Any]]:
+    devices = []
+    for port in ports:
+        ethernet: dict[str, Any] = {
+            "name": f"{port.name}.eth",
+            "mac": port.mac,
+            "connection": {"choice": "port_name", "port_name": port.name},
+        }
+        if port.ipv4 is not None:
+            address, gateway, prefix = port.ipv4
+            ethernet["ipv4_addresses"] = [{"name": f"{port.name}.ipv4", "address": address, "gateway": gateway, "prefix": prefix}]
+        if port.ipv6 is not None:
+            address, gateway, prefix = port.ipv6
+            ethernet["ipv6_addresses"] = [{"name": f"{port.name}.ipv6", "address": address, "gateway": gateway, "prefix": prefix}]
+        devices.append({"name": f"{port.name}.dev", "ethernets": [ethernet]})
+    return devices
+
+
+def flows(
+    ports: list[GeneratorPort],
+    pattern: Pattern = "mesh",
+    hub: str | None = None,
+    size: int = DEFAULT_FRAME_SIZE,
+    rate_pps: int = DEFAULT_RATE_PPS,
+) -> Iterator[dict[str, Any]]:
+    """Generate the IPv4 and IPv6 flows between the devices of the ports following the pattern."""
+    names = [p.name for p in ports]
+    if hub is not None and hub not in names:
+        raise ValueError(f"Hub port '{hub}' is not a traffic generator port: {', '.join(names)}")
+    for src, dst in _pairs(len(ports), pattern, hub=names.index(hub) if hub is not None else 0):
+        for version in ("ipv4", "ipv6"):
+            if getattr(ports[src], version) is None or getattr(ports[dst], version) is None:
+                continue
+            yield {
+                "name": f"{ports[src].name}>{ports[dst].name}.{version}",
+                "tx_rx": {
+                    "choice": "device",
+                    "device": {
+                        "mode": "mesh",
+                        "tx_names": [f"{ports[src].name}.{version}"],
+                        "rx_names": [f"{ports[dst].name}.{version}"],
+                    },
+                },
+                "packet": [{"choice": "ethernet", "ethernet": {}}, {"choice": version, version: {}}],
+                "size": {"choice": "fixed", "fixed": size},
+                "rate": {"choice": "pps", "pps": str(rate_pps)},
+                "duration": {"choice": "continuous", "continuous": {}},
+                "metrics": {"enable": True, "loss": False, "timestamps": False},
+            }
+
+
+def write_config(path: Path, ports: list[GeneratorPort], flows: Iterable[dict[str, Any]]) -> int:
+    """Write the OTG configuration, streaming the flows one by one. Returns the number of flows."""
+    count = 0
+    with open_atomic(path) as f:
+        f.write(b'{"ports": ')
+        f.write(json.dumps([{"name": p.name, "location": p.location} for p in ports]).encode())
+        f.write(b', "devices": ')
+        f.write(json.dumps(_devices(ports)).encode())
+        f.write(b', "flows": [')
+        for flow in flows:
+            if count:
+                f.write(b", ")
+            f.write(json.dumps(flow).encode())
+            count += 1
+        f.write(b"]}\n")
+    return count
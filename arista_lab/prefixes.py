@@ -0,0 +1,33 @@
+"""Operations on large sets of IPv4 and IPv6 prefixes."""
+import ipaddress
+from typing import Iterable
+
+IPNetwork = ipaddress.IPv4Network | ipaddress.IPv6Network
+
+
+def non_overlapping(prefixes: Iterable[str]) -> list[IPNetwork]:
+    """Return the networks that do not overlap any other distinct network, in their original order.
+
+    Two CIDR prefixes either are disjoint or one contains the other. Once the ranges are sorted
+    by start address and by decreasing end address, a range overlaps a previous one if and only if
+    it starts before the largest end address seen so far. This runs in O(n log n).
+    """
+    networks = [ipaddress.ip_network(p) for p in prefixes]
+    # (version, start, -end) sorts containing networks before the networks they contain
+    keys = [(n.version, int(n.network_address), -int(n.broadcast_address)) for n in networks]
+    ranges = sorted(set(keys))
+    overlapping = set()
+    version = None
+    max_end = -1
+    holder: tuple[int, int, int] | None = None
+    for r in ranges:
+        if r[0] != version:
+            version, max_end, holder = r[0], -1, None
+        start, end = r[1], -r[2]
+        if start <= max_end:
+            # Contained in the network holding the largest end address so far
+            overlapping.add(r)
+            overlapping.add(holder)
+        if end > max_end:
+            max_end, holder = end, r
+    return [n for n, k in zip(networks, keys) if k not in overlapping]
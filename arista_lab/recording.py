@@ -0,0 +1,238 @@
+"""Time series of traffic generator metrics recorded to rotated JSONL files.
+
+Each line holds one sample of one kind of metrics (port, flow, bgpv4, bgpv6):
+
+    {"t": 1718000000.0, "kind": "flow", "metrics": {"flow1": [frames_tx, frames_rx, bytes_tx, bytes_rx], ...}}
+
+The values of each metric are listed in the order of `FIELDS[kind]`.
+"""
+import json
+import math
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+from rich.table import Table
+
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+DEFAULT_BACKUPS = 5
+BUFFER_SIZE = 1024 * 1024
+PERCENTILES = (50, 95, 99)
+
+COUNTERS = ("frames_tx", "frames_rx", "bytes_tx", "bytes_rx")
+FIELDS: dict[str, tuple[str, ...]] = {
+    "port": COUNTERS,
+    "flow": COUNTERS,
+    "bgpv4": ("session_state", "session_flap_count", "routes_advertised", "routes_received"),
+    "bgpv6": ("session_state", "session_flap_count", "routes_advertised", "routes_received"),
+}
+
+
+class MetricsRecorder:
+    """Append metric samples to a JSONL file, rotated to '<path>.1' ... '<path>.<backups>' when it exceeds `max_bytes`.
+
+    Writes are buffered, the file is flushed when the recorder is closed.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = DEFAULT_MAX_BYTES, backups: int = DEFAULT_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("a", encoding="UTF-8", buffering=BUFFER_SIZE)
+        # Tracked here, tell() would flush the buffer of a text file
+        self._size = self.path.stat().st_size
+
+    def __enter__(self) -> "MetricsRecorder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if (src := _rotated(self.path, i)).exists():
+                src.replace(_rotated(self.path, i + 1))
+        if self.backups > 0:
+            self.path.replace(_rotated(self.path, 1))
+        else:
+            self.path.unlink()
+        self._file = self.path.open("a", encoding="UTF-8", buffering=BUFFER_SIZE)
+        self._size = 0
+
+    def write(self, kind: str, stats: list[Any], t: float | None = None) -> None:
+        """Write a sample of snappi metrics of a kind, e.g. the `flow_metrics` of a metrics response."""
+        metrics = {s.name: [getattr(s, f) for f in FIELDS[kind]] for s in stats}
+        line = json.dumps({"t": time.time() if t is None else t, "kind": kind, "metrics": metrics}, separators=(",", ":"))
+        # JSON is ASCII-encoded, the length of the line is its size in bytes
+        if self._size > 0 and self._size + len(line) + 1 > self.max_bytes:
+            self._rotate()
+        self._file.write(line)
+        self._file.write("\n")
+        self._size += len(line) + 1
+
+
+def _rotated(path: Path, index: int) -> Path:
+    return path.with_name(f"{path.name}.{index}")
+
+
+def iter_samples(path: Path) -> Iterator[tuple[float, str, dict[str, dict[str, Any]]]]:
+    """Read the samples of a recording, rotated files first, as (time, kind, {name: {field: value}})."""
+    rotated = sorted(
+        (p for p in path.parent.glob(f"{path.name}.*") if p.suffix[1:].isdigit()),
+        key=lambda p: int(p.suffix[1:]),
+        reverse=True,
+    )
+    for file in [*rotated, path]:
+        if not file.exists():
+            continue
+        with file.open(encoding="UTF-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                sample = json.loads(line)
+                fields = FIELDS[sample["kind"]]
+                yield (
+                    sample["t"],
+                    sample["kind"],
+                    {name: dict(zip(fields, values)) for name, values in sample["metrics"].items()},
+                )
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Percentile of sorted values with linear interpolation."""
+    if not values:
+        return math.nan
+    k = (len(values) - 1) * p / 100
+    f = math.floor(k)
+    c = min(f + 1, len(values) - 1)
+    return values[f] + (values[c] - values[f]) * (k - f)
+
+
+@dataclass
+class CounterSummary:
+    """Totals of a port or a flow and the distribution of its receive rate over the recording."""
+
+    frames_tx: int = 0
+    frames_rx: int = 0
+    bytes_tx: int = 0
+    bytes_rx: int = 0
+    # Receive rate in frames per second of each interval between two samples
+    rx_rates: list[float] = field(default_factory=list)
+    # Duration of the intervals where frames were lost
+    loss_duration: float = 0.0
+
+    @property
+    def loss(self) -> int:
+        return max(self.frames_tx - self.frames_rx, 0)
+
+    @property
+    def loss_percent(self) -> float:
+        return 100 * self.loss / self.frames_tx if self.frames_tx else 0.0
+
+    def rx_rate_percentiles(self) -> dict[int, float]:
+        rates = sorted(self.rx_rates)
+        return {p: percentile(rates, p) for p in PERCENTILES}
+
+
+@dataclass
+class Summary:
+    start: float | None = None
+    end: float | None = None
+    ports: dict[str, CounterSummary] = field(default_factory=dict)
+    flows: dict[str, CounterSummary] = field(default_factory=dict)
+    # Number of session flaps of each BGP peer during the recording and its last session state
+    bgp: dict[str, tuple[int, str]] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start if self.start is not None and self.end is not None else 0.0
+
+
+def summarize(path: Path, flow_rates: bool = False) -> Summary:
+    """Compute the totals, loss and receive rate percentiles of a recording.
+
+    Totals are the sum of the deltas between samples so that counter resets are not lost.
+    Only the receive rates of the ports are kept unless `flow_rates` is set, so that memory
+    does not grow with the number of flows times the number of samples.
+    """
+    summary = Summary()
+    previous: dict[tuple[str, str], tuple[float, dict[str, Any]]] = {}
+    first_bgp: dict[str, int] = {}
+    for t, kind, metrics in iter_samples(path):
+        summary.start = t if summary.start is None else summary.start
+        summary.end = t
+        if kind in ("bgpv4", "bgpv6"):
+            for name, m in metrics.items():
+                flaps = m["session_flap_count"] or 0
+                first_bgp.setdefault(name, flaps)
+                summary.bgp[name] = (flaps - first_bgp[name], m["session_state"])
+            continue
+        counters = summary.ports if kind == "port" else summary.flows
+        for name, m in metrics.items():
+            s = counters.setdefault(name, CounterSummary())
+            if (prev := previous.get((kind, name))) is not None:
+                prev_t, prev_m = prev
+                d = {}
+                for c in COUNTERS:
+                    current, last = m[c] or 0, prev_m[c] or 0
+                    # A counter lower than the previous sample has been reset
+                    d[c] = current - last if current >= last else current
+                    setattr(s, c, getattr(s, c) + d[c])
+                if (elapsed := t - prev_t) > 0:
+                    if kind == "port" or flow_rates:
+                        s.rx_rates.append(d["frames_rx"] / elapsed)
+                    if d["frames_tx"] > d["frames_rx"]:
+                        s.loss_duration += elapsed
+            previous[(kind, name)] = (t, m)
+    return summary
+
+
+def summary_tables(summary: Summary, rows: int | None = None) -> list[Table]:
+    """Tables of the port rates, of the `rows` flows losing the most frames and of the BGP peers."""
+    tables = []
+    if summary.ports:
+        table = Table(title=f"Port Metrics ({summary.duration:.0f}s)")
+        for column in ("Port", "Tx Frames", "Rx Frames", *(f"Rx FPS p{p}" for p in PERCENTILES)):
+            table.add_column(column, justify="left" if column == "Port" else "right")
+        for name, s in sorted(summary.ports.items()):
+            table.add_row(name, str(s.frames_tx), str(s.frames_rx), *(f"{r:.0f}" for r in s.rx_rate_percentiles().values()))
+        tables.append(table)
+    if summary.flows:
+        flows = sorted(summary.flows.items(), key=lambda f: (-f[1].loss, f[0]))
+        shown = flows if rows is None else flows[:rows]
+        table = Table(
+            title=f"Flow Metrics ({summary.duration:.0f}s)",
+            caption=f"{len(flows) - len(shown)} more flows" if len(flows) > len(shown) else None,
+        )
+        with_rates = any(s.rx_rates for _, s in shown)
+        columns = ["Flow", "Tx Frames", "Rx Frames", "Loss", "Loss %", "Loss Duration"]
+        if with_rates:
+            columns.extend(f"Rx FPS p{p}" for p in PERCENTILES)
+        for column in columns:
+            table.add_column(column, justify="left" if column == "Flow" else "right")
+        for name, s in shown:
+            table.add_row(
+                name,
+                str(s.frames_tx),
+                str(s.frames_rx),
+                str(s.loss),
+                f"{s.loss_percent:.3f}",
+                f"{s.loss_duration:.1f}s",
+                *((f"{r:.0f}" for r in s.rx_rate_percentiles().values()) if with_rates else ()),
+            )
+        tables.append(table)
+    if summary.bgp:
+        table = Table(title="BGP Peers")
+        table.add_column("Name")
+        table.add_column("Session Flaps", justify="right")
+        table.add_column("Last Session State")
+        for name, (flaps, state) in sorted(summary.bgp.items()):
+            table.add_row(name, str(flaps), state)
+        tables.append(table)
+    return tables
@@ -0,0 +1,187 @@
+"""Diffs of the configurations staged on the devices without committing them, and results of the
+configuration commands per device: diffs, status messages and failures.
+
+Rendering megabytes of diffs and exceptions through the live progress bar takes longer than pushing
+them to the devices. When `configure()` sets a results folder, the full diffs and failures are written
+to '<host>.diff' and '<host>.error' files in a new subfolder of it for each run and the console only shows their first lines with the
+number of changed lines. In quiet mode, only the failures and a summary at the end are shown.
+"""
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+
+from rich.table import Table
+
+from arista_lab.files import write_atomic
+from arista_lab.snapshots import timestamp_name
+
+if TYPE_CHECKING:
+    from rich.progress import Progress
+
+DEFAULT_DIFF_FOLDER = Path("diffs")
+DEFAULT_RESULTS_FOLDER = Path("results")
+# Lines of a diff or failure shown on the console when the full text is written to a file
+DEFAULT_MAX_LINES = 10
+
+
+def _count_changes(diff: str) -> tuple[int, int]:
+    added = removed = 0
+    for line in diff.splitlines():
+        if line.startswith("+") and not line.startswith("+++"):
+            added += 1
+        elif line.startswith("-") and not line.startswith("---"):
+            removed += 1
+    return added, removed
+
+
+class DiffReport:
+    """Diffs collected per host and per title (template, interfaces, configuration file...).
+
+    Full diffs are written to '<host>.diff' files in `folder`, the summary only counts the changed lines.
+    """
+
+    def __init__(self, folder: Path = DEFAULT_DIFF_FOLDER):
+        self.folder = folder
+        self._lock = threading.Lock()
+        self._diffs: dict[str, list[tuple[str, str]]] = {}
+
+    def add(self, host: str, title: str, diff: str | None) -> None:
+        with self._lock:
+            diffs = self._diffs.setdefault(host, [])
+            if diff:
+                diffs.append((title, diff))
+
+    @property
+    def changed(self) -> dict[str, list[tuple[str, str]]]:
+        return {host: diffs for host, diffs in sorted(self._diffs.items()) if diffs}
+
+    def write(self, hosts: Iterable[str] = ()) -> list[Path]:
+        """Write the diffs of each changed host.
+
+        The '<host>.diff' file left by a previous report for a host of `hosts` or of this report
+        without changes is removed. No other file of the folder is touched.
+        """
+        changed = self.changed
+        for host in sorted({*hosts, *self._diffs}):
+            if host not in changed:
+                (self.folder / f"{host}.diff").unlink(missing_ok=True)
+        paths = []
+        for host, diffs in self.changed.items():
+            content = "".join(f"### {title}\n{diff.rstrip()}\n\n" for title, diff in diffs)
+            write_atomic(path := self.folder / f"{host}.diff", content)
+            paths.append(path)
+        return paths
+
+    def summary(self) -> Table:
+        table = Table(title=f"{len(self.changed)}/{len(self._diffs)} devices would change", title_justify="left")
+        table.add_column("Device")
+        table.add_column("Changes")
+        for host, diffs in self.changed.items():
+            changes = []
+            for title, diff in diffs:
+                added, removed = _count_changes(diff)
+                changes.append(f"{title} [green]+{added}[/green] [red]-{removed}[/red]")
+            table.add_row(host, "\n".join(changes))
+        return table
+
+
+class ResultLog:
+    """Where the results of the configuration commands go.
+
+    Without a folder, diffs and failures are logged in full on the console. The methods are called
+    through the helpers of `arista_lab.console`, the console log shows the location of their caller.
+    """
+
+    def __init__(self, folder: Path | None = None, max_lines: int = DEFAULT_MAX_LINES, quiet: bool = False):
+        self.folder = folder
+        self.max_lines = max_lines
+        self.quiet = quiet
+        self._lock = threading.Lock()
+        # Changed lines and failures per host
+        self.changes: dict[str, int] = {}
+        self.failures: dict[str, int] = {}
+        # Subfolder of this run, created on the first write so that commands with no results leave no folder
+        self.run_folder: Path | None = None
+
+    def _create_run_folder(self, folder: Path) -> Path:
+        name = timestamp_name()
+        for attempt in range(1, 100):
+            run_folder = folder / (name if attempt == 1 else f"{name}-{attempt}")
+            try:
+                run_folder.mkdir(parents=True)
+                return run_folder
+            except FileExistsError:
+                continue
+        raise FileExistsError(f"Could not create a results folder for this run in {folder}")
+
+    def _write(self, host: str, suffix: str, title: str, text: str) -> Path | None:
+        if self.folder is None:
+            return None
+        with self._lock:
+            if self.run_folder is None:
+                self.run_folder = self._create_run_folder(self.folder)
+            path = self.run_folder / f"{host}{suffix}"
+            with path.open("a", encoding="UTF-8") as f:
+                f.write(f"### {title}\n{text.rstrip()}\n\n")
+        return path
+
+    def _truncated(self, text: str, path: Path | None) -> str:
+        if path is None:
+            return text
+        lines = text.splitlines()
+        shown = "\n".join(lines[: self.max_lines])
+        if len(lines) > self.max_lines:
+            shown += f"\n... {len(lines) - self.max_lines} more lines in {path}"
+        return shown
+
+    def log(self, bar: "Progress", message: str) -> None:
+        """Log a status message of a device, unless quiet."""
+        if not self.quiet:
+            bar.console.log(message, _stack_offset=3)
+
+    def diff(self, bar: "Progress", host: str, title: str, diff: str) -> None:
+        added, removed = _count_changes(diff)
+        with self._lock:
+            self.changes[host] = self.changes.get(host, 0) + added + removed
+        path = self._write(host, ".diff", title, diff)
+        if self.quiet:
+            return
+        if path is None:
+            bar.console.log(f"{host}: {title}\n\t" + diff.replace("\n", "\n\t"), _stack_offset=3)
+        elif self.max_lines:
+            bar.console.log(f"{host}: {title} +{added} -{removed}\n\t" + self._truncated(diff, path).replace("\n", "\n\t"), _stack_offset=3)
+        else:
+            bar.console.log(f"{host}: {title} +{added} -{removed} (diff in {path})", _stack_offset=3)
+
+    def error(self, bar: "Progress", host: str, title: str, message: str, details: str | None = None) -> None:
+        """Log a failure, in quiet mode too. `details`, e.g. the exception, is truncated on the console."""
+        with self._lock:
+            self.failures[host] = self.failures.get(host, 0) + 1
+        path = self._write(host, ".error", title, f"{message}\n{details}" if details is not None else message)
+        bar.console.log(message, _stack_offset=2)
+        if details is not None:
+            bar.console.log(self._truncated(details, path), _stack_offset=2)
+
+    def summary(self) -> str | None:
+        if not self.changes and not self.failures:
+            return None
+        summary = (
+            f"{len(self.changes)} devices changed ({sum(self.changes.values())} lines), "
+            f"{len(self.failures)} devices failed"
+        )
+        if self.run_folder is not None:
+            summary += f", full results in {self.run_folder}"
+        return summary
+
+
+_results = ResultLog()
+
+
+def configure(folder: Path | None = None, max_lines: int = DEFAULT_MAX_LINES, quiet: bool = False) -> ResultLog:
+    global _results
+    _results = ResultLog(folder, max_lines=max_lines, quiet=quiet)
+    return _results
+
+
+def result_log() -> ResultLog:
+    return _results
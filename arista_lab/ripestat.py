@@ -0,0 +1,153 @@
+"""Announced prefixes of an ASN from RIPEstat with an on-disk cache."""
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from arista_lab.files import write_atomic
+
+logger = logging.getLogger(__name__)
+
+RIPESTAT_URL = "https://stat.ripe.net"
+ANNOUNCED_PREFIXES_PATH = "/data/announced-prefixes/data.json"
+DEFAULT_CACHE_FOLDER = Path.home() / ".cache" / "arista-lab" / "ripestat"
+DEFAULT_TTL = 24 * 3600
+REQUEST_TIMEOUT = 30
+POOL_SIZE = 16
+RETRIES = 3
+LOOKBACK = timedelta(days=10)
+
+
+class RipeStatError(Exception):
+    pass
+
+
+def pooled_session(pool_size: int = POOL_SIZE, retries: int = RETRIES) -> requests.Session:
+    """HTTP session sharing keep-alive connections between threads and retrying transient failures."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        max_retries=Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+        ),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class PrefixCache:
+    """Announced prefixes indexed by ASN.
+
+    Entries are stored in `folder` as 'AS<asn>.json' and refreshed from RIPEstat when older than `ttl` seconds.
+    A raw RIPEstat 'announced-prefixes' response saved as 'AS<asn>.json' can be used as a fixture, it is
+    never refreshed unless `refresh` is set. With `refresh`, every entry is fetched again.
+    In offline mode, only the entries in `folder` are used, whatever their age.
+    Each ASN is fetched at most once per instance, even if several hosts share it.
+    """
+
+    def __init__(
+        self,
+        folder: Path = DEFAULT_CACHE_FOLDER,
+        ttl: float = DEFAULT_TTL,
+        offline: bool = False,
+        url: str = RIPESTAT_URL,
+        session: requests.Session | None = None,
+        refresh: bool = False,
+    ):
+        self.folder = folder
+        self.ttl = ttl
+        self.offline = offline
+        self.refresh = refresh
+        self.url = url.rstrip("/")
+        self.session = session or pooled_session()
+        self._prefixes: dict[int, list[str]] = {}
+        self._locks: dict[int, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, asn: int) -> Path:
+        return self.folder / f"AS{asn}.json"
+
+    def _read(self, asn: int) -> dict[str, Any] | None:
+        path = self._path(asn)
+        if not path.exists():
+            return None
+        try:
+            with path.open(encoding="UTF-8") as f:
+                entry = json.load(f)
+            if "data" in entry:
+                # Raw RIPEstat response used as fixture
+                return {"fetched": 0, "fixture": True, "prefixes": [p["prefix"] for p in entry["data"]["prefixes"]]}
+            if not isinstance(entry.get("prefixes"), list):
+                raise ValueError("missing 'prefixes' list")
+            return entry
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring invalid cache entry {path}: {e}")
+            return None
+
+    def _fetch(self, asn: int, cached: dict[str, Any] | None) -> dict[str, Any]:
+        # Start the window at midnight so that the URL and its validators stay the same for a day
+        start = (datetime.now(timezone.utc) - LOOKBACK).replace(hour=0, minute=0, second=0, microsecond=0)
+        params = {"resource": f"AS{asn}", "starttime": start.strftime("%Y-%m-%dT%H:%M")}
+        headers = {}
+        if cached is not None and cached.get("url_params") == params:
+            if etag := cached.get("etag"):
+                headers["If-None-Match"] = etag
+            if last_modified := cached.get("last_modified"):
+                headers["If-Modified-Since"] = last_modified
+        r = self.session.get(
+            f"{self.url}{ANNOUNCED_PREFIXES_PATH}",
+            params=params,
+            headers=headers,
+            timeout=REQUEST_TIMEOUT,
+        )
+        if r.status_code == 304 and cached is not None:
+            logger.debug(f"AS{asn}: cached prefixes are still valid")
+            return {**cached, "fetched": time.time()}
+        if not r.ok:
+            raise RipeStatError(f"Could not get announced prefixes for AS{asn}: HTTP {r.status_code}")
+        return {
+            "fetched": time.time(),
+            "url_params": params,
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "prefixes": [p["prefix"] for p in r.json()["data"]["prefixes"]],
+        }
+
+    def _load(self, asn: int) -> list[str]:
+        cached = self._read(asn)
+        if self.offline:
+            if cached is None:
+                raise RipeStatError(f"No cached announced prefixes for AS{asn} in {self.folder} (offline mode)")
+            return cached["prefixes"]
+        if cached is not None and not self.refresh and (cached.get("fixture") or time.time() - cached.get("fetched", 0) < self.ttl):
+            return cached["prefixes"]
+        try:
+            entry = self._fetch(asn, cached)
+        except (requests.RequestException, RipeStatError) as e:
+            if cached is None:
+                raise RipeStatError(f"Could not get announced prefixes for AS{asn}: {e}") from e
+            logger.warning(f"AS{asn}: using stale cached prefixes, RIPEstat is unavailable: {e}")
+            return cached["prefixes"]
+        write_atomic(self._path(asn), json.dumps(entry))
+        return entry["prefixes"]
+
+    def prefixes(self, asn: int) -> list[str]:
+        """Announced prefixes of `asn`."""
+        with self._lock:
+            lock = self._locks.setdefault(asn, threading.Lock())
+        with lock:
+            if asn not in self._prefixes:
+                self._prefixes[asn] = self._load(asn)
+            return self._prefixes[asn]
@@ -0,0 +1,213 @@
+"""Nornir runner with a global worker count, per-group concurrency caps and a commit rate limit.
+
+With `num_workers="auto"` the number of hosts in flight adapts to how responsive the devices are:
+it grows while the median task duration stays close to the lowest one measured and is halved
+when tasks take much longer or time out, e.g. when the hypervisor running the containers is
+overloaded. Registered as the 'lab' runner plugin, it can also be set in the Nornir YAML:
+
+    runner:
+      plugin: lab
+      options:
+        num_workers: auto
+        group_limits: {spines: 2}
+        commit_rate: 5
+"""
+import logging
+import queue
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Literal
+
+from nornir.core.task import AggregatedResult, MultiResult, Task
+
+from arista_lab import tracing
+
+if TYPE_CHECKING:
+    from nornir.core.inventory import Host
+
+logger = logging.getLogger(__name__)
+
+AUTO = "auto"
+# Hosts in flight when starting with num_workers="auto"
+AUTO_INITIAL_WORKERS = 4
+AUTO_MAX_WORKERS = 100
+# A response time this many times the baseline means the devices are overloaded
+OVERLOAD_FACTOR = 3.0
+# Completed tasks over which the response time and the timeouts are measured
+WINDOW = 8
+# Successful tasks needed to measure the response time
+MIN_SAMPLES = 3
+
+
+class RateLimiter:
+    """Space events `1 / rate` seconds apart across threads."""
+
+    def __init__(self, rate: float):
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive, got {rate}")
+        self.interval = 1 / rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> float:
+        """Block until the next slot. Returns the time waited in seconds."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if (delay := slot - now) > 0:
+            time.sleep(delay)
+        return delay
+
+
+class AdaptiveLimit:
+    """Additive increase, multiplicative decrease of the number of hosts in flight.
+
+    The response time is the median duration of the last `WINDOW` successful tasks, so that a host
+    completing almost instantly (nothing to push, unchanged) or a single slow host does not move it.
+    Failed tasks are left out, they often fail fast. The baseline is the lowest response time measured.
+    The devices are overloaded when the response time is `OVERLOAD_FACTOR` times the baseline or when
+    a quarter of the last `WINDOW` tasks timed out.
+
+    The limit grows by one per completed task until the first overload (slow start), then by one per
+    `limit` completed tasks. On overload it is halved, then the tasks started before the decrease
+    are not measured anymore and it is not decreased again for `limit` completed tasks.
+    """
+
+    def __init__(self, initial: int = AUTO_INITIAL_WORKERS, maximum: int = AUTO_MAX_WORKERS):
+        self.maximum = maximum
+        self.limit = float(min(initial, maximum))
+        self.baseline: float | None = None
+        self._durations: deque[float] = deque(maxlen=WINDOW)
+        self._timeouts: deque[bool] = deque(maxlen=WINDOW)
+        self._slow_start = True
+        self._completed = 0
+        self._decreased_at: int | None = None
+
+    def __int__(self) -> int:
+        return int(self.limit)
+
+    def response_time(self) -> float | None:
+        """Median duration of the last successful tasks, None until there are enough of them."""
+        return statistics.median(self._durations) if len(self._durations) >= MIN_SAMPLES else None
+
+    def completed(self, duration: float, failed: bool = False, timed_out: bool = False) -> None:
+        self._completed += 1
+        self._timeouts.append(timed_out)
+        if not failed and not timed_out:
+            self._durations.append(duration)
+        response = self.response_time()
+        if response is not None and (self.baseline is None or response < self.baseline):
+            self.baseline = response
+        timeouts = sum(self._timeouts)
+        overloaded = 4 * timeouts >= WINDOW or (
+            response is not None and self.baseline is not None and response > OVERLOAD_FACTOR * self.baseline
+        )
+        if overloaded:
+            if self._decreased_at is None or self._completed - self._decreased_at >= max(self.limit, MIN_SAMPLES):
+                self.limit = max(self.limit / 2, 1.0)
+                self._slow_start = False
+                self._decreased_at = self._completed
+                self._durations.clear()
+                self._timeouts.clear()
+                logger.info(
+                    f"Devices overloaded ({f'{timeouts} timeouts' if 4 * timeouts >= WINDOW else f'{response:.2f}s response time, baseline {self.baseline:.2f}s'}), "
+                    f"running at most {int(self.limit)} hosts concurrently"
+                )
+        elif self._slow_start:
+            self.limit = min(self.limit + 1, self.maximum)
+        else:
+            self.limit = min(self.limit + 1 / self.limit, self.maximum)
+
+
+def _timed_out(result: MultiResult) -> bool:
+    for r in result:
+        if r.exception is not None and (isinstance(r.exception, TimeoutError) or "timed out" in str(r.exception).lower()):
+            return True
+    return False
+
+
+class LabRunner:
+    """Run the task over the hosts in threads.
+
+    Arguments:
+        num_workers: maximum number of hosts in flight, or "auto" to adapt it to the device response times
+        group_limits: maximum number of hosts in flight per Nornir group, including inherited groups
+        commit_rate: maximum number of configuration commits per second across all hosts
+    """
+
+    def __init__(
+        self,
+        num_workers: int | Literal["auto"] = 20,
+        group_limits: dict[str, int] | None = None,
+        commit_rate: float | None = None,
+    ) -> None:
+        if num_workers != AUTO and (not isinstance(num_workers, int) or num_workers < 1):
+            raise ValueError(f"num_workers must be a positive integer or '{AUTO}', got {num_workers!r}")
+        self.num_workers = num_workers
+        self.group_limits = group_limits or {}
+        self.commit_limiter = RateLimiter(commit_rate) if commit_rate else None
+        # Time spent per host waiting for the commit rate limit, not counted as device response time
+        self._waited: dict[str, float] = {}
+
+    def _capped_groups(self, host: "Host") -> list[str]:
+        return [g.name for g in host.extended_groups() if g.name in self.group_limits]
+
+    def wait_commit(self, host: str) -> None:
+        if self.commit_limiter is not None:
+            with tracing.span(host, "wait_commit_rate"):
+                self._waited[host] = self._waited.get(host, 0.0) + self.commit_limiter.wait()
+
+    def run(self, task: Task, hosts: list["Host"]) -> AggregatedResult:
+        result = AggregatedResult(task.name)
+        if not hosts:
+            return result
+        if self.num_workers == AUTO:
+            limit: AdaptiveLimit | None = AdaptiveLimit(maximum=min(AUTO_MAX_WORKERS, len(hosts)))
+            max_workers = limit.maximum
+        else:
+            limit = None
+            max_workers = min(self.num_workers, len(hosts))
+        pending = deque(hosts)
+        in_flight: dict[str, int] = {}
+        done: queue.SimpleQueue[tuple["Host", list[str], float, Future]] = queue.SimpleQueue()
+        running = 0
+
+        def dispatchable() -> "Host | None":
+            for i, host in enumerate(pending):
+                if all(in_flight.get(g, 0) < self.group_limits[g] for g in self._capped_groups(host)):
+                    del pending[i]
+                    return host
+            return None
+
+        with ThreadPoolExecutor(max_workers) as pool:
+            while pending or running:
+                while pending and running < (int(limit) if limit is not None else max_workers):
+                    if (host := dispatchable()) is None:
+                        break
+                    groups = self._capped_groups(host)
+                    for g in groups:
+                        in_flight[g] = in_flight.get(g, 0) + 1
+                    start = time.monotonic()
+                    future = pool.submit(task.copy().start, host)
+                    future.add_done_callback(lambda f, host=host, groups=groups, start=start: done.put((host, groups, start, f)))
+                    running += 1
+                host, groups, start, future = done.get()
+                running -= 1
+                for g in groups:
+                    in_flight[g] -= 1
+                worker_result = future.result()
+                result[worker_result.host.name] = worker_result
+                if limit is not None:
+                    duration = time.monotonic() - start - self._waited.pop(host.name, 0.0)
+                    limit.completed(duration, failed=worker_result.failed, timed_out=_timed_out(worker_result))
+        return result
+
+
+def wait_commit(task: Task) -> None:
+    """Wait for the commit rate limit of the runner running the task, if any."""
+    if isinstance(runner := task.nornir.runner, LabRunner):
+        runner.wait_commit(task.host.name)
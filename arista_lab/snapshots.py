@@ -0,0 +1,137 @@
+"""Content-addressed store of configuration snapshots.
+
+Configurations are split into top-level sections. Each distinct section is stored once, compressed,
+under its SHA-256 so that sections shared between hosts and between snapshots take no extra space.
+A snapshot is a JSON manifest listing the sections of each host configuration.
+"""
+import hashlib
+import json
+import re
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from arista_lab.files import write_atomic
+
+DEFAULT_SNAPSHOT_FOLDER = Path(".lab-snapshots")
+SNAPSHOT_NAME_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]*")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def timestamp_name() -> str:
+    return datetime.now().strftime("%Y%m%d-%H%M%S")
+
+
+def _sections(config: str) -> Iterator[str]:
+    """Split a configuration before each top-level command. Joining the sections gives back the configuration."""
+    section: list[str] = []
+    for line in config.splitlines(keepends=True):
+        if section and line[:1] not in ("", " ", "\t", "!", "\n", "\r"):
+            yield "".join(section)
+            section = []
+        section.append(line)
+    if section:
+        yield "".join(section)
+
+
+class SnapshotStore:
+    def __init__(self, folder: Path = DEFAULT_SNAPSHOT_FOLDER):
+        self.folder = folder
+        self._lock = threading.Lock()
+        self._pending: dict[str, list[str]] = {}
+
+    def _object(self, digest: str) -> Path:
+        return self.folder / "objects" / digest[:2] / digest[2:]
+
+    def _manifest(self, name: str) -> Path:
+        if not SNAPSHOT_NAME_RE.fullmatch(name):
+            raise SnapshotError(f"Invalid snapshot name '{name}'")
+        return self.folder / "snapshots" / f"{name}.json"
+
+    def put(self, host: str, config: str) -> None:
+        """Store the sections of the configuration of a host for the next `commit`."""
+        digests = []
+        for section in _sections(config):
+            data = section.encode()
+            digest = hashlib.sha256(data).hexdigest()
+            if not (path := self._object(digest)).exists():
+                write_atomic(path, zlib.compress(data))
+            digests.append(digest)
+        with self._lock:
+            self._pending[host] = digests
+
+    def commit(self, name: str) -> Path:
+        """Write the manifest of the snapshot with the configurations stored since the last commit."""
+        path = self._manifest(name)
+        if path.exists():
+            raise SnapshotError(f"Snapshot '{name}' already exists in {self.folder}")
+        with self._lock:
+            hosts, self._pending = self._pending, {}
+        write_atomic(
+            path,
+            json.dumps({"created": datetime.now().isoformat(timespec="seconds"), "hosts": hosts}),
+        )
+        return path
+
+    def names(self) -> list[str]:
+        return sorted(p.stem for p in (self.folder / "snapshots").glob("*.json"))
+
+    def read(self, name: str) -> dict:
+        path = self._manifest(name)
+        if not path.exists():
+            raise SnapshotError(f"Snapshot '{name}' not found in {self.folder}")
+        try:
+            with path.open(encoding="UTF-8") as f:
+                manifest = json.load(f)
+            if not isinstance(manifest, dict) or not isinstance(manifest.get("hosts"), dict):
+                raise ValueError("missing 'hosts' object")
+        except ValueError as e:
+            raise SnapshotError(f"Invalid snapshot '{name}' in {self.folder}: {e}") from e
+        return manifest
+
+    def open(self, name: str, hosts: Iterable[str] | None = None) -> "Snapshot":
+        """Read the manifest of a snapshot once and check that it has the configurations of `hosts`."""
+        manifest = self.read(name)["hosts"]
+        if hosts is not None:
+            if missing := sorted(set(hosts) - manifest.keys()):
+                raise SnapshotError(f"Configuration of {', '.join(missing)} not found in snapshot '{name}'")
+            manifest = {host: manifest[host] for host in hosts}
+        for digests in manifest.values():
+            for digest in digests:
+                if not self._object(digest).exists():
+                    raise SnapshotError(f"Missing object {digest} of snapshot '{name}' in {self.folder}")
+        return Snapshot(self, name, manifest)
+
+    def iter_config(self, name: str, host: str) -> Iterator[str]:
+        """Stream the configuration of a host from a snapshot, section by section."""
+        return self.open(name, [host]).iter_config(host)
+
+    def read_config(self, name: str, host: str) -> str:
+        return "".join(self.iter_config(name, host))
+
+
+class Snapshot:
+    """Configurations of the hosts of a snapshot, from a manifest read by `SnapshotStore.open`."""
+
+    def __init__(self, store: SnapshotStore, name: str, hosts: dict[str, list[str]]):
+        self.store = store
+        self.name = name
+        self.hosts = hosts
+
+    def iter_config(self, host: str) -> Iterator[str]:
+        """Stream the configuration of a host, section by section."""
+        if host not in self.hosts:
+            raise SnapshotError(f"Configuration of {host} not found in snapshot '{self.name}'")
+        for digest in self.hosts[host]:
+            data = zlib.decompress(self.store._object(digest).read_bytes())
+            if hashlib.sha256(data).hexdigest() != digest:
+                raise SnapshotError(f"Corrupted object {digest} in {self.store.folder}")
+            yield data.decode()
+
+    def read_config(self, host: str) -> str:
+        return "".join(self.iter_config(host))
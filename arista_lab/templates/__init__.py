@@ -0,0 +1,24 @@
+from functools import cache
+from importlib.resources import files
+from typing import Any
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, Template
+
+
+@cache
+def get_template(folder: str, name: str) -> Template:
+    """Compile a template of this package once per process.
+
+    Uses the same environment settings as nornir_jinja2 `template_file`.
+    """
+    env = Environment(
+        loader=FileSystemLoader(str(files(__name__) / folder)),
+        undefined=StrictUndefined,
+        trim_blocks=True,
+    )
+    return env.get_template(name)
+
+
+def render(folder: str, name: str, **kwargs: Any) -> str:
+    """Render a template of this package from its compiled template."""
+    return get_template(folder, name).render(**kwargs)
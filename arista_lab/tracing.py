@@ -0,0 +1,212 @@
+"""Spans of the time spent per host and phase, exported as Chrome trace events.
+
+Tracing is off unless `enable()` is called, `span()` is then a no-op. When enabled, the Nornir
+processor `NornirTracer` records a span for every task and sub-task run on a host (template_file,
+napalm_configure, napalm_confirm_commit, wait_for_device...) and `trace_connections()` records a
+'connect' span when the task opens a NAPALM connection. The code records other phases with `span()`.
+
+The trace opens in chrome://tracing or https://ui.perfetto.dev with one track per host.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, ContextManager, Iterator, NamedTuple
+
+from rich.table import Table
+
+from arista_lab.files import write_atomic
+from arista_lab.recording import percentile
+
+if TYPE_CHECKING:
+    from nornir.core.inventory import Host
+    from nornir.core.task import MultiResult, Task
+
+DEFAULT_SUMMARY_ROWS = 10
+
+
+class Span(NamedTuple):
+    host: str
+    phase: str
+    # Seconds since the tracer was enabled
+    start: float
+    duration: float
+    failed: bool
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, host: str, phase: str, start: float, failed: bool = False) -> None:
+        """Record a span started at `start`, a `time.perf_counter()` value, and ending now."""
+        span = Span(host, phase, start - self._origin, time.perf_counter() - start, failed)
+        with self._lock:
+            self.spans.append(span)
+
+    @contextmanager
+    def span(self, host: str, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.add(host, phase, start, failed=failed)
+
+    def chrome_trace(self) -> dict[str, Any]:
+        """Trace Event Format with complete events, one thread per host."""
+        pid = os.getpid()
+        tids: dict[str, int] = {}
+        events: list[dict[str, Any]] = []
+        for span in sorted(self.spans, key=lambda s: (s.start, -s.duration)):
+            if (tid := tids.get(span.host)) is None:
+                tid = tids[span.host] = len(tids) + 1
+                events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": span.host}})
+            events.append(
+                {
+                    "name": span.phase,
+                    "cat": "failed" if span.failed else "lab",
+                    "ph": "X",
+                    "ts": round(span.start * 1e6),
+                    "dur": round(span.duration * 1e6),
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"host": span.host, "failed": span.failed},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: Path) -> None:
+        write_atomic(path, json.dumps(self.chrome_trace(), separators=(",", ":")))
+
+    def _hosts(self) -> tuple[dict[str, float], dict[str, dict[str, float]]]:
+        """Time spent on each host, the duration of its spans not nested in another span,
+        and time spent per phase in the nested spans of each host."""
+        times: dict[str, float] = {}
+        nested: dict[str, dict[str, float]] = {}
+        end: dict[str, float] = {}
+        for span in sorted(self.spans, key=lambda s: (s.start, -s.duration)):
+            if span.start >= end.get(span.host, -1.0):
+                times[span.host] = times.get(span.host, 0.0) + span.duration
+                end[span.host] = span.start + span.duration
+            else:
+                phases = nested.setdefault(span.host, {})
+                phases[span.phase] = phases.get(span.phase, 0.0) + span.duration
+        return times, nested
+
+    def summary_tables(self, rows: int = DEFAULT_SUMMARY_ROWS) -> list[Table]:
+        """Tables of the `rows` slowest hosts and of the phases by total time."""
+        phases: dict[str, list[Span]] = {}
+        for span in self.spans:
+            phases.setdefault(span.phase, []).append(span)
+        times, nested = self._hosts()
+        hosts = sorted(times.items(), key=lambda h: -h[1])
+        table = Table(
+            title=f"Slowest devices ({len(self.spans)} spans)",
+            title_justify="left",
+            caption=f"{len(hosts) - rows} more devices" if len(hosts) > rows else None,
+        )
+        for column in ("Device", "Time (s)", "Slowest phase", "Phase time (s)"):
+            table.add_column(column, justify="right" if "(s)" in column else "left")
+        for host, total in hosts[:rows]:
+            if host in nested:
+                phase, t = max(nested[host].items(), key=lambda p: p[1])
+                table.add_row(host, f"{total:.3f}", phase, f"{t:.3f}")
+            else:
+                table.add_row(host, f"{total:.3f}", "", "")
+        tables = [table]
+
+        table = Table(title="Phases", title_justify="left")
+        for column in ("Phase", "Count", "Failed", "Total (s)", "Mean (s)", "p95 (s)", "Max (s)", "Slowest device"):
+            table.add_column(column, justify="left" if column in ("Phase", "Slowest device") else "right")
+        for phase, spans in sorted(phases.items(), key=lambda p: -sum(s.duration for s in p[1])):
+            durations = sorted(s.duration for s in spans)
+            slowest = max(spans, key=lambda s: s.duration)
+            table.add_row(
+                phase,
+                str(len(spans)),
+                str(sum(s.failed for s in spans)),
+                f"{sum(durations):.3f}",
+                f"{sum(durations) / len(durations):.3f}",
+                f"{percentile(durations, 95):.3f}",
+                f"{durations[-1]:.3f}",
+                slowest.host,
+            )
+        tables.append(table)
+        return tables
+
+
+# Host of the task run by the current thread, for the spans of the connection plugins
+_current = threading.local()
+
+
+class NornirTracer:
+    """Nornir processor recording a span for each task and sub-task run on a host."""
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        self._started: dict[int, float] = {}
+
+    def task_started(self, task: "Task") -> None:
+        pass
+
+    def task_completed(self, task: "Task", result: Any) -> None:
+        pass
+
+    def task_instance_started(self, task: "Task", host: "Host") -> None:
+        _current.host = host.name
+        self._started[id(task)] = time.perf_counter()
+
+    def task_instance_completed(self, task: "Task", host: "Host", result: "MultiResult") -> None:
+        self.tracer.add(host.name, task.name, self._started.pop(id(task)), failed=result.failed)
+
+    def subtask_instance_started(self, task: "Task", host: "Host") -> None:
+        self._started[id(task)] = time.perf_counter()
+
+    def subtask_instance_completed(self, task: "Task", host: "Host", result: "MultiResult") -> None:
+        self.tracer.add(host.name, task.name, self._started.pop(id(task)), failed=result.failed)
+
+
+def trace_connections(name: str = "napalm") -> None:
+    """Replace the registered Nornir connection plugin `name` with a subclass recording a 'connect' span
+    each time a task opens a connection."""
+    from nornir.core.plugins.connections import ConnectionPluginRegister
+
+    plugin = ConnectionPluginRegister.get_plugin(name)
+    if getattr(plugin, "traced", False):
+        return
+
+    class TracedConnection(plugin):  # type: ignore[valid-type,misc]
+        traced = True
+
+        def open(self, *args: Any, **kwargs: Any) -> None:
+            with span(getattr(_current, "host", None) or str(kwargs.get("hostname")), "connect"):
+                super().open(*args, **kwargs)
+
+    ConnectionPluginRegister.deregister(name)
+    ConnectionPluginRegister.register(name, TracedConnection)
+
+
+_tracer: Tracer | None = None
+
+
+def enable() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+def tracer() -> Tracer | None:
+    """The tracer if tracing is enabled."""
+    return _tracer
+
+
+def span(host: str, phase: str) -> ContextManager[None]:
+    """Record the time spent in the block for a host and phase, if tracing is enabled."""
+    return _tracer.span(host, phase) if _tracer is not None else nullcontext()
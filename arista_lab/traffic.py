@@ -1,44 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
+import hashlib
+import json
 from pathlib import Path
-import pickle
+import time
+from typing import Any, Iterable, NamedTuple
 import snappi # type: ignore[import-untyped]
 import snappi_ixnetwork # type: ignore[import-untyped]
 import logging
 from rich.table import Table
-from rich.console import Console
+from rich.console import Console, Group
+from rich.live import Live
 import urllib3
 
+from arista_lab.files import write_atomic
+from arista_lab.recording import MetricsRecorder
+
 urllib3.disable_warnings()
 console = Console()
 logger = logging.getLogger(__name__)
 
-snappi_ixnetwork_session_file = Path("./.snappi-api-session")
+snappi_session_file = Path("./.snappi-api-session.json")
+
+DEFAULT_WATCH_INTERVAL = 1.0
+DEFAULT_WATCH_ROWS = 20
+METRIC_GROUPS = ("port", "flow", "bgpv4", "bgpv6")
+
+def config_hash(config: snappi.Config) -> str:
+    """Hash of the canonical JSON serialization of an OTG configuration."""
+    canonical = json.dumps(config.serialize(config.DICT), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _read_session(location: str) -> dict[str, Any] | None:
+    """Session of the traffic generator at `location` saved by `configure`, if any."""
+    if not snappi_session_file.exists():
+        return None
+    try:
+        with snappi_session_file.open(encoding="UTF-8") as f:
+            session = json.load(f)
+        if not isinstance(session, dict) or not isinstance(session.get("config"), dict) or not isinstance(session.get("hash"), str):
+            raise ValueError("missing 'config' or 'hash'")
+    except (ValueError, UnicodeDecodeError) as e:
+        logger.warning(f"Ignoring invalid session file {snappi_session_file}: {e}")
+        return None
+    if session.get("location") != location:
+        return None
+    return session
+
+
+def restore_session(api: snappi.Api, location: str) -> None:
+    """Give the configuration applied by a previous `configure` to the snappi_ixnetwork API."""
+    if not isinstance(api, snappi_ixnetwork.Api) or (session := _read_session(location)) is None:
+        return
+    config = api.config()
+    try:
+        # deserialize() validates the configuration against the OTG schema
+        config.deserialize(session["config"])
+    except (ValueError, TypeError) as e:
+        logger.warning(f"Ignoring invalid session file {snappi_session_file}: {e}")
+        return
+    api._config = config
+
 
 def configure(
     api: snappi.Api,
     config: snappi.Config,
+    location: str,
+    force: bool = False,
 ) -> None:
-    """Configure the flows on the traffic generator"""
+    """Configure the flows on the traffic generator, unless it is already running this configuration."""
+    digest = config_hash(config)
+    if not force and (session := _read_session(location)) is not None and session["hash"] == digest:
+        logger.info(f"Configuration unchanged since it was applied to {location}, use --force to apply it again")
+        return
     try:
         api.set_config(config)
     except Exception as e:
         logger.error(e) # snappi_ixnetwork.exceptions.IxNetworkException is raised here
-    if isinstance(api, snappi_ixnetwork.Api):
-        with snappi_ixnetwork_session_file.open(mode="wb") as fd:
-            pickle.dump(api.get_config(), fd)
-
-def _get_traffic_stats(api: snappi.Api) -> tuple[list, list]:
-    request = api.metrics_request()
-    request.choice = request.PORT
-    port_stats = api.get_metrics(request).port_metrics
-    if port_stats is None:
-        port_stats = []
-
-    request = api.metrics_request()
-    request.choice = request.FLOW
-    flow_stats = api.get_metrics(request).flow_metrics
-    if flow_stats is None:
-        flow_stats = []
-    return port_stats, flow_stats
+        # The configuration may be partially applied, do not trust the session anymore
+        snappi_session_file.unlink(missing_ok=True)
+        return
+    write_atomic(
+        snappi_session_file,
+        json.dumps({"location": location, "hash": digest, "config": config.serialize(config.DICT)}),
+    )
+
+def _get_metrics(
+    api: snappi.Api,
+    groups: Iterable[str] = ("port", "flow"),
+    names: list[str] | None = None,
+) -> dict[str, list]:
+    """Get the metrics of several groups over the same API session, concurrently after the first group.
+
+    The metrics are filtered by name with the shell-style patterns of `names`.
+    """
+    groups = list(groups)
+
+    def get(group: str) -> list:
+        request = api.metrics_request()
+        request.choice = group
+        metrics = getattr(api.get_metrics(request), f"{group}_metrics")
+        if metrics is None:
+            return []
+        if names:
+            # Filtered here: a name unknown to the traffic generator fails the whole request
+            return [m for m in metrics if any(fnmatchcase(m.name, n) for n in names)]
+        return list(metrics)
+
+    # The first request connects snappi_ixnetwork to the IxNetwork session, which is not thread-safe:
+    # concurrent first requests would each open a session
+    metrics = {groups[0]: get(groups[0])}
+    if len(groups) > 1:
+        with ThreadPoolExecutor(max_workers=len(groups) - 1) as executor:
+            metrics.update(zip(groups[1:], executor.map(get, groups[1:])))
+    return metrics
 
 def _print_traffic_stats(
     port_stats=None,
@@ -157,6 +233,151 @@ def stop(api: snappi.Api) -> None:
     except Exception as e:
         logger.error(e)
 
-def stats(api: snappi.Api) -> None:
-    port_stats, flow_stats = _get_traffic_stats(api)
-    _print_traffic_stats(port_stats=port_stats, flow_stats=flow_stats)
+def stats(api: snappi.Api, groups: Iterable[str] = ("port", "flow"), names: list[str] | None = None) -> None:
+    metrics = _get_metrics(api, groups, names)
+    _print_traffic_stats(**{f"{group}_stats": stats for group, stats in metrics.items()})
+
+
+class Counters(NamedTuple):
+    frames_tx: int
+    frames_rx: int
+    bytes_tx: int
+    bytes_rx: int
+
+
+def _counters(stats) -> dict[str, Counters]:
+    # Read the snappi objects once, they are only used to compute deltas afterwards
+    return {
+        s.name: Counters(s.frames_tx or 0, s.frames_rx or 0, s.bytes_tx or 0, s.bytes_rx or 0)
+        for s in stats
+    }
+
+
+def _delta(current: Counters, previous: Counters | None) -> Counters:
+    if previous is None:
+        return Counters(0, 0, 0, 0)
+    # A counter lower than the previous sample has been reset, e.g. the traffic was restarted
+    return Counters(*(c - p if c >= p else c for c, p in zip(current, previous)))
+
+
+def _watch_tables(
+    ports: dict[str, Counters],
+    flows: dict[str, Counters],
+    transmit: dict[str, str],
+    previous_ports: dict[str, Counters],
+    previous_flows: dict[str, Counters],
+    elapsed: float,
+    rows: int,
+) -> Group:
+    port_table = Table(title="Port Metrics")
+    for column in ("Port", "Tx Frames", "Rx Frames", "Δ Tx", "Δ Rx", "Tx FPS", "Rx FPS", "Rx Mbps"):
+        port_table.add_column(column, justify="left" if column == "Port" else "right")
+    for name, c in ports.items():
+        d = _delta(c, previous_ports.get(name))
+        port_table.add_row(
+            name,
+            str(c.frames_tx),
+            str(c.frames_rx),
+            str(d.frames_tx),
+            str(d.frames_rx),
+            f"{d.frames_tx / elapsed:.0f}",
+            f"{d.frames_rx / elapsed:.0f}",
+            f"{d.bytes_rx * 8 / elapsed / 1e6:.2f}",
+        )
+
+    deltas = {name: _delta(c, previous_flows.get(name)) for name, c in flows.items()}
+    # Only render the flows losing the most frames during the interval
+    shown = sorted(flows, key=lambda n: (deltas[n].frames_rx - deltas[n].frames_tx, n))[:rows]
+    flow_table = Table(
+        title=f"Flow Metrics (every {elapsed:.1f}s)",
+        caption=f"{len(flows) - len(shown)} more flows" if len(flows) > len(shown) else None,
+        show_footer=True,
+    )
+    total = Counters(*(sum(v) for v in zip(*flows.values()))) if flows else Counters(0, 0, 0, 0)
+    total_delta = Counters(*(sum(v) for v in zip(*deltas.values()))) if deltas else Counters(0, 0, 0, 0)
+    for column, footer in (
+        ("Flow", f"{len(flows)} flows"),
+        ("Transmit State", ""),
+        ("Tx Frames", str(total.frames_tx)),
+        ("Rx Frames", str(total.frames_rx)),
+        ("Δ Tx", str(total_delta.frames_tx)),
+        ("Δ Rx", str(total_delta.frames_rx)),
+        ("Rx FPS", f"{total_delta.frames_rx / elapsed:.0f}"),
+        ("Δ Loss", str(max(total_delta.frames_tx - total_delta.frames_rx, 0))),
+    ):
+        flow_table.add_column(column, footer=footer, justify="left" if column in ("Flow", "Transmit State") else "right")
+    for name in shown:
+        c, d = flows[name], deltas[name]
+        flow_table.add_row(
+            name,
+            transmit.get(name, ""),
+            str(c.frames_tx),
+            str(c.frames_rx),
+            str(d.frames_tx),
+            str(d.frames_rx),
+            f"{d.frames_rx / elapsed:.0f}",
+            str(max(d.frames_tx - d.frames_rx, 0)),
+        )
+    return Group(port_table, flow_table)
+
+
+def watch(
+    api: snappi.Api,
+    interval: float = DEFAULT_WATCH_INTERVAL,
+    rows: int = DEFAULT_WATCH_ROWS,
+    names: list[str] | None = None,
+) -> None:
+    """Poll the port and flow metrics every `interval` seconds and display the deltas and rates of each interval until interrupted.
+
+    Rates are computed from the counters between two polls. Only the `rows` flows losing the most frames are displayed.
+    """
+    previous_ports: dict[str, Counters] = {}
+    previous_flows: dict[str, Counters] = {}
+    previous_time = None
+    with Live(console=console, auto_refresh=False) as live:
+        try:
+            while True:
+                started = time.monotonic()
+                metrics = _get_metrics(api, ("port", "flow"), names)
+                port_stats, flow_stats = metrics["port"], metrics["flow"]
+                # The counters were sampled somewhere during the request
+                sampled = (started + time.monotonic()) / 2
+                ports, flows = _counters(port_stats), _counters(flow_stats)
+                transmit = {s.name: s.transmit for s in flow_stats}
+                elapsed = sampled - previous_time if previous_time is not None else interval
+                live.update(
+                    _watch_tables(ports, flows, transmit, previous_ports, previous_flows, elapsed, rows),
+                    refresh=True,
+                )
+                previous_ports, previous_flows, previous_time = ports, flows, sampled
+                time.sleep(max(interval - (time.monotonic() - started), 0))
+        except KeyboardInterrupt:
+            pass
+
+
+def record(
+    api: snappi.Api,
+    recorder: MetricsRecorder,
+    interval: float = DEFAULT_WATCH_INTERVAL,
+    duration: float | None = None,
+    groups: Iterable[str] = ("port", "flow"),
+    names: list[str] | None = None,
+) -> int:
+    """Record the metrics of the groups every `interval` seconds.
+
+    Stops after `duration` seconds or when interrupted. Returns the number of samples.
+    """
+    groups = list(groups)
+    deadline = time.monotonic() + duration if duration is not None else None
+    samples = 0
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            started = time.monotonic()
+            t = time.time()
+            for group, stats in _get_metrics(api, groups, names).items():
+                recorder.write(group, stats, t)
+            samples += 1
+            time.sleep(max(interval - (time.monotonic() - started), 0))
+    except KeyboardInterrupt:
+        pass
+    return samples
@@ -0,0 +1,100 @@
+"""pyeapi transport keeping eAPI connections open between requests.
+
+Use it in the NAPALM optional arguments with `transport: arista_lab.LabEapiConnection`.
+"""
+import ssl
+import threading
+from collections import Counter
+from http.client import HTTPConnection, HTTPException, RemoteDisconnected
+from pyeapi.eapilib import HttpsEapiConnection, HttpsConnection, ConnectionError as EapiConnectionError  # type: ignore[import-untyped]
+
+from arista_lab import ssl_context
+
+
+# Number of TLS handshakes, resumed TLS sessions and requests sent over an already open connection
+connection_stats: Counter[str] = Counter()
+_stats_lock = threading.Lock()
+_tls_sessions: dict[tuple[str, int], ssl.SSLSession] = {}
+# Errors of a connection closed by the device, a request is only retried after one of them
+_DISCONNECTED = (RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+def _count(stat: str) -> None:
+    with _stats_lock:
+        connection_stats[stat] += 1
+
+
+class LabHttpsConnection(HttpsConnection):
+    """
+    HTTPS transport keeping the connection open between eAPI requests and resuming TLS sessions.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(LabHttpsConnection, self).__init__(*args, **kwargs)
+        self._closing = False
+
+    def connect(self):
+        HTTPConnection.connect(self)
+        key = (self.host, self.port)
+        self.sock = self._context.wrap_socket(
+            self.sock, server_hostname=self.host, session=_tls_sessions.get(key)
+        )
+        _count("handshakes")
+        if self.sock.session_reused:
+            _count("resumed")
+        _tls_sessions[key] = self.sock.session
+
+    def getresponse(self, *args, **kwargs):
+        # http.client closes the connection from here when the device does not keep it alive
+        self._closing = True
+        try:
+            return super(LabHttpsConnection, self).getresponse(*args, **kwargs)
+        finally:
+            self._closing = False
+
+    def close(self):
+        # pyeapi closes the transport after every request, keep the connection open instead
+        if self._closing:
+            self.reset()
+
+    def reset(self):
+        super(LabHttpsConnection, self).close()
+
+
+class LabEapiConnection(HttpsEapiConnection):
+    """
+    https://arista.my.site.com/AristaCommunity/s/article/Python-3-10-and-SSLV3-ALERT-HANDSHAKE-FAILURE-error
+    """
+
+    # The arguments are listed so that NAPALM passes the optional arguments 'port' and 'path' of the inventory
+    def __init__(self, host, port=None, path=None, username=None, password=None, context=None, timeout=60, **kwargs):
+        super(LabEapiConnection, self).__init__(
+            host, port=port, path=path, username=username, password=password, context=ssl_context(), timeout=timeout, **kwargs
+        )
+        self.transport = LabHttpsConnection(
+            self.transport.path,
+            self.transport.host,
+            self.transport.port,
+            context=ssl_context(),
+            timeout=self.transport.timeout,
+        )
+
+    def close(self):
+        # Called by the NAPALM driver when the connection is closed
+        self.transport.reset()
+
+    def send(self, data):
+        reused = self.transport.sock is not None
+        if reused:
+            _count("reused")
+        try:
+            return super(LabEapiConnection, self).send(data)
+        except (EapiConnectionError, HTTPException) as e:
+            self.transport.reset()
+            # pyeapi raises its ConnectionError while handling the socket error
+            error = e if isinstance(e, HTTPException) else e.__context__
+            if not reused or not isinstance(error, _DISCONNECTED):
+                # A timeout is not retried, the device may still be running the request
+                raise
+            # The device closed the idle connection, retry once on a new one
+            return super(LabEapiConnection, self).send(data)
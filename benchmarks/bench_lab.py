@@ -0,0 +1,289 @@
+"""Benchmark the lab commands against simulated EOS devices at 10, 100 and 1000 hosts.
+
+A fleet of fake devices (see fake_eos.py) serves eAPI on localhost. For every number of hosts, an
+inventory, a links file, templates, configuration files and RIPEstat fixtures are generated. Each
+command then runs in a new process against devices reset to the base configuration. The wall time of
+the command, the eAPI round trips per host, the failed requests and the peak memory (max RSS) of the
+process are reported.
+
+With --baseline, exits with status 1 if a command is slower than in the baseline by more than
+--tolerance or sends more requests per host. Save a baseline with --output.
+
+Usage: python benchmarks/bench_lab.py [--hosts 10,100,1000] [--commands backup,load,...] [--latency 0.01]
+                                      [--config-lines 1000] [--fail-rate 0] [--http] [--output FILE] [--baseline FILE]
+"""
+import argparse
+import ipaddress
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import yaml
+
+import fake_eos
+
+BACKBONE = "backbone"
+ISP = "isp"
+
+
+def _backup(backend: str) -> Callable[[Any, Path], None]:
+    def run(nornir: Any, lab: Path) -> None:
+        from arista_lab.config import create_backups
+
+        create_backups(nornir, backend=backend)
+
+    return run
+
+
+def _save(backend: str) -> Callable[[Any, Path], None]:
+    def run(nornir: Any, lab: Path) -> None:
+        from arista_lab.config import save
+
+        save(nornir, lab / "saved", backend=backend)
+
+    return run
+
+
+def _load(nornir: Any, lab: Path) -> None:
+    from arista_lab.config import load
+
+    load(nornir, lab / "configs")
+
+
+def _apply(merged: bool) -> Callable[[Any, Path], None]:
+    def run(nornir: Any, lab: Path) -> None:
+        from arista_lab.config import apply_templates
+
+        apply_templates(nornir, lab / "templates", merged=merged)
+
+    return run
+
+
+def _interfaces(batch: bool) -> Callable[[Any, Path], None]:
+    def run(nornir: Any, lab: Path) -> None:
+        from arista_lab.config import interfaces
+
+        interfaces.configure(nornir, lab / "links.yaml", batch=batch)
+
+    return run
+
+
+def _peering(nornir: Any, lab: Path) -> None:
+    from arista_lab.config import peering
+    from arista_lab.ripestat import PrefixCache
+
+    peering.configure(nornir, ISP, BACKBONE, cache=PrefixCache(lab / "ripestat", offline=True))
+
+
+COMMANDS: dict[str, Callable[[Any, Path], None]] = {
+    "backup": _backup("nornir"),
+    "backup-eapi": _backup("eapi"),
+    "save": _save("nornir"),
+    "save-eapi": _save("eapi"),
+    "load": _load,
+    "apply": _apply(merged=False),
+    "apply-merged": _apply(merged=True),
+    "interfaces": _interfaces(batch=False),
+    "interfaces-batch": _interfaces(batch=True),
+    "peering": _peering,
+}
+
+TEMPLATES = {
+    "hostname.j2": "hostname {{ host.name }}\n",
+    "ntp.j2": "ntp server 192.0.2.123\n",
+    "management.j2": "interface Management1\n   description {{ host.name }} out-of-band\n",
+}
+
+
+def generate_lab(
+    folder: Path,
+    hosts: int,
+    fleet: fake_eos.Fleet,
+    workers: int,
+    config_lines: int,
+    asns: int = 10,
+    prefixes: int = 100,
+) -> None:
+    """Inventory, links, templates, configuration files and RIPEstat fixtures of a lab of `hosts` devices."""
+    folder.mkdir(parents=True, exist_ok=True)
+    names = [f"leaf{i:04d}" for i in range(1, hosts + 1)]
+    transport = "arista_lab.LabEapiConnection" if fleet.https else "http"
+    inventory = {}
+    for i, name in enumerate(names):
+        asn = 65001 + i % asns
+        inventory[name] = {
+            "hostname": "127.0.0.1",
+            "port": fleet.port_of(i),
+            # The fake devices are told apart by the username
+            "username": name,
+            "password": "bench",
+            "platform": "eos",
+            "groups": [ISP],
+            "data": {
+                "asn": asn,
+                "isp": f"ISP{asn}",
+                "description": f"ISP AS{asn}",
+                "as_path_length": 2,
+                "neighbor_ipv4": str(ipaddress.IPv4Address("192.0.2.0") + i % 256),
+                "neighbor_ipv6": str(ipaddress.IPv6Address("2001:db8::") + i),
+            },
+            "connection_options": {"napalm": {"extras": {"optional_args": {"transport": transport}}}},
+        }
+    groups = {ISP: {}, BACKBONE: {"data": {"network_name": "BACKBONE", "asn": 65000}}}
+    (folder / "hosts.yaml").write_text(yaml.safe_dump(inventory))
+    (folder / "groups.yaml").write_text(yaml.safe_dump(groups))
+    (folder / "nornir.yaml").write_text(
+        yaml.safe_dump(
+            {
+                "inventory": {
+                    "plugin": "SimpleInventory",
+                    "options": {"host_file": str(folder / "hosts.yaml"), "group_file": str(folder / "groups.yaml")},
+                },
+                "runner": {"plugin": "threaded", "options": {"num_workers": workers}},
+                "logging": {"enabled": False},
+            }
+        )
+    )
+
+    # Ring of point-to-point links
+    links = []
+    for i in range(hosts if hosts > 2 else hosts - 1):
+        links.append(
+            {
+                "endpoints": [f"{names[i]}:Ethernet1", f"{names[(i + 1) % hosts]}:Ethernet2"],
+                "ipv4_subnet": str(ipaddress.IPv4Network((int(ipaddress.IPv4Address("10.0.0.0")) + 2 * i, 31))),
+                "ipv6_subnet": str(ipaddress.IPv6Network((int(ipaddress.IPv6Address("fc00::")) + 2 * i, 127))),
+                "isis": {"instance": "ISIS", "metric": 10},
+            }
+        )
+    (folder / "links.yaml").write_text(yaml.safe_dump({"links": links}))
+
+    (folder / "templates").mkdir(exist_ok=True)
+    for name, template in TEMPLATES.items():
+        (folder / "templates" / name).write_text(template)
+
+    (folder / "configs").mkdir(exist_ok=True)
+    (folder / "saved").mkdir(exist_ok=True)
+    config = fake_eos.base_config(config_lines)
+    for name in names:
+        (folder / "configs" / f"{name}.cfg").write_text(config.replace("hostname localhost", f"hostname {name}"))
+
+    (folder / "ripestat").mkdir(exist_ok=True)
+    for n in range(asns):
+        asn = 65001 + n
+        announced = [
+            str(ipaddress.IPv4Network(((100 + n) << 24 | p << 8, 24))) for p in range(prefixes)
+        ] + [str(ipaddress.IPv6Network((0x20010DB8 << 96 | n << 80 | p << 64, 64))) for p in range(prefixes // 4)]
+        fixture = {"data": {"prefixes": [{"prefix": p} for p in announced]}}
+        (folder / "ripestat" / f"AS{asn}.json").write_text(json.dumps(fixture))
+
+
+def run_command(command: str, lab: Path, result: Path) -> None:
+    """Run a command on the lab in this process and write its wall time and peak memory to `result`."""
+    os.chdir(lab)
+    from nornir import InitNornir
+
+    nornir = InitNornir(config_file=str(lab / "nornir.yaml"))
+    start = time.perf_counter()
+    COMMANDS[command](nornir, lab)
+    elapsed = time.perf_counter() - start
+    # Kilobytes on Linux
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    result.write_text(json.dumps({"time": elapsed, "max_rss": max_rss}))
+
+
+def measure(fleet: fake_eos.Fleet, command: str, lab: Path, hosts: int) -> dict[str, Any]:
+    fleet.reset()
+    result = lab / f"{command}.result.json"
+    p = subprocess.run(
+        [sys.executable, __file__, "--run", command, "--lab", str(lab), "--result", str(result)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if p.returncode != 0:
+        raise RuntimeError(f"{command} with {hosts} hosts failed:\n{p.stderr[-2000:]}")
+    r = json.loads(result.read_text())
+    requests, errors = fleet.stats()
+    return {
+        "command": command,
+        "hosts": hosts,
+        "time": r["time"],
+        "round_trips": sum(requests.values()) / hosts,
+        "max_round_trips": max(requests.values(), default=0),
+        "errors": sum(errors.values()),
+        "max_rss": r["max_rss"],
+    }
+
+
+def regressions(results: list[dict[str, Any]], baseline: list[dict[str, Any]], tolerance: float) -> list[str]:
+    previous = {(b["command"], b["hosts"]): b for b in baseline}
+    found = []
+    for r in results:
+        if (b := previous.get((r["command"], r["hosts"]))) is None:
+            continue
+        if r["time"] > b["time"] * (1 + tolerance):
+            found.append(f"{r['command']} ({r['hosts']} hosts): {r['time']:.2f}s, baseline {b['time']:.2f}s")
+        if r["round_trips"] > b["round_trips"]:
+            found.append(f"{r['command']} ({r['hosts']} hosts): {r['round_trips']:.1f} round trips/host, baseline {b['round_trips']:.1f}")
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--hosts", default="10,100,1000", help="Comma-separated numbers of hosts")
+    parser.add_argument("--commands", default=",".join(COMMANDS), help=f"Comma-separated commands among {', '.join(COMMANDS)}")
+    parser.add_argument("--latency", type=float, default=fake_eos.FleetConfig.latency, help="eAPI request latency in seconds")
+    parser.add_argument("--config-lines", type=int, default=fake_eos.FleetConfig.config_lines, help="Size of the device configurations")
+    parser.add_argument("--fail-rate", type=float, default=fake_eos.FleetConfig.fail_rate, help="Probability for a configuration request to fail")
+    parser.add_argument("--http", action="store_true", help="Serve eAPI over HTTP instead of HTTPS")
+    parser.add_argument("--processes", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="Processes serving the devices")
+    parser.add_argument("--workers", type=int, default=100, help="Nornir threaded runner workers")
+    parser.add_argument("--output", type=Path, help="Write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, help="Compare the results with this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Accepted slowdown compared to the baseline")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    parser.add_argument("--lab", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--result", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        return run_command(args.run, args.lab, args.result)
+
+    commands = args.commands.split(",")
+    if unknown := [c for c in commands if c not in COMMANDS]:
+        parser.error(f"unknown commands: {', '.join(unknown)}")
+    config = fake_eos.FleetConfig(latency=args.latency, config_lines=args.config_lines, fail_rate=args.fail_rate)
+    results = []
+    print(
+        f"latency {args.latency * 1000:.0f}ms, {args.config_lines} configuration lines, fail rate {args.fail_rate}, "
+        f"{'HTTP' if args.http else 'HTTPS'}, {args.processes} device processes, {args.workers} Nornir workers"
+    )
+    print(f"{'command':<18}{'hosts':>6}{'time':>10}{'hosts/s':>10}{'trips/host':>12}{'max trips':>11}{'errors':>8}{'max RSS':>10}")
+    with fake_eos.Fleet(config, processes=args.processes, https=not args.http) as fleet, tempfile.TemporaryDirectory() as tmp:
+        for hosts in (int(h) for h in args.hosts.split(",")):
+            lab = Path(tmp) / str(hosts)
+            generate_lab(lab, hosts, fleet, workers=args.workers, config_lines=args.config_lines)
+            for command in commands:
+                r = measure(fleet, command, lab, hosts)
+                results.append(r)
+                print(
+                    f"{command:<18}{hosts:>6}{r['time']:>9.2f}s{hosts / r['time']:>10.1f}{r['round_trips']:>12.1f}"
+                    f"{r['max_round_trips']:>11}{r['errors']:>8}{r['max_rss'] / 2**20:>8.0f}MB"
+                )
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        if found := regressions(results, json.loads(args.baseline.read_text()), args.tolerance):
+            print("Regressions:\n  " + "\n  ".join(found))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Benchmark the rendering of the peering configuration for ISPs announcing many prefixes.
+
+Compares rendering with a new Jinja environment per host, as nornir_jinja2 `template_file` does,
+with the template compiled once and cached by `arista_lab.templates`.
+
+Usage: python benchmarks/bench_peering_render.py [HOSTS]
+"""
+import ipaddress
+import sys
+import time
+from importlib.resources import files
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined
+
+from arista_lab import templates
+
+PREFIX_COUNTS = (20, 2000, 5000)
+
+
+def peering_vars(count: int) -> dict:
+    v4 = [ipaddress.IPv4Network((0x0A000000 + (i << 8), 24)) for i in range(count)]
+    v6 = [ipaddress.IPv6Network(((0x20010DB8 << 96) + (i << 80), 48)) for i in range(count // 4)]
+    return {
+        "hosts": [f"{n[1]}/{n.prefixlen}" for n in v4],
+        "hosts_ipv6": [f"{n[1]}/{n.prefixlen}" for n in v6],
+        "prefixes": [str(n) for n in v4],
+        "prefixes_ipv6": [str(n) for n in v6],
+        "name": "ISP",
+        "asn": 65000,
+        "description": "ISP",
+        "as_path_length": 3,
+        "max_loopback": 2100,
+        "neighbor_name": "BACKBONE",
+        "neighbor_ipv4": "192.0.2.1",
+        "neighbor_ipv6": "2001:db8::1",
+        "neighbor_as": 65001,
+    }
+
+
+def render_uncached(vars: dict) -> str:
+    env = Environment(
+        loader=FileSystemLoader(str(files(templates) / "peering")),
+        undefined=StrictUndefined,
+        trim_blocks=True,
+    )
+    return env.get_template("isp.j2").render(vars=vars)
+
+
+def render_cached(vars: dict) -> str:
+    return templates.render("peering", "isp.j2", vars=vars)
+
+
+def main(hosts: int = 20) -> None:
+    for count in PREFIX_COUNTS:
+        vars = peering_vars(count)
+        for name, func in (("uncached", render_uncached), ("cached", render_cached)):
+            start = time.perf_counter()
+            for _ in range(hosts):
+                config = func(vars)
+            elapsed = time.perf_counter() - start
+            print(f"{count:>5} prefixes, {hosts} hosts, {name:>8}: {elapsed * 1000 / hosts:7.2f} ms/host, {len(config.splitlines())} lines")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
@@ -0,0 +1,38 @@
+"""Benchmark the removal of overlapping prefixes used to build the peering configuration.
+
+Usage: python benchmarks/bench_prefixes.py [COUNT]
+"""
+import ipaddress
+import random
+import sys
+import time
+
+from arista_lab.prefixes import non_overlapping
+
+
+def generate(count: int, seed: int = 0) -> list[str]:
+    """Random mix of IPv4 and IPv6 prefixes with nested prefixes, like the announcements of a large transit ASN."""
+    rng = random.Random(seed)
+    prefixes = []
+    for _ in range(count):
+        if rng.random() < 0.7:
+            length = 24 if rng.random() < 0.8 else rng.randint(12, 23)
+            address = rng.getrandbits(32)
+            prefixes.append(str(ipaddress.IPv4Network((address, length), strict=False)))
+        else:
+            length = 48 if rng.random() < 0.8 else rng.randint(29, 47)
+            address = 0x2000 << 112 | rng.getrandbits(116)
+            prefixes.append(str(ipaddress.IPv6Network((address, length), strict=False)))
+    return prefixes
+
+
+def main(count: int = 100_000) -> None:
+    prefixes = generate(count)
+    start = time.perf_counter()
+    networks = non_overlapping(prefixes)
+    elapsed = time.perf_counter() - start
+    print(f"{count} prefixes -> {len(networks)} non-overlapping networks in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
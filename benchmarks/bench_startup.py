@@ -0,0 +1,48 @@
+"""Check the import time of the CLI against a budget.
+
+`lab --help`, shell completion and every command pay for the imports of `arista_lab.cli`.
+nornir, NAPALM and snappi must only be imported by the commands using them.
+Exits with status 1 if the budget is exceeded or if a heavy module is imported at startup.
+
+Usage: python benchmarks/bench_startup.py [BUDGET_MS] [RUNS]
+"""
+import subprocess
+import sys
+
+HEAVY_MODULES = ("nornir", "nornir_napalm", "napalm", "pyeapi", "snappi", "snappi_ixnetwork", "requests", "arista_lab.config", "arista_lab.traffic")
+
+
+def import_time(module: str) -> tuple[float, set[str]]:
+    """Cumulative import time of `module` in microseconds, measured with `python -X importtime`, and the imported modules."""
+    p = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed = 0.0
+    modules = set()
+    for line in p.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            modules.add(name.strip())
+            if name.strip() == module:
+                elapsed = float(cumulative)
+    return elapsed, modules
+
+
+def main(budget_ms: float = 300, runs: int = 5) -> None:
+    results = [import_time("arista_lab.cli") for _ in range(runs)]
+    best = min(elapsed for elapsed, _ in results) / 1000
+    heavy = sorted(m for m in results[0][1] if m in HEAVY_MODULES)
+    print(f"import arista_lab.cli: {best:.1f}ms (best of {runs}, budget {budget_ms:.0f}ms)")
+    if heavy:
+        print(f"Heavy modules imported at startup: {', '.join(heavy)}")
+    if best > budget_ms or heavy:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(*(float(a) for a in sys.argv[1:2]), *(int(a) for a in sys.argv[2:3]))
@@ -0,0 +1,568 @@
+"""Simulated EOS devices answering eAPI requests, to benchmark the lab commands without hardware.
+
+The devices are served over HTTP or HTTPS by asyncio servers running in separate processes, so that
+the benchmarked command does not share its CPU with the devices. All the devices of a process listen
+on the same port and are told apart by the username of the request: the inventory sets the username
+to the device name. A device is created with the base configuration on its first request.
+
+The devices implement the commands sent by NAPALM and by the eAPI backend: configuration sessions
+with commit timers, running and startup configurations, backups on flash, 'configure replace' and
+'show' commands for the version, the sessions and the session diffs. The configuration is modelled
+as a tree of lines, good enough for diffs and idempotent merges, not as the EOS parser.
+
+Usage as a standalone fleet: python benchmarks/fake_eos.py [PORT] [LATENCY] [CONFIG_LINES] [FAIL_RATE]
+"""
+import asyncio
+import base64
+import difflib
+import json
+import multiprocessing
+import random
+import ssl
+import tempfile
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+EAPI_PATH = "/command-api"
+STATS_PATH = "/fleet/stats"
+RESET_PATH = "/fleet/reset"
+VERSION = "4.32.0F"
+MODEL = "vEOS-lab"
+
+# Commands entering a configuration mode from any mode, and sub-modes of these modes
+MODES = (
+    "interface ",
+    "router ",
+    "route-map ",
+    "ip prefix-list ",
+    "ipv6 prefix-list ",
+    "ip access-list ",
+    "ipv6 access-list ",
+    "management ",
+    "vlan ",
+    "vrf instance ",
+    "daemon ",
+    "policy-map ",
+    "class-map ",
+)
+SUBMODES = ("address-family ", "vrf ")
+# Top-level commands leaving the current mode
+GLOBAL = ("hostname ", "ip routing", "ipv6 unicast-routing", "ntp ", "logging ", "username ", "service ", "spanning-tree ", "ip name-server ", "dns ")
+# Lines replacing the line with the same prefix in their mode
+SINGLE = ("hostname ", "description ", "ip address ", "mtu ", "router-id ", "isis metric ", "speed ")
+
+Tree = dict[str, "Tree | None"]
+
+
+class CommandFailed(Exception):
+    pass
+
+
+def _copy(tree: Tree) -> Tree:
+    return {line: None if children is None else _copy(children) for line, children in tree.items()}
+
+
+def _set(tree: Tree, line: str) -> Tree | None:
+    """Add a line to a mode and return its sub-mode, if it enters one."""
+    if line.startswith("no "):
+        negated = line[3:]
+        removed = [key for key in tree if key == negated or key.startswith(f"{negated} ")]
+        for key in removed:
+            del tree[key]
+        if not removed:
+            # Disabled defaults, e.g. 'no switchport', are shown in the configuration
+            tree[line] = None
+        return None
+    tree.pop(f"no {line}", None)
+    if line.startswith(MODES) or line.startswith(SUBMODES):
+        if not isinstance(children := tree.get(line), dict):
+            children = tree[line] = {}
+        return children
+    for prefix in SINGLE:
+        if line.startswith(prefix):
+            for key in [k for k in tree if k.startswith(prefix)]:
+                del tree[key]
+    tree[line] = None
+    return None
+
+
+def parse_config(text: str) -> Tree:
+    """Tree of an indented configuration, e.g. a running-config."""
+    tree: Tree = {}
+    # (indentation, line, mode of the line)
+    stack: list[tuple[int, str | None, Tree]] = [(-1, None, tree)]
+    for raw in text.splitlines():
+        line = raw.rstrip()
+        if not line.strip() or line.lstrip().startswith("!"):
+            continue
+        if line == "end":
+            break
+        indent = len(line) - len(line.lstrip())
+        while stack[-1][0] >= indent:
+            stack.pop()
+        _, parent, mode = stack[-1]
+        if parent is not None:
+            if not isinstance(mode[parent], dict):
+                mode[parent] = {}
+            mode = mode[parent]  # type: ignore[assignment]
+        text = line.strip()
+        if text.startswith(MODES + SUBMODES) and not isinstance(mode.get(text), dict):
+            mode[text] = {}
+        else:
+            mode.setdefault(text, None)
+        stack.append((indent, text, mode))
+    return tree
+
+
+def render_config(tree: Tree, name: str) -> str:
+    lines = [
+        "! Command: show running-config",
+        f"! device: {name} ({MODEL}, EOS-{VERSION})",
+        "!",
+        f"! boot system flash:/{MODEL}.swi",
+        "!",
+    ]
+
+    def render(t: Tree, indent: int) -> None:
+        for line, children in t.items():
+            lines.append(" " * indent + line)
+            if children is not None:
+                render(children, indent + 3)
+            if indent == 0:
+                lines.append("!")
+
+    render(tree, 0)
+    lines.append("end")
+    return "\n".join(lines) + "\n"
+
+
+def base_config(lines: int, interfaces: int = 8) -> str:
+    """Running-config of about `lines` lines, with the Ethernet interfaces of the lab links and Loopbacks."""
+    config = [
+        "hostname localhost",
+        "!",
+        "username admin privilege 15 role network-admin secret sha512 $6$bench",
+        "!",
+        "management api http-commands",
+        "   no shutdown",
+        "!",
+        "spanning-tree mode mstp",
+        "!",
+    ]
+    for i in range(1, interfaces + 1):
+        config += [f"interface Ethernet{i}", "   no switchport", "!"]
+    i = 0
+    while len(config) < lines:
+        i += 1
+        config += [
+            f"interface Loopback{i}",
+            f"   description bench loopback {i}",
+            f"   ip address 10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}/32",
+            "!",
+        ]
+    config += ["ip routing", "!", "end"]
+    return "\n".join(config) + "\n"
+
+
+@dataclass
+class Session:
+    tree: Tree
+    state: str = "pending"
+    commit_by: float | None = None
+    rollback: Tree | None = None
+
+
+@dataclass
+class Device:
+    name: str
+    running: Tree
+    startup: str
+    boot: float = field(default_factory=time.monotonic)
+    flash: dict[str, str] = field(default_factory=dict)
+    sessions: dict[str, Session] = field(default_factory=dict)
+    _rendered: tuple[Tree, str] | None = None
+
+    @property
+    def uptime(self) -> float:
+        return time.monotonic() - self.boot + 3600
+
+    def running_config(self) -> str:
+        # The running tree is never modified in place, it is replaced
+        if self._rendered is None or self._rendered[0] is not self.running:
+            self._rendered = (self.running, render_config(self.running, self.name))
+        return self._rendered[1]
+
+    def _expire(self) -> None:
+        for name, s in list(self.sessions.items()):
+            if s.state == "pendingCommitTimer" and s.commit_by is not None and s.commit_by < self.uptime:
+                self.running = s.rollback or {}
+                del self.sessions[name]
+
+    def _session(self, name: str) -> Session:
+        if (s := self.sessions.get(name)) is None:
+            raise CommandFailed(f"% Configuration session {name} does not exist")
+        return s
+
+    def _file(self, path: str) -> str:
+        name = path.removeprefix("flash:").lstrip("/")
+        if name not in self.flash:
+            raise CommandFailed(f"% Error listing directory flash:/{name} (No such file or directory)")
+        return name
+
+    def _dir(self, names: list[str]) -> str:
+        files = "\n".join(f"       -rwx        {len(self.flash[n]):>8}           Jan 1 00:00  {n}" for n in names)
+        return f"Directory of flash:/\n\n{files}\n\n4000000000 bytes total (3000000000 bytes free)\n"
+
+    def run(self, commands: list[Any], encoding: str, fail: bool) -> list[Any]:
+        """Run the commands of a request, raise CommandFailed with the outputs of the commands run before the failure."""
+        self._expire()
+        outputs: list[Any] = []
+        # Configuration mode: (tree being configured, session name or None for the running-config, mode stack)
+        config: tuple[Tree, str | None, list[Tree]] | None = None
+        for command in commands:
+            cmd = (command["cmd"] if isinstance(command, dict) else command).strip()
+            try:
+                if config is not None and cmd not in ("end",) and not cmd.startswith("configure session "):
+                    if fail:
+                        raise CommandFailed("% Invalid input (simulated failure)")
+                    tree, _, stack = config
+                    if cmd == "exit":
+                        if len(stack) > 1:
+                            stack.pop()
+                    elif cmd == "rollback clean-config":
+                        tree.clear()
+                        del stack[1:]
+                    elif cmd and not cmd.startswith("!"):
+                        if cmd.startswith(MODES + GLOBAL):
+                            del stack[1:]
+                        elif cmd.startswith(SUBMODES) and len(stack) > 2:
+                            del stack[2:]
+                        if (mode := _set(stack[-1], cmd)) is not None:
+                            stack.append(mode)
+                    output: Any = {}
+                else:
+                    output = self._exec(cmd, encoding)
+                    if cmd in ("configure", "configure terminal"):
+                        config = (_copy(self.running), None, [])
+                        config[2].append(config[0])
+                    elif cmd.startswith("configure session ") and len(cmd.split()) == 3:
+                        name = cmd.split()[2]
+                        session = self.sessions.setdefault(name, Session(_copy(self.running)))
+                        config = (session.tree, name, [session.tree])
+                    elif cmd == "end":
+                        if config is not None and config[1] is None:
+                            self.running = config[0]
+                        config = None
+            except CommandFailed as e:
+                outputs.append({"errors": [str(e)]})
+                raise CommandFailed(str(e), outputs)
+            if encoding == "text":
+                outputs.append({"output": output if isinstance(output, str) else json.dumps(output)})
+            else:
+                outputs.append(output if isinstance(output, dict) else {})
+        if config is not None and config[1] is None:
+            self.running = config[0]
+        return outputs
+
+    def _exec(self, cmd: str, encoding: str) -> Any:
+        words = cmd.split()
+        if cmd in ("enable", "end", "configure", "configure terminal"):
+            return "" if encoding == "text" else {}
+        if cmd == "show version":
+            if encoding == "text":
+                return f"Arista {MODEL}\nSoftware image version: {VERSION}\nUptime: {self.uptime:.0f} seconds\n"
+            return {"modelName": MODEL, "version": VERSION, "uptime": self.uptime, "hostname": self.name}
+        if cmd in ("show running-config", "show running-config all"):
+            return self.running_config()
+        if cmd == "show startup-config":
+            return self.startup
+        if cmd in ("copy running-config startup-config", "write memory", "write"):
+            self.startup = self.running_config()
+            return "Copy completed successfully.\n"
+        if cmd.startswith("copy running-config flash:"):
+            self.flash[cmd.split("flash:", 1)[1].lstrip("/")] = self.running_config()
+            return "Copy completed successfully.\n"
+        if cmd.startswith("copy startup-config flash:"):
+            self.flash[cmd.split("flash:", 1)[1].lstrip("/")] = self.startup
+            return "Copy completed successfully.\n"
+        if cmd == "dir flash:":
+            return self._dir(sorted(self.flash))
+        if cmd.startswith("dir flash:"):
+            return self._dir([self._file(cmd[4:])])
+        if cmd.startswith("delete flash:"):
+            del self.flash[self._file(cmd[7:])]
+            return ""
+        if cmd.startswith("configure replace flash:"):
+            self.running = parse_config(self.flash[self._file(cmd[18:])])
+            return ""
+        if cmd in ("show configuration sessions", "show configuration sessions detail"):
+            return {
+                "sessions": {
+                    name: {"state": s.state, "commitBy": s.commit_by, "description": ""} for name, s in self.sessions.items()
+                },
+                "maxSavedSessions": 1,
+                "maxOpenSessions": 5,
+            }
+        if cmd.startswith("show session-config named "):
+            session = self._session(words[3])
+            config = render_config(session.tree, self.name)
+            if words[4:] == ["diffs"]:
+                diff = difflib.unified_diff(
+                    self.running_config().splitlines(),
+                    config.splitlines(),
+                    "system:/running-config",
+                    f"session:/{words[3]}-session-config",
+                    lineterm="",
+                )
+                return "\n".join(diff) + "\n"
+            return config
+        if cmd.startswith("configure session "):
+            name = words[2]
+            if words[3:] == ["abort"]:
+                self.sessions.pop(name, None)
+                return ""
+            if words[3:5] == ["commit", "timer"]:
+                session = self._session(name)
+                h, m, s = (int(v) for v in words[5].split(":"))
+                session.rollback, self.running = self.running, session.tree
+                session.state, session.commit_by = "pendingCommitTimer", self.uptime + h * 3600 + m * 60 + s
+                return ""
+            if words[3:] == ["commit"]:
+                session = self._session(name)
+                if session.state != "pendingCommitTimer":
+                    self.running = session.tree
+                del self.sessions[name]
+                return ""
+            return ""
+        raise CommandFailed("% Invalid input")
+
+
+@dataclass
+class FleetConfig:
+    latency: float = 0.01
+    # Fraction of the latency added at random to each request
+    jitter: float = 0.2
+    config_lines: int = 1000
+    # Probability for a request with configuration commands to be rejected
+    fail_rate: float = 0.0
+    seed: int = 0
+
+
+class FleetServer:
+    """eAPI server of the devices of one process."""
+
+    def __init__(self, config: FleetConfig):
+        self.config = config
+        self.base = parse_config(base_config(config.config_lines))
+        self.devices: dict[str, Device] = {}
+        self.requests: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        self.random = random.Random(config.seed)
+
+    def device(self, name: str) -> Device:
+        if (device := self.devices.get(name)) is None:
+            # The devices share the base tree until their running-config is replaced
+            device = self.devices[name] = Device(name, self.base, startup="")
+            device.startup = device.running_config()
+        return device
+
+    def reset(self) -> None:
+        self.devices.clear()
+        self.requests.clear()
+        self.errors.clear()
+        self.random.seed(self.config.seed)
+
+    async def eapi(self, username: str, body: bytes) -> dict[str, Any]:
+        request = json.loads(body)
+        params = request["params"]
+        device = self.device(username)
+        self.requests[username] = self.requests.get(username, 0) + 1
+        cmds = params["cmds"]
+        words = [(c["cmd"] if isinstance(c, dict) else c).split() for c in cmds]
+        configures = any(w in (["configure"], ["configure", "terminal"]) or (w[:2] == ["configure", "session"] and len(w) == 3) for w in words)
+        fail = configures and self.random.random() < self.config.fail_rate
+        await asyncio.sleep(self.config.latency * (1 + self.config.jitter * self.random.random()))
+        try:
+            result = device.run(cmds, params.get("format", "json"), fail)
+        except CommandFailed as e:
+            self.errors[username] = self.errors.get(username, 0) + 1
+            message, output = e.args
+            return {
+                "jsonrpc": "2.0",
+                "id": request.get("id"),
+                "error": {"code": 1002, "message": f"CLI command {len(output)} of {len(cmds)} failed: {message}", "data": output},
+            }
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                method, path, _ = line.decode().split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status = "200 OK"
+                if path == EAPI_PATH and method == "POST":
+                    username = base64.b64decode(headers.get("authorization", "Basic ").split(" ", 1)[1]).decode().partition(":")[0]
+                    if username:
+                        response = await self.eapi(username, body)
+                    else:
+                        status, response = "401 Unauthorized", {}
+                elif path == STATS_PATH:
+                    response = {"requests": self.requests, "errors": self.errors}
+                elif path == RESET_PATH and method == "POST":
+                    self.reset()
+                    response = {}
+                else:
+                    status, response = "404 Not Found", {}
+                content = json.dumps(response).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(content)}\r\n\r\n".encode() + content
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ssl.SSLError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+def self_signed_certificate(folder: Path) -> tuple[Path, Path]:
+    """RSA certificate and key, as EOS serves eAPI with an RSA certificate."""
+    import datetime
+
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "fake-eos")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    cert_file, key_file = folder / "cert.pem", folder / "key.pem"
+    cert_file.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_file.write_bytes(
+        key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL, serialization.NoEncryption())
+    )
+    return cert_file, key_file
+
+
+def _serve(config: FleetConfig, port: int, certificate: tuple[Path, Path] | None, ready: Any) -> None:
+    context = None
+    if certificate is not None:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(*certificate)
+        # The ciphers offered by arista_lab.create_ssl_context
+        context.set_ciphers("AES256-SHA:DHE-RSA-AES256-SHA:AES128-SHA:DHE-RSA-AES128-SHA:DEFAULT")
+    server = FleetServer(config)
+
+    async def main() -> None:
+        s = await asyncio.start_server(server.handle, "127.0.0.1", port, ssl=context, backlog=4096)
+        ready.send(s.sockets[0].getsockname()[1])
+        async with s:
+            await s.serve_forever()
+
+    asyncio.run(main())
+
+
+class Fleet:
+    """Simulated devices served by `processes` processes, each listening on its own port.
+
+    Use as a context manager. The devices of the inventory are spread over `ports`.
+    """
+
+    def __init__(self, config: FleetConfig, processes: int = 1, https: bool = True, port: int = 0):
+        self.config = config
+        self.processes = processes
+        self.https = https
+        self.port = port
+        self.ports: list[int] = []
+        self._procs: list[multiprocessing.Process] = []
+        self._tmp: tempfile.TemporaryDirectory | None = None
+
+    def __enter__(self) -> "Fleet":
+        certificate = None
+        if self.https:
+            self._tmp = tempfile.TemporaryDirectory()
+            certificate = self_signed_certificate(Path(self._tmp.name))
+        for i in range(self.processes):
+            parent, child = multiprocessing.Pipe()
+            p = multiprocessing.Process(
+                target=_serve,
+                args=(self.config, self.port + i if self.port else 0, certificate, child),
+                daemon=True,
+            )
+            p.start()
+            self._procs.append(p)
+            self.ports.append(parent.recv())
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for p in self._procs:
+            p.terminate()
+            p.join()
+        if self._tmp is not None:
+            self._tmp.cleanup()
+
+    def port_of(self, index: int) -> int:
+        return self.ports[index % len(self.ports)]
+
+    def _call(self, port: int, path: str, method: str = "GET") -> dict[str, Any]:
+        scheme = "https" if self.https else "http"
+        context = None
+        if self.https:
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        request = urllib.request.Request(f"{scheme}://127.0.0.1:{port}{path}", method=method, data=b"" if method == "POST" else None)
+        with urllib.request.urlopen(request, context=context) as r:
+            return json.load(r)
+
+    def reset(self) -> None:
+        """Recreate every device with the base configuration and reset the counters."""
+        for port in self.ports:
+            self._call(port, RESET_PATH, "POST")
+
+    def stats(self) -> tuple[dict[str, int], dict[str, int]]:
+        """Requests and failed requests per device since the last reset."""
+        requests: dict[str, int] = {}
+        errors: dict[str, int] = {}
+        for port in self.ports:
+            s = self._call(port, STATS_PATH)
+            requests.update(s["requests"])
+            errors.update(s["errors"])
+        return requests, errors
+
+
+if __name__ == "__main__":
+    import sys
+
+    args = sys.argv[1:]
+    config = FleetConfig(
+        latency=float(args[1]) if len(args) > 1 else FleetConfig.latency,
+        config_lines=int(args[2]) if len(args) > 2 else FleetConfig.config_lines,
+        fail_rate=float(args[3]) if len(args) > 3 else FleetConfig.fail_rate,
+    )
+    with Fleet(config, port=int(args[0]) if args else 8443) as fleet:
+        print(f"Serving eAPI on https://127.0.0.1:{fleet.ports[0]}, any username is a device. Ctrl-C to stop.")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,25 @@
+from arista_lab.config import _backup_exists, _backup_missing
+
+LISTING = """Directory of flash:/
+
+       -rw-        1423           Oct 18 09:12  rollback-config.old
+       -rw-        1526           Oct 18 10:03  startup-config
+
+3957878784 bytes total (3021185024 bytes free)
+"""
+BACKUP = "       -rw-        1526           Oct 18 10:04  rollback-config\n"
+
+
+def test_backup_exists() -> None:
+    assert _backup_exists(LISTING + BACKUP)
+    assert not _backup_exists(LISTING)
+    assert not _backup_exists("")
+
+
+def test_backup_missing() -> None:
+    # The listing of a missing file fails, so only its error output is there
+    assert _backup_missing([{"output": "% Error: No such file or directory"}])
+    assert _backup_missing([])
+    # The listing ran but the command on the backup failed
+    assert not _backup_missing([{"output": BACKUP}, {"errors": ["% Permission denied"]}])
+    assert _backup_missing([{"output": LISTING}, {"errors": ["% File not found"]}])
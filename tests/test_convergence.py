@@ -0,0 +1,82 @@
+import time
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from arista_lab import convergence
+from arista_lab.convergence import _flow_convergence, report_table
+
+# Frames per second of the flows
+RATE = 1000
+OUTAGE = 0.2
+
+
+def test_flow_convergence() -> None:
+    # Sampled every 100ms at 1000 fps, triggered at 0.5s, no frame received between 0.6s and 0.8s
+    received = [0, 100, 200, 300, 400, 500, 600, 600, 600, 700, 800]
+    points = [(i / 10, (100 * i, rx)) for i, rx in enumerate(received)]
+    f = _flow_convergence(1000, 800, points, triggered=0.5)
+    assert (f.loss, f.tx_rate, f.loss_duration_ms) == (200, 1000.0, 200.0)
+    assert (f.outage_start_ms, f.outage_end_ms) == (100.0, 300.0)
+
+
+def test_flow_convergence_without_loss() -> None:
+    f = _flow_convergence(100, 100, [(0.0, (0, 0)), (0.1, (100, 100))], triggered=0.05)
+    assert (f.loss, f.loss_duration_ms, f.outage_start_ms, f.outage_end_ms) == (0, 0.0, None, None)
+    # No transmit rate without two samples
+    assert _flow_convergence(100, 50, [(0.0, (0, 0))], triggered=0.0).loss_duration_ms == 0.0
+
+
+class Flows:
+    """Flow counters at a constant rate, without any frame received for OUTAGE seconds after the trigger."""
+
+    def __init__(self) -> None:
+        self.start = time.monotonic()
+        self.outage: float | None = None
+        self.stopped: float | None = None
+
+    def trigger(self) -> None:
+        self.outage = time.monotonic()
+
+    def metrics(self, api: Any, groups: Any, names: Any) -> dict[str, list]:
+        now = self.stopped or time.monotonic()
+        lost = 0.0
+        if self.outage is not None:
+            lost = min(max(now - self.outage, 0), OUTAGE)
+        tx = round(RATE * (now - self.start))
+        rx = round(RATE * (now - self.start - lost))
+        return {"flow": [SimpleNamespace(name="f1", frames_tx=tx, frames_rx=rx)]}
+
+    def stop(self, api: Any) -> None:
+        self.stopped = time.monotonic()
+
+
+@pytest.fixture
+def flows(monkeypatch: pytest.MonkeyPatch) -> Flows:
+    flows = Flows()
+    monkeypatch.setattr(convergence, "_get_metrics", flows.metrics)
+    monkeypatch.setattr(convergence, "start", lambda api: None)
+    monkeypatch.setattr(convergence, "stop", flows.stop)
+    monkeypatch.setattr(convergence, "DRAIN_TIME", 0)
+    return flows
+
+
+def test_measure(flows: Flows) -> None:
+    report = convergence.measure(None, flows.trigger, interval=0.02, settle=0.1, duration=0.5)
+    f = report["flows"]["f1"]
+    assert report["trigger_error"] is None
+    assert report["total_loss"] == f["loss"] == pytest.approx(RATE * OUTAGE, abs=5)
+    assert f["loss_duration_ms"] == pytest.approx(1000 * OUTAGE, rel=0.1)
+    assert 0 <= f["outage_start_ms"] < 50
+    assert f["outage_end_ms"] == pytest.approx(1000 * OUTAGE, abs=50)
+    assert list(report_table(report).columns[0].cells) == ["f1"]
+
+
+def test_measure_failed_trigger(flows: Flows) -> None:
+    def trigger() -> None:
+        raise Exception("no such interface")
+
+    report = convergence.measure(None, trigger, interval=0.02, settle=0.05, duration=0.1)
+    assert report["trigger_error"] == "no such interface"
+    assert report["total_loss"] == 0
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable
+
+import pytest
+
+from arista_lab.eapi import AsyncEapiClient, EapiError
+
+Handler = Callable[[int, asyncio.StreamWriter, bytes], Awaitable[bool]]
+
+
+async def read_request(reader: asyncio.StreamReader) -> bytes:
+    headers = await reader.readuntil(b"\r\n\r\n")
+    length = next(int(line.split(b":")[1]) for line in headers.split(b"\r\n") if line.lower().startswith(b"content-length"))
+    return await reader.readexactly(length)
+
+
+async def respond(writer: asyncio.StreamWriter, body: bytes) -> None:
+    request = json.loads(body)
+    content = json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": [{} for _ in request["params"]["cmds"]]}).encode()
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s" % (len(content), content))
+    await writer.drain()
+
+
+async def run(handler: Handler, test: Callable[[AsyncEapiClient, list[bytes]], Awaitable[None]], enable_password: str | None = None) -> None:
+    """Serve eAPI requests with `handler`, called with the number of the request on the server, until it returns False."""
+    received: list[bytes] = []
+
+    async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                body = await read_request(reader)
+                received.append(body)
+                if not await handler(len(received), writer, body):
+                    break
+        except asyncio.IncompleteReadError:
+            pass
+        writer.close()
+
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server, AsyncEapiClient("127.0.0.1", "admin", port=port, transport="http", timeout=0.5, enable_password=enable_password) as client:
+        await test(client, received)
+
+
+def test_timeout_on_reused_connection_is_not_retried() -> None:
+    async def handler(n: int, writer: asyncio.StreamWriter, body: bytes) -> bool:
+        if n == 1:
+            await respond(writer, body)
+            return True
+        await asyncio.sleep(5)
+        return False
+
+    async def test(client: AsyncEapiClient, received: list[bytes]) -> None:
+        await client.run_cmds(["show version"])
+        start = time.monotonic()
+        with pytest.raises(EapiError, match="timed out after 0.5s"):
+            await client.run_cmds(["copy running-config startup-config"])
+        assert time.monotonic() - start < 1
+        await asyncio.sleep(0.1)
+        assert [b"copy running-config" in body for body in received] == [False, True]
+
+    asyncio.run(run(handler, test))
+
+
+def test_idle_connection_closed_by_the_device_is_retried() -> None:
+    async def handler(n: int, writer: asyncio.StreamWriter, body: bytes) -> bool:
+        if n == 2:
+            # Closed without answering, as a device closing an idle keep-alive connection
+            return False
+        await respond(writer, body)
+        return True
+
+    async def test(client: AsyncEapiClient, received: list[bytes]) -> None:
+        await client.run_cmds(["show version"])
+        assert await client.run_cmds(["show hostname"]) == [{}]
+        assert len(received) == 3
+        assert client.requests == 2
+
+    asyncio.run(run(handler, test))
+
+
+def test_new_connection_closed_by_the_device_is_not_retried() -> None:
+    async def handler(n: int, writer: asyncio.StreamWriter, body: bytes) -> bool:
+        return False
+
+    async def test(client: AsyncEapiClient, received: list[bytes]) -> None:
+        with pytest.raises(EapiError, match="connection closed"):
+            await client.run_cmds(["show version"])
+        assert len(received) == 1
+
+    asyncio.run(run(handler, test))
+
+
+def test_enable_password() -> None:
+    async def handler(n: int, writer: asyncio.StreamWriter, body: bytes) -> bool:
+        await respond(writer, body)
+        return True
+
+    async def test(client: AsyncEapiClient, received: list[bytes]) -> None:
+        await client.run_cmds(["show version"])
+        assert json.loads(received[0])["params"]["cmds"][0] == {"cmd": "enable", "input": "secret"}
+
+    asyncio.run(run(handler, test, enable_password="secret"))
@@ -0,0 +1,87 @@
+import difflib
+
+from arista_lab.config import _diff_sections
+from arista_lab.config.interfaces import _interface_changes, _same_interface
+
+
+def interface(name: str, metric: int = 10, extra: str = "") -> str:
+    return (
+        f"interface {name}\n"
+        f"   description to {name}\n"
+        "   no switchport\n"
+        "   ip address 10.0.0.1/31\n"
+        "   ipv6 address fc00::1/127\n"
+        "   isis enable ISIS\n"
+        "   isis network point-to-point\n"
+        f"   isis metric {metric}\n"
+        f"{extra}"
+    )
+
+
+def running_config(*interfaces: str) -> str:
+    return "hostname r1\n!\n" + "!\n".join(interfaces) + "!\nend\n"
+
+
+def session_diff(before: str, after: str) -> str:
+    return "\n".join(difflib.unified_diff(before.splitlines(), after.splitlines(), "running", "session", lineterm=""))
+
+
+def test_sections_reset_at_each_hunk() -> None:
+    diff = (
+        "--- running\n+++ session\n"
+        "@@ -1,3 +1,3 @@\n interface Ethernet1\n-   isis metric 10\n+   isis metric 20\n"
+        "@@ -40,3 +40,3 @@\n    isis enable ISIS\n-   isis metric 10\n+   isis metric 30\n"
+    )
+    assert _diff_sections(diff) == {
+        "interface Ethernet1": ["-   isis metric 10", "+   isis metric 20"],
+        None: ["-   isis metric 10", "+   isis metric 30"],
+    }
+
+
+def test_sections_end_at_separators() -> None:
+    diff = "--- running\n+++ session\n@@ -1,4 +1,5 @@\n interface Ethernet1\n    no switchport\n !\n+router isis ISIS\n end\n"
+    assert _diff_sections(diff) == {"router isis ISIS": ["+router isis ISIS"]}
+
+
+def test_new_interface() -> None:
+    before = running_config(interface("Ethernet1"), interface("Ethernet2"))
+    after = running_config(interface("Ethernet1"), interface("Ethernet2"), interface("Ethernet3", 5))
+    changes = _interface_changes(session_diff(before, after), {"Ethernet3": interface("Ethernet3", 5)})
+    assert changes == {"Ethernet3": [f"+{line}" for line in interface("Ethernet3", 5).splitlines()]}
+
+
+def test_additions_to_interfaces_far_apart() -> None:
+    before = running_config(interface("Ethernet1"), interface("Ethernet2"))
+    after = running_config(
+        interface("Ethernet1", extra="   mtu 9000\n"),
+        interface("Ethernet2", extra="   isis authentication mode md5\n"),
+    )
+    config = {
+        "et1": interface("Ethernet1", extra="   mtu 9000\n"),
+        "et2": interface("Ethernet2", extra="   isis authentication mode md5\n"),
+    }
+    assert _interface_changes(session_diff(before, after), config) == {
+        "et1": ["+   mtu 9000"],
+        "et2": ["+   isis authentication mode md5"],
+    }
+
+
+def test_changes_to_interfaces_far_apart_are_not_misattributed() -> None:
+    # The hunks do not show the interface headers and the removed lines are in both interfaces
+    before = running_config(interface("Ethernet1"), interface("Ethernet2"))
+    after = running_config(interface("Ethernet1", 20), interface("Ethernet2", 30))
+    config = {"Ethernet1": interface("Ethernet1", 20), "Ethernet2": interface("Ethernet2", 30)}
+    assert _interface_changes(session_diff(before, after), config) is None
+
+
+def test_changes_outside_the_interfaces() -> None:
+    before = running_config(interface("Ethernet1"))
+    after = running_config(interface("Ethernet1", 20)).replace("hostname r1", "hostname r2")
+    assert _interface_changes(session_diff(before, after), {"Ethernet1": interface("Ethernet1", 20)}) is None
+
+
+def test_same_interface() -> None:
+    assert _same_interface("et1", "Ethernet1")
+    assert _same_interface("Ethernet1/1", "eth1/1")
+    assert not _same_interface("Ethernet1", "Ethernet10")
+    assert not _same_interface("Ethernet1", "Management1")
@@ -0,0 +1,84 @@
+import json
+from pathlib import Path
+
+import pytest
+import snappi  # type: ignore[import-untyped]
+
+from arista_lab.otg import GeneratorPort, flows, generator_ports, write_config
+
+LINKS = """
+links:
+  - endpoints: ["leaf1:et10", "otg:eth1"]
+    ipv4_subnet: 10.0.0.0/31
+    ipv6_subnet: fc00::/127
+  - endpoints: ["otg:eth2", "leaf2:et10"]
+    ipv4_subnet: 10.0.0.2/31
+  - endpoints: ["leaf1:et1", "leaf2:et1"]
+    ipv4_subnet: 10.0.1.0/31
+  - endpoints: ["leaf3:et10", "otg:eth3"]
+    ipv4_subnet: 10.0.0.4/31
+    ipv6_subnet: fc00::4/127
+"""
+
+
+def port(name: str) -> GeneratorPort:
+    return GeneratorPort(name, name, "02:00:00:00:00:01", ("10.0.0.1", "10.0.0.0", 31), None)
+
+
+def pairs(generated) -> list[str]:
+    return [f["name"].removesuffix(".ipv4") for f in generated]
+
+
+@pytest.fixture
+def links(tmp_path: Path) -> Path:
+    path = tmp_path / "links.yaml"
+    path.write_text(LINKS)
+    return path
+
+
+def test_generator_ports(links: Path) -> None:
+    ports = generator_ports(links, ["leaf1", "leaf2", "leaf3"], location="{device}/{interface}")
+    assert ports == [
+        GeneratorPort("otg_eth1", "otg/eth1", "02:00:00:00:00:01", ("10.0.0.1", "10.0.0.0", 31), ("fc00::1", "fc00::", 127)),
+        GeneratorPort("otg_eth2", "otg/eth2", "02:00:00:00:00:02", ("10.0.0.2", "10.0.0.3", 31), None),
+        GeneratorPort("otg_eth3", "otg/eth3", "02:00:00:00:00:03", ("10.0.0.5", "10.0.0.4", 31), ("fc00::5", "fc00::4", 127)),
+    ]
+    # Any device outside of the inventory connected to a lab device is a traffic generator,
+    # the links between two devices outside of the inventory are ignored
+    assert [p.name for p in generator_ports(links, ["leaf1"])] == ["otg_eth1", "leaf2_et1"]
+
+
+def test_patterns() -> None:
+    ports = [port(name) for name in ("a", "b", "c", "d")]
+    assert pairs(flows(ports, "mesh")) == ["a>b", "a>c", "a>d", "b>a", "b>c", "b>d", "c>a", "c>b", "c>d", "d>a", "d>b", "d>c"]
+    assert pairs(flows(ports, "pairwise")) == ["a>b", "b>a", "c>d", "d>c"]
+    assert pairs(flows(ports, "hub", hub="c")) == ["c>a", "a>c", "c>b", "b>c", "c>d", "d>c"]
+    assert pairs(flows(ports[:3], "pairwise")) == ["a>b", "b>a"]
+    with pytest.raises(ValueError, match="Hub port 'x'"):
+        list(flows(ports, "hub", hub="x"))
+
+
+def test_flows_per_ip_version(links: Path) -> None:
+    ports = generator_ports(links, ["leaf1", "leaf2", "leaf3"])
+    names = [f["name"] for f in flows(ports, "hub", hub="otg_eth1")]
+    # otg_eth2 has no IPv6 address
+    assert names == [
+        "otg_eth1>otg_eth2.ipv4",
+        "otg_eth2>otg_eth1.ipv4",
+        "otg_eth1>otg_eth3.ipv4",
+        "otg_eth1>otg_eth3.ipv6",
+        "otg_eth3>otg_eth1.ipv4",
+        "otg_eth3>otg_eth1.ipv6",
+    ]
+
+
+def test_write_config(links: Path, tmp_path: Path) -> None:
+    ports = generator_ports(links, ["leaf1", "leaf2", "leaf3"])
+    path = tmp_path / "otg.json"
+    assert write_config(path, ports, flows(ports, "mesh", size=256, rate_pps=1000)) == 8
+    config = snappi.Config()
+    config.deserialize(path.read_text())
+    assert [p.name for p in config.ports] == ["otg_eth1", "otg_eth2", "otg_eth3"]
+    assert len(config.devices) == 3 and len(config.flows) == 8
+    assert config.flows[0].size.fixed == 256
+    assert json.loads(path.read_text())["flows"][0]["rate"] == {"choice": "pps", "pps": "1000"}
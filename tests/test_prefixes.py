@@ -0,0 +1,34 @@
+import ipaddress
+
+from arista_lab.prefixes import non_overlapping
+
+
+def test_non_overlapping() -> None:
+    prefixes = [
+        "198.51.100.0/24",
+        "10.0.0.0/8",
+        "192.0.2.0/24",
+        "10.1.0.0/16",
+        "2001:db8::/32",
+        "2001:db8:1::/48",
+        "2001:db9::/32",
+        "198.51.100.0/24",
+    ]
+    assert non_overlapping(prefixes) == [
+        ipaddress.ip_network("198.51.100.0/24"),
+        ipaddress.ip_network("192.0.2.0/24"),
+        ipaddress.ip_network("2001:db9::/32"),
+        ipaddress.ip_network("198.51.100.0/24"),
+    ]
+
+
+def test_nested_prefixes_all_overlap() -> None:
+    assert non_overlapping(["10.0.0.0/8", "10.0.0.0/16", "10.0.0.0/24", "11.0.0.0/8"]) == [ipaddress.ip_network("11.0.0.0/8")]
+
+
+def test_same_addresses_in_both_versions() -> None:
+    assert len(non_overlapping(["0.0.0.0/8", "::/8"])) == 2
+
+
+def test_empty() -> None:
+    assert non_overlapping([]) == []
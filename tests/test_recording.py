@@ -0,0 +1,58 @@
+import math
+from pathlib import Path
+from types import SimpleNamespace
+
+from arista_lab.recording import MetricsRecorder, iter_samples, percentile, summarize
+
+
+def flow(name: str, frames_tx: int, frames_rx: int) -> SimpleNamespace:
+    return SimpleNamespace(name=name, frames_tx=frames_tx, frames_rx=frames_rx, bytes_tx=frames_tx * 100, bytes_rx=frames_rx * 100)
+
+
+def bgp(name: str, flaps: int, state: str) -> SimpleNamespace:
+    return SimpleNamespace(name=name, session_state=state, session_flap_count=flaps, routes_advertised=10, routes_received=10)
+
+
+def test_rotation(tmp_path: Path) -> None:
+    path = tmp_path / "metrics.jsonl"
+    with MetricsRecorder(path, max_bytes=200, backups=2) as recorder:
+        for t in range(10):
+            recorder.write("flow", [flow("f1", t, t)], t=float(t))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["metrics.jsonl", "metrics.jsonl.1", "metrics.jsonl.2"]
+    times = [t for t, _, _ in iter_samples(path)]
+    # The oldest samples were rotated out, the others are read in order
+    assert times == sorted(times) and times[-1] == 9.0 and len(times) < 10
+
+
+def test_summary(tmp_path: Path) -> None:
+    path = tmp_path / "metrics.jsonl"
+    with MetricsRecorder(path) as recorder:
+        recorder.write("flow", [flow("f1", 0, 0), flow("f2", 0, 0)], t=0.0)
+        recorder.write("bgpv4", [bgp("peer1", 2, "up")], t=0.0)
+        recorder.write("flow", [flow("f1", 100, 100), flow("f2", 100, 60)], t=1.0)
+        # f1 was restarted, its counters start again from 0
+        recorder.write("flow", [flow("f1", 50, 50), flow("f2", 200, 160)], t=2.0)
+        recorder.write("bgpv4", [bgp("peer1", 3, "down")], t=2.0)
+    summary = summarize(path, flow_rates=True)
+    assert summary.duration == 2.0
+    f1, f2 = summary.flows["f1"], summary.flows["f2"]
+    assert (f1.frames_tx, f1.frames_rx, f1.loss, f1.loss_duration) == (150, 150, 0, 0.0)
+    assert (f2.frames_tx, f2.frames_rx, f2.loss, f2.loss_duration) == (200, 160, 40, 1.0)
+    assert f2.loss_percent == 20.0
+    assert f2.rx_rates == [60.0, 100.0]
+    assert summary.bgp == {"peer1": (1, "down")}
+
+
+def test_flow_rates_are_opt_in(tmp_path: Path) -> None:
+    path = tmp_path / "metrics.jsonl"
+    with MetricsRecorder(path) as recorder:
+        recorder.write("flow", [flow("f1", 0, 0)], t=0.0)
+        recorder.write("flow", [flow("f1", 10, 10)], t=1.0)
+    assert summarize(path).flows["f1"].rx_rates == []
+
+
+def test_percentile() -> None:
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentile([1.0, 2.0, 3.0, 4.0], 100) == 4.0
+    assert percentile([5.0], 95) == 5.0
+    assert math.isnan(percentile([], 50))
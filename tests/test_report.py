@@ -0,0 +1,92 @@
+import io
+from pathlib import Path
+from types import SimpleNamespace
+
+from rich.console import Console
+
+from arista_lab.report import DiffReport, ResultLog
+
+DIFF = "--- running\n+++ session\n@@ -1,2 +1,3 @@\n hostname r1\n-ip routing\n+ip routing vrf A\n+ipv6 unicast-routing\n"
+
+
+def test_summary() -> None:
+    report = DiffReport()
+    report.add("r2", "bgp.j2", DIFF)
+    report.add("r1", "base.j2", None)
+    report.add("r2", "base.j2", "")
+    summary = report.summary()
+    assert summary.title == "1/2 devices would change"
+    assert list(summary.columns[0].cells) == ["r2"]
+    assert list(summary.columns[1].cells) == ["bgp.j2 [green]+2[/green] [red]-1[/red]"]
+
+
+def test_write(tmp_path: Path) -> None:
+    for name in ("r1.diff", "r3.diff", "notes.txt"):
+        (tmp_path / name).write_text("previous")
+    report = DiffReport(tmp_path)
+    report.add("r1", "base.j2", None)
+    report.add("r2", "bgp.j2", DIFF)
+    assert report.write(["r1", "r2"]) == [tmp_path / "r2.diff"]
+    assert (tmp_path / "r2.diff").read_text() == f"### bgp.j2\n{DIFF.rstrip()}\n\n"
+    # r1 no longer has changes, r3 is not part of this run
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["notes.txt", "r2.diff", "r3.diff"]
+
+
+def bar() -> SimpleNamespace:
+    return SimpleNamespace(console=Console(file=io.StringIO(), width=200, log_time=False, log_path=False))
+
+
+def output(bar: SimpleNamespace) -> str:
+    return bar.console.file.getvalue()
+
+
+LONG_DIFF = "\n".join(f"+line {i}" for i in range(20))
+
+
+def test_result_log_truncates_the_console(tmp_path: Path) -> None:
+    log, b = ResultLog(tmp_path, max_lines=3), bar()
+    log.diff(b, "r1", "base.j2", LONG_DIFF)
+    log.error(b, "r2", "apply", "Task apply failed for device r2", "Traceback\n" * 10)
+    assert log.run_folder is not None and log.run_folder.parent == tmp_path
+    assert (log.run_folder / "r1.diff").read_text() == f"### base.j2\n{LONG_DIFF}\n\n"
+    assert "Traceback" in (log.run_folder / "r2.error").read_text()
+    out = output(b)
+    assert "r1: base.j2 +20 -0" in out
+    assert "+line 2" in out and "+line 3" not in out
+    assert f"... 17 more lines in {log.run_folder / 'r1.diff'}" in out
+    assert f"... 7 more lines in {log.run_folder / 'r2.error'}" in out
+    assert log.summary() == f"1 devices changed (20 lines), 1 devices failed, full results in {log.run_folder}"
+
+
+def test_result_log_counts_only(tmp_path: Path) -> None:
+    log, b = ResultLog(tmp_path, max_lines=0), bar()
+    log.diff(b, "r1", "base.j2", LONG_DIFF)
+    assert f"r1: base.j2 +20 -0 (diff in {log.run_folder / 'r1.diff'})" in output(b)
+    assert "+line" not in output(b)
+
+
+def test_result_log_quiet(tmp_path: Path) -> None:
+    log, b = ResultLog(tmp_path, quiet=True), bar()
+    log.log(b, "r1: Configuration saved")
+    log.diff(b, "r1", "base.j2", LONG_DIFF)
+    assert output(b) == ""
+    log.error(b, "r2", "apply", "Task apply failed for device r2")
+    assert "Task apply failed for device r2" in output(b)
+    assert log.changes == {"r1": 20} and log.failures == {"r2": 1}
+
+
+def test_result_log_without_folder() -> None:
+    log, b = ResultLog(), bar()
+    log.diff(b, "r1", "base.j2", LONG_DIFF)
+    assert "+line 19" in output(b)
+    assert log.run_folder is None
+    assert log.summary() == "1 devices changed (20 lines), 0 devices failed"
+    assert ResultLog().summary() is None
+
+
+def test_result_log_runs_do_not_share_a_folder(tmp_path: Path) -> None:
+    first, second = ResultLog(tmp_path), ResultLog(tmp_path)
+    first.diff(bar(), "r1", "base.j2", LONG_DIFF)
+    second.diff(bar(), "r1", "base.j2", LONG_DIFF)
+    assert first.run_folder != second.run_folder
+    assert (first.run_folder / "r1.diff").exists() and (second.run_folder / "r1.diff").exists()
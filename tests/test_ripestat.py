@@ -0,0 +1,114 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from arista_lab.ripestat import PrefixCache, RipeStatError
+
+PREFIXES = ["192.0.2.0/24", "2001:db8::/32"]
+ETAG = '"v1"'
+
+
+class RipeStat(ThreadingHTTPServer):
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), RipeStatHandler)
+        self.requests: list[dict[str, str]] = []
+        # Holds the responses until released, so that concurrent callers overlap
+        self.release = threading.Event()
+        self.release.set()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class RipeStatHandler(BaseHTTPRequestHandler):
+    server: RipeStat
+
+    def do_GET(self) -> None:
+        self.server.requests.append(dict(self.headers))
+        self.server.release.wait(5)
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps({"data": {"prefixes": [{"prefix": p} for p in PREFIXES]}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", ETAG)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def ripestat() -> Iterator[RipeStat]:
+    server = RipeStat()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_concurrent_callers_share_one_fetch(ripestat: RipeStat, tmp_path: Path) -> None:
+    cache = PrefixCache(tmp_path, url=ripestat.url)
+    ripestat.release.clear()
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(cache.prefixes, 65001) for _ in range(8)]
+        ripestat.release.set()
+        results = [f.result() for f in futures]
+    assert results == [PREFIXES] * 8
+    assert len(ripestat.requests) == 1
+    assert (tmp_path / "AS65001.json").exists()
+
+
+def test_expired_entry_is_revalidated(ripestat: RipeStat, tmp_path: Path) -> None:
+    assert PrefixCache(tmp_path, url=ripestat.url).prefixes(65001) == PREFIXES
+    assert PrefixCache(tmp_path, ttl=0, url=ripestat.url).prefixes(65001) == PREFIXES
+    assert len(ripestat.requests) == 2
+    assert ripestat.requests[1].get("If-None-Match") == ETAG
+
+
+def test_fresh_entry_is_not_fetched(ripestat: RipeStat, tmp_path: Path) -> None:
+    PrefixCache(tmp_path, url=ripestat.url).prefixes(65001)
+    assert PrefixCache(tmp_path, url=ripestat.url).prefixes(65001) == PREFIXES
+    assert len(ripestat.requests) == 1
+
+
+def test_offline_uses_cache_only(ripestat: RipeStat, tmp_path: Path) -> None:
+    PrefixCache(tmp_path, url=ripestat.url).prefixes(65001)
+    assert PrefixCache(tmp_path, ttl=0, offline=True, url=ripestat.url).prefixes(65001) == PREFIXES
+    assert len(ripestat.requests) == 1
+
+
+def test_offline_without_cache_fails(ripestat: RipeStat, tmp_path: Path) -> None:
+    with pytest.raises(RipeStatError, match="offline"):
+        PrefixCache(tmp_path, offline=True, url=ripestat.url).prefixes(65001)
+    assert not ripestat.requests
+
+
+def write_fixture(folder: Path, asn: int) -> None:
+    (folder / f"AS{asn}.json").write_text(json.dumps({"data": {"prefixes": [{"prefix": "198.51.100.0/24"}]}}))
+
+
+def test_fixture_is_pinned(ripestat: RipeStat, tmp_path: Path) -> None:
+    write_fixture(tmp_path, 65001)
+    assert PrefixCache(tmp_path, ttl=0, url=ripestat.url).prefixes(65001) == ["198.51.100.0/24"]
+    assert not ripestat.requests
+    assert "data" in json.loads((tmp_path / "AS65001.json").read_text())
+
+
+def test_refresh(ripestat: RipeStat, tmp_path: Path) -> None:
+    write_fixture(tmp_path, 65001)
+    assert PrefixCache(tmp_path, url=ripestat.url, refresh=True).prefixes(65001) == PREFIXES
+    assert len(ripestat.requests) == 1
+    assert PrefixCache(tmp_path, url=ripestat.url).prefixes(65001) == PREFIXES
+    assert len(ripestat.requests) == 1
@@ -0,0 +1,64 @@
+from arista_lab.runner import WINDOW, AdaptiveLimit
+
+
+def test_grows_while_response_time_is_stable() -> None:
+    limit = AdaptiveLimit(initial=4, maximum=100)
+    for _ in range(50):
+        limit.completed(1.0)
+    assert int(limit) == 54
+
+
+def test_fast_first_task_does_not_pin_the_limit() -> None:
+    # A device with nothing to push completes almost instantly, the others take 2 seconds
+    limit = AdaptiveLimit(initial=4, maximum=100)
+    limit.completed(0.01)
+    for _ in range(200):
+        limit.completed(2.0)
+    assert int(limit) == 100
+
+
+def test_fast_failures_are_not_measured() -> None:
+    limit = AdaptiveLimit(initial=4, maximum=100)
+    for _ in range(WINDOW):
+        limit.completed(0.01, failed=True)
+    for _ in range(50):
+        limit.completed(2.0)
+    assert limit.baseline == 2.0
+    assert int(limit) == 62
+
+
+def test_halved_when_response_time_triples() -> None:
+    limit = AdaptiveLimit(initial=4, maximum=100)
+    for _ in range(20):
+        limit.completed(1.0)
+    assert int(limit) == 24
+    for _ in range(WINDOW):
+        limit.completed(5.0)
+    # Overloaded once the median of the window is 5.0, i.e. at the 5th task, then not decreased
+    # again until the tasks started before the decrease are done
+    assert int(limit) == 14
+
+
+def test_single_slow_task_does_not_cut_the_limit() -> None:
+    limit = AdaptiveLimit(initial=4, maximum=100)
+    for _ in range(20):
+        limit.completed(1.0)
+    limit.completed(30.0)
+    assert int(limit) == 25
+
+
+def test_halved_on_timeouts() -> None:
+    limit = AdaptiveLimit(initial=4, maximum=100)
+    for _ in range(20):
+        limit.completed(1.0)
+    for _ in range(WINDOW // 4):
+        limit.completed(60.0, failed=True, timed_out=True)
+    assert int(limit) == 12
+
+
+def test_stays_low_while_tasks_time_out() -> None:
+    limit = AdaptiveLimit(initial=4, maximum=100)
+    for _ in range(100):
+        limit.completed(60.0, failed=True, timed_out=True)
+        assert 1 <= int(limit) <= 5
+    assert int(limit) <= 2
@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import pytest
+
+from arista_lab.snapshots import SnapshotError, SnapshotStore
+
+CONFIG = """hostname {host}
+!
+interface Ethernet1
+   no switchport
+!
+router bgp 65001
+   router-id 10.0.0.1
+!
+end
+"""
+
+
+def objects(folder: Path) -> list[Path]:
+    return [p for p in (folder / "objects").rglob("*") if p.is_file()]
+
+
+def test_round_trip(tmp_path: Path) -> None:
+    store = SnapshotStore(tmp_path)
+    for host in ("r1", "r2"):
+        store.put(host, CONFIG.format(host=host))
+    store.commit("lab")
+    assert store.names() == ["lab"]
+    assert SnapshotStore(tmp_path).read_config("lab", "r2") == CONFIG.format(host="r2")
+
+
+def test_sections_are_stored_once(tmp_path: Path) -> None:
+    store = SnapshotStore(tmp_path)
+    store.put("r1", CONFIG.format(host="r1"))
+    store.commit("first")
+    stored = len(objects(tmp_path))
+    store.put("r1", CONFIG.format(host="r1"))
+    store.put("r2", CONFIG.format(host="r2"))
+    store.commit("second")
+    # Only the hostname section of r2 is new
+    assert len(objects(tmp_path)) == stored + 1
+    assert store.read("first")["hosts"].keys() == {"r1"}
+
+
+def test_errors(tmp_path: Path) -> None:
+    store = SnapshotStore(tmp_path)
+    store.put("r1", CONFIG.format(host="r1"))
+    store.commit("lab")
+    with pytest.raises(SnapshotError, match="already exists"):
+        store.commit("lab")
+    with pytest.raises(SnapshotError, match="Invalid snapshot name"):
+        store.read("../lab")
+    with pytest.raises(SnapshotError, match="not found"):
+        store.read("missing")
+    with pytest.raises(SnapshotError, match="r2 not found"):
+        store.read_config("lab", "r2")
+
+
+def test_corrupted_object(tmp_path: Path) -> None:
+    store = SnapshotStore(tmp_path)
+    store.put("r1", CONFIG.format(host="r1"))
+    store.commit("lab")
+    other = SnapshotStore(tmp_path / "other")
+    other.put("r1", "hostname other\n")
+    objects(tmp_path)[0].write_bytes(objects(tmp_path / "other")[0].read_bytes())
+    with pytest.raises(SnapshotError, match="Corrupted"):
+        store.read_config("lab", "r1")
+
+
+def test_open(tmp_path: Path) -> None:
+    store = SnapshotStore(tmp_path)
+    for host in ("r1", "r2"):
+        store.put(host, CONFIG.format(host=host))
+    store.commit("lab")
+    snapshot = store.open("lab", ["r1"])
+    assert snapshot.hosts.keys() == {"r1"}
+    assert snapshot.read_config("r1") == CONFIG.format(host="r1")
+    with pytest.raises(SnapshotError, match="r3 not found"):
+        store.open("lab", ["r1", "r3"])
+    objects(tmp_path)[0].unlink()
+    with pytest.raises(SnapshotError, match="Missing object"):
+        store.open("lab")
+
+
+def test_invalid_manifest(tmp_path: Path) -> None:
+    store = SnapshotStore(tmp_path)
+    store.commit("lab")
+    (tmp_path / "snapshots" / "lab.json").write_text("{")
+    with pytest.raises(SnapshotError, match="Invalid snapshot 'lab'"):
+        store.open("lab")
@@ -0,0 +1,61 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+from arista_lab.config.state import RUNNING_CONFIG_CMD, FingerprintStore
+
+
+class Device:
+    def __init__(self) -> None:
+        self.config = "hostname r1\n"
+
+    def cli(self, commands: list[str]) -> dict[str, str]:
+        return {RUNNING_CONFIG_CMD: f"! Command: show running-config\n{self.config}"}
+
+
+def task(device: Device) -> SimpleNamespace:
+    host = SimpleNamespace(name="r1", get_connection=lambda *args: device)
+    return SimpleNamespace(host=host, nornir=SimpleNamespace(config=None))
+
+
+def push(path: Path, device: Device, key: str, config: str) -> bool:
+    """Run a command with --skip-unchanged: return True if `config` is skipped, commit it otherwise."""
+    store = FingerprintStore(path)
+    if store.unchanged(task(device), key, config):
+        return True
+    device.config += config
+    store.record(task(device), key, config)
+    store.save(task(device))
+    return False
+
+
+def test_unchanged_snippet_is_skipped(tmp_path: Path) -> None:
+    device, path = Device(), tmp_path / "state.json"
+    assert not push(path, device, "template:base.j2", "ip routing\n")
+    assert push(path, device, "template:base.j2", "ip routing\n")
+    assert not push(path, device, "template:base.j2", "no ip routing\n")
+
+
+def test_device_changed(tmp_path: Path) -> None:
+    device, path = Device(), tmp_path / "state.json"
+    push(path, device, "template:base.j2", "ip routing\n")
+    device.config += "username lab\n"
+    assert not push(path, device, "template:base.j2", "ip routing\n")
+
+
+def test_interfaces_then_apply(tmp_path: Path) -> None:
+    device, path = Device(), tmp_path / "state.json"
+    push(path, device, "template:base.j2", "interface Ethernet1\n   mtu 9000\n")
+    # The interfaces command commits over the lines of the template
+    assert not push(path, device, "interface:et1", "interface Ethernet1\n   mtu 1500\n")
+    assert not push(path, device, "template:base.j2", "interface Ethernet1\n   mtu 9000\n")
+
+
+def test_unchanged_device_keeps_other_commands(tmp_path: Path) -> None:
+    device, path = Device(), tmp_path / "state.json"
+    push(path, device, "template:base.j2", "ip routing\n")
+    store = FingerprintStore(path)
+    # A commit of the interfaces command that did not change the device
+    store.record(task(device), "interface:et1", "interface Ethernet1\n")
+    store.save(task(device))
+    assert push(path, device, "template:base.j2", "ip routing\n")
+    assert push(path, device, "interface:et1", "interface Ethernet1\n")
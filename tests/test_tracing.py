@@ -0,0 +1,47 @@
+from typing import Any, Iterator
+
+import pytest
+from nornir.core.configuration import Config
+from nornir.core.inventory import Host
+from nornir.core.plugins.connections import ConnectionPluginRegister
+
+from arista_lab import tracing
+
+
+class Connection:
+    opened = 0
+
+    def open(self, hostname: str | None, *args: Any, **kwargs: Any) -> None:
+        Connection.opened += 1
+        if hostname == "down":
+            raise ConnectionRefusedError(hostname)
+        self.connection = self
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def tracer(monkeypatch: pytest.MonkeyPatch) -> Iterator[tracing.Tracer]:
+    monkeypatch.setattr(tracing, "_tracer", None)
+    ConnectionPluginRegister.register("test", Connection)
+    tracing.trace_connections("test")
+    yield tracing.enable()
+    ConnectionPluginRegister.deregister("test")
+
+
+def test_connect_span(tracer: tracing.Tracer) -> None:
+    Connection.opened = 0
+    tracing._current.host = "r1"
+    Host("r1", hostname="up").get_connection("test", Config())
+    tracing._current.host = "r2"
+    with pytest.raises(ConnectionRefusedError):
+        Host("r2", hostname="down").get_connection("test", Config())
+    assert [(s.host, s.phase, s.failed) for s in tracer.spans] == [("r1", "connect", False), ("r2", "connect", True)]
+    assert Connection.opened == 2
+
+
+def test_trace_connections_once(tracer: tracing.Tracer) -> None:
+    plugin = ConnectionPluginRegister.get_plugin("test")
+    tracing.trace_connections("test")
+    assert ConnectionPluginRegister.get_plugin("test") is plugin
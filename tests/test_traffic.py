@@ -0,0 +1,93 @@
+import json
+from pathlib import Path
+
+import pytest
+import snappi  # type: ignore[import-untyped]
+
+from arista_lab import traffic
+from arista_lab.traffic import Counters, _delta, _watch_tables, config_hash
+
+
+def test_delta() -> None:
+    assert _delta(Counters(10, 8, 1000, 800), None) == Counters(0, 0, 0, 0)
+    assert _delta(Counters(10, 8, 1000, 800), Counters(4, 4, 400, 400)) == Counters(6, 4, 600, 400)
+    # The traffic was restarted, the counters start again from 0
+    assert _delta(Counters(3, 2, 300, 200), Counters(10, 8, 1000, 800)) == Counters(3, 2, 300, 200)
+
+
+def test_watch_tables() -> None:
+    previous = {f"f{i}": Counters(100, 100, 10000, 10000) for i in range(5)}
+    # f3 loses 50 frames in the interval, f1 loses 10, the others none
+    flows = {f"f{i}": Counters(200, 200, 20000, 20000) for i in range(5)}
+    flows["f1"] = Counters(200, 190, 20000, 19000)
+    flows["f3"] = Counters(200, 150, 20000, 15000)
+    ports = {"p1": Counters(1000, 900, 100000, 90000)}
+    port_table, flow_table = _watch_tables(
+        ports, flows, {"f1": "started"}, {"p1": Counters(500, 500, 50000, 50000)}, previous, 2.0, rows=2
+    ).renderables
+    assert [list(c.cells) for c in port_table.columns] == [
+        ["p1"], ["1000"], ["900"], ["500"], ["400"], ["250"], ["200"], ["0.16"]
+    ]
+    assert list(flow_table.columns[0].cells) == ["f3", "f1"]
+    assert list(flow_table.columns[1].cells) == ["", "started"]
+    assert list(flow_table.columns[7].cells) == ["50", "10"]
+    assert flow_table.caption == "3 more flows"
+    assert [c.footer for c in flow_table.columns] == ["5 flows", "", "1000", "940", "500", "440", "220", "60"]
+
+
+def otg_config(*ports: str) -> snappi.Config:
+    config = snappi.Config()
+    for port in ports:
+        config.ports.port(name=port, location=f"eth{port[1:]}")
+    return config
+
+
+class Api:
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.configs: list[snappi.Config] = []
+
+    def set_config(self, config: snappi.Config) -> None:
+        self.configs.append(config)
+        if self.fail:
+            raise RuntimeError("set_config failed")
+
+
+@pytest.fixture
+def session_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    path = tmp_path / ".snappi-api-session.json"
+    monkeypatch.setattr(traffic, "snappi_session_file", path)
+    return path
+
+
+def test_config_hash() -> None:
+    config = otg_config("p1", "p2")
+    same = snappi.Config()
+    same.deserialize(json.dumps({"ports": [{"name": "p1", "location": "eth1"}, {"location": "eth2", "name": "p2"}]}))
+    assert config_hash(config) == config_hash(same)
+    assert config_hash(config) != config_hash(otg_config("p1"))
+
+
+def test_unchanged_config_is_not_applied(session_file: Path) -> None:
+    api = Api()
+    traffic.configure(api, otg_config("p1"), "https://otg")  # type: ignore[arg-type]
+    traffic.configure(api, otg_config("p1"), "https://otg")  # type: ignore[arg-type]
+    assert len(api.configs) == 1
+    traffic.configure(api, otg_config("p1"), "https://other")  # type: ignore[arg-type]
+    traffic.configure(api, otg_config("p1"), "https://other", force=True)  # type: ignore[arg-type]
+    traffic.configure(api, otg_config("p1", "p2"), "https://other")  # type: ignore[arg-type]
+    assert len(api.configs) == 4
+    assert json.loads(session_file.read_text())["config"] == otg_config("p1", "p2").serialize(snappi.Config.DICT)
+
+
+def test_failed_config_removes_the_session(session_file: Path) -> None:
+    traffic.configure(Api(), otg_config("p1"), "https://otg")  # type: ignore[arg-type]
+    traffic.configure(Api(fail=True), otg_config("p1", "p2"), "https://otg")  # type: ignore[arg-type]
+    assert not session_file.exists()
+
+
+def test_invalid_session_is_ignored(session_file: Path) -> None:
+    session_file.write_text("not json")
+    api = Api()
+    traffic.configure(api, otg_config("p1"), "https://otg")  # type: ignore[arg-type]
+    assert len(api.configs) == 1
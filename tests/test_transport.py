@@ -0,0 +1,128 @@
+import datetime
+import json
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from pyeapi.eapilib import ConnectionError as EapiConnectionError  # type: ignore[import-untyped]
+
+from arista_lab.transport import LabEapiConnection
+
+
+def self_signed_certificate(folder: Path) -> tuple[Path, Path]:
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "eos")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    cert_file, key_file = folder / "cert.pem", folder / "key.pem"
+    cert_file.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_file.write_bytes(
+        key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL, serialization.NoEncryption())
+    )
+    return cert_file, key_file
+
+
+class Eapi(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, certificate: tuple[Path, Path]) -> None:
+        super().__init__(("127.0.0.1", 0), EapiHandler)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(*certificate)
+        context.set_ciphers("AES256-SHA:DHE-RSA-AES256-SHA:AES128-SHA:DHE-RSA-AES128-SHA:DEFAULT")
+        self.socket = context.wrap_socket(self.socket, server_side=True)
+        self.requests: list[dict] = []
+        # What to do with each request after the first one: 'answer', 'stall' or 'close'
+        self.then = "answer"
+        self.stop = threading.Event()
+
+
+class EapiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: Eapi
+
+    def do_POST(self) -> None:
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(request)
+        if len(self.server.requests) == 2 and self.server.then == "stall":
+            self.server.stop.wait(5)
+            self.close_connection = True
+            return
+        if len(self.server.requests) == 2 and self.server.then == "close":
+            self.close_connection = True
+            return
+        body = json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": [{} for _ in request["params"]["cmds"]]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def eapi(tmp_path: Path) -> Iterator[Eapi]:
+    server = Eapi(self_signed_certificate(tmp_path))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.stop.set()
+    server.shutdown()
+    server.server_close()
+
+
+def request(cmd: str) -> str:
+    return json.dumps({"jsonrpc": "2.0", "method": "runCmds", "params": {"version": 1, "cmds": [cmd], "format": "json"}, "id": cmd})
+
+
+def connection(eapi: Eapi) -> LabEapiConnection:
+    return LabEapiConnection("127.0.0.1", port=eapi.server_address[1], username="admin", password="admin", timeout=1)
+
+
+def test_requests_share_a_connection(eapi: Eapi) -> None:
+    conn = connection(eapi)
+    for cmd in ("show version", "show hostname", "show clock"):
+        assert conn.send(request(cmd))["result"] == [{}]
+    conn.close()
+    assert len(eapi.requests) == 3
+
+
+def test_timeout_on_reused_connection_is_not_retried(eapi: Eapi) -> None:
+    eapi.then = "stall"
+    conn = connection(eapi)
+    conn.send(request("show version"))
+    start = time.monotonic()
+    with pytest.raises(EapiConnectionError):
+        conn.send(request("configure session s1 commit"))
+    assert time.monotonic() - start < 1.5
+    assert [r["id"] for r in eapi.requests] == ["show version", "configure session s1 commit"]
+    conn.close()
+
+
+def test_idle_connection_closed_by_the_device_is_retried(eapi: Eapi) -> None:
+    eapi.then = "close"
+    conn = connection(eapi)
+    conn.send(request("show version"))
+    assert conn.send(request("show hostname"))["result"] == [{}]
+    assert [r["id"] for r in eapi.requests] == ["show version", "show hostname", "show hostname"]
+    conn.close()